@@ -1,54 +1,72 @@
+import os
 import sqlite3
+import argparse
+from sqlite_tuning import apply_load_pragmas, restore_pragmas
+from treatment_partitions import expand_index_statements
 
-def create_indexes():
+INDEX_STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS idx_provider_id ON PROVIDER(Provider_ID);",
+    "CREATE INDEX IF NOT EXISTS idx_valid_from ON PROVIDER(Valid_From);",
+
+    # For TREATMENT_FACT table
+    "CREATE INDEX IF NOT EXISTS idx_treatment_type ON TREATMENT(Type);",
+    "CREATE INDEX IF NOT EXISTS idx_outcome_quarter_year ON TREATMENT(Outcome_Quarter);",
+    "CREATE INDEX IF NOT EXISTS idx_treatment_date ON TREATMENT(Start_Date, Completion_Date);",  # Added to cover multiple dates
+    "CREATE INDEX IF NOT EXISTS idx_total_cost ON TREATMENT(Cost);",
+    "CREATE INDEX IF NOT EXISTS idx_effectiveness_score ON TREATMENT(Effectiveness_Score);",
+    "CREATE INDEX IF NOT EXISTS idx_disease ON TREATMENT(Disease_ID);"
+]
+
+def index_name(stmt):
+    return stmt.split()[5]
+
+def get_default_db_path():
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
+    return os.path.join(project_root, "db", "healthcare_data.db")
+
+def create_indexes(db_path=None, rebuild=False):
     # Connect to healthcare database
     try:
-        conn = sqlite3.connect('../Healthcare_ETL_Project/db/healthcare_data.db')
+        conn = sqlite3.connect(db_path or get_default_db_path())
         cursor = conn.cursor()
         print("Successfully connected to the database.")
     except sqlite3.Error as e:
         print(f"Error while connecting to the database: {e}")
         return
 
-    # List of index creation statements with DROP IF EXISTS to avoid conflicts
-    index_statements = [
-        "DROP INDEX IF EXISTS idx_provider_id;",
-        "DROP INDEX IF EXISTS idx_valid_from;",
-        "DROP INDEX IF EXISTS idx_treatment_type;",
-        "DROP INDEX IF EXISTS idx_outcome_quarter_year;",
-        "DROP INDEX IF EXISTS idx_treatment_date;",
-        "DROP INDEX IF EXISTS idx_total_cost;",
-        "DROP INDEX IF EXISTS idx_effectiveness_score;",
-        "DROP INDEX IF EXISTS idx_disease;",
-        
-        "CREATE INDEX IF NOT EXISTS idx_provider_id ON PROVIDER(Provider_ID);",
-        "CREATE INDEX IF NOT EXISTS idx_valid_from ON PROVIDER(Valid_From);",
-        
-        # For TREATMENT_FACT table
-        "CREATE INDEX IF NOT EXISTS idx_treatment_type ON TREATMENT(Type);",
-        "CREATE INDEX IF NOT EXISTS idx_outcome_quarter_year ON TREATMENT(Outcome_Quarter);",
-        "CREATE INDEX IF NOT EXISTS idx_treatment_date ON TREATMENT(Start_Date, Completion_Date);",  # Added to cover multiple dates
-        "CREATE INDEX IF NOT EXISTS idx_total_cost ON TREATMENT(Cost);",
-        "CREATE INDEX IF NOT EXISTS idx_effectiveness_score ON TREATMENT(Effectiveness_Score);",
-        "CREATE INDEX IF NOT EXISTS idx_disease ON TREATMENT(Disease_ID);"
-    ]
-    
+    # Existing indexes are kept unless a rebuild is requested. On a partitioned TREATMENT the indexes are
+    # built (and rebuilt) on the open partitions only.
+    index_statements = expand_index_statements(conn, INDEX_STATEMENTS)
+    conn.commit()
+    if rebuild:
+        index_names = [index_name(stmt) for stmt in index_statements]
+        index_statements = [f"DROP INDEX IF EXISTS {name};" for name in index_names] + index_statements
+    else:
+        existing = {name for (name,) in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        index_statements = [stmt for stmt in index_statements if index_name(stmt) not in existing]
+        if not index_statements:
+            print("All indexes already exist, nothing to do (use --rebuild to recreate them).")
+
+    # Index builds sort in temp storage: use the bulk-load cache and temp_store settings while they run
+    previous = apply_load_pragmas(conn)
+
     # Execute each statement
     try:
         for stmt in index_statements:
             print(f"Executing: {stmt}")
             cursor.execute(stmt)
-        
+
         # Commit changes
         conn.commit()
         print("All indexes created successfully.")
-    
+
     except sqlite3.Error as e:
         print(f"Error while creating indexes: {e}")
         # Optionally rollback if there was a failure
         conn.rollback()
-    
+
     finally:
+        restore_pragmas(conn, previous)
         # Close connection
         if conn:
             conn.close()
@@ -56,4 +74,7 @@ def create_indexes():
 
 # Run the function
 if __name__ == "__main__":
-    create_indexes()
+    parser = argparse.ArgumentParser(description="Create the star schema indexes.")
+    parser.add_argument('--rebuild', action='store_true', help="drop and recreate every index")
+    args = parser.parse_args()
+    create_indexes(rebuild=args.rebuild)
@@ -1,9 +1,15 @@
 import sqlite3
 import os
 import sys
-import subprocess
+import argparse
+from Provider_SCD import create_provider_scd_triggers
+from load_state import ensure_load_state_table
+from aggregates import ensure_aggregate_tables
+from source_partitions import ensure_source_partitions
+from treatment_partitions import partition_treatments
 
-def create_database_schema(db_path):
+# partitioned=True stores TREATMENT as one table per outcome year behind a TREATMENT view (treatment_partitions.py)
+def create_database_schema(db_path, scd_trigger=False, partitioned=False):
     try:
         # Connect to SQLite
         conn = sqlite3.connect(db_path)
@@ -86,10 +92,18 @@ def create_database_schema(db_path):
             Disease_ID INTEGER,
             Outcome_Day TEXT,
             Outcome_Weekend_Flag INTEGER,
-            Report_Duration INTEGER
+            Report_Duration INTEGER,
+            Source_File TEXT,
+            Source_Batch INTEGER,
+            Provider_Version_ID INTEGER
         );
         ''')
-        
+
+        ensure_source_partitions(conn)
+        ensure_load_state_table(conn)
+        ensure_aggregate_tables(conn)
+        if partitioned:
+            partition_treatments(conn)
 
         conn.commit()
         print("Database schema created successfully.")
@@ -102,11 +116,11 @@ def create_database_schema(db_path):
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
     
-    # Run Provider_SCD.py
+    # Create the Provider_SCD.py triggers on the same database (the per-row SCD trigger only on request)
     try:
-        subprocess.run(["python3", "Provider_SCD.py"], check=True)
-        print("Triggers for SCD Type II created successfully.")
-    except subprocess.CalledProcessError as e:
+        create_provider_scd_triggers(db_path, scd_trigger)
+        print("Provider triggers created successfully.")
+    except sqlite3.Error as e:
         print("Error while creating SCD Type II triggers:", e)
 
     finally:
@@ -115,6 +129,13 @@ def create_database_schema(db_path):
             print("Database connection closed.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the star schema database.")
+    parser.add_argument('--scd-trigger', action='store_true',
+                        help="also create the per-row trg_provider_scd2 trigger (fallback for ad-hoc UPDATEs of PROVIDER)")
+    parser.add_argument('--partition-treatments', action='store_true',
+                        help="store TREATMENT as per-year partitions behind a TREATMENT view")
+    args = parser.parse_args()
+
     try:
         # Set up paths
         project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
@@ -122,7 +143,7 @@ if __name__ == "__main__":
         os.makedirs(db_dir, exist_ok=True)
         db_path = os.path.join(db_dir, "healthcare_data.db")
 
-        create_database_schema(db_path)
+        create_database_schema(db_path, args.scd_trigger, args.partition_treatments)
 
     except Exception as e:
         print(f"Failed to set up the database: {e}")
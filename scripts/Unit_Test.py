@@ -1,5 +1,8 @@
 
+import io
+import os
 import pandas as pd
+import sqlite3
 from datetime import datetime
 import pytest
 
@@ -34,3 +37,1059 @@ def test_transform_outcome_fields():
         pytest.fail(f"Assertion failed: {ae}")
     except Exception as e:
         pytest.fail(f"Unexpected error: {e}")
+
+def make_processed_frame():
+    return pd.DataFrame({
+        'treatment_id': [1, 2, 3, 4],
+        'treatment_start_date': ['2024-01-01 08:00:00', '2024-01-02 09:30:00', '2024-02-10 10:00:00', '2024-03-01 11:00:00'],
+        'treatment_completion_date': ['2024-01-08 08:00:00', '2024-01-05 09:30:00', '2024-02-12 10:00:00', '2024-03-04 11:00:00'],
+        'treatment_outcome_status': ['successful', 'stable', 'deceased', 'Partially Successful'],
+        'treatment_outcome_date': ['2024-01-13 08:00:00', '2024-01-07 09:30:00', '2024-02-14 10:00:00', '2024-03-09 11:00:00'],
+        'treatment_duration': [7, 3, 2, 3],
+        'treatment_cost': [546.94, 342.94, 406.53, 291.1],
+        'treatment_type': ['surgical', 'preventive', 'surgical', 'pharmacological'],
+        'provider_id': [1, 1, 2, 1],
+        'provider_name': ['Nandini Srivastava', 'Nandini Srivastava', 'Arjun Rao', 'Nandini Srivastava'],
+        'speciality_id_x': [8, 8, 3, 8],
+        'speciality_name': ['Radiology', 'Radiology', 'Cardiology', 'Radiology'],
+        'affiliated_hospital': ['Mayo Clinic', 'Mayo Clinic', 'Cleveland Clinic', 'Mount Sinai Hospital'],
+        'country': ['United States'] * 4,
+        'state': ['California', 'California', 'Texas', 'California'],
+        'city': ['San Francisco', 'San Francisco', 'Houston', 'Los Angeles'],
+        'patient_id': [3, 9, 3, 30],
+        'patient_name': ['Kian Menon', 'Kian Joshi', 'Kian Menon', 'Namrata Kulkarni'],
+        'gender': ['Male', 'Male', 'Male', 'Female'],
+        'age': [71, 50, 71, 54],
+        'disease_id': [38, 36, 38, 37],
+        'disease_name': ['Pneumonia', 'Bone Fractures', 'Pneumonia', 'Tumors'],
+        'disease_type': ['Infectious', 'Acute', 'Infectious', 'Non-infectious'],
+        'severity': ['Moderate', 'Moderate', 'Moderate', 'Severe'],
+        'transmission_mode': ['Airborne', 'Indirect contact', 'Airborne', 'Indirect contact'],
+        'mortality_rate': [0.1, 0.01, 0.1, 0.2]
+    })
+
+def test_bulk_loader_matches_row_loader(tmp_path):
+    from Create_Schema import create_database_schema
+    from transform_to_silver import load_bulk, load_row_by_row, prepare_dataframe
+
+    # A treatment without an outcome date has no quarter or report duration (stored as NULL)
+    df = make_processed_frame()
+    df.loc[3, 'treatment_outcome_date'] = None
+    tables = {}
+    for name, loader in [('row', load_row_by_row), ('bulk', load_bulk)]:
+        db_path = str(tmp_path / f"{name}.db")
+        create_database_schema(db_path)
+        conn = sqlite3.connect(db_path)
+        loader(conn, prepare_dataframe(df.copy()))
+        conn.commit()
+        tables[name] = {t: pd.read_sql_query(f"SELECT * FROM {t}", conn)
+                        for t in ['PATIENT', 'PROVIDER', 'DISEASE', 'LOCATION', 'TREATMENT']}
+        conn.close()
+
+    for table, expected in tables['row'].items():
+        pd.testing.assert_frame_equal(tables['bulk'][table], expected, obj=table)
+    assert len(tables['bulk']['PROVIDER']) == 3, "Hospital change should create a second provider version"
+
+def test_iter_new_rows_returns_only_appended_rows(tmp_path):
+    from load_state import iter_new_rows
+
+    csv_path = tmp_path / "processed.csv"
+    df = make_processed_frame()
+    df.iloc[:3].to_csv(csv_path, index=False)
+
+    ((first, offset),) = iter_new_rows(csv_path, 0, batch_rows=0)
+    assert first['treatment_id'].tolist() == [1, 2, 3]
+
+    df.iloc[3:].to_csv(csv_path, mode='a', header=False, index=False)
+    ((second, end_offset),) = iter_new_rows(csv_path, offset, batch_rows=0)
+    assert second['treatment_id'].tolist() == [4]
+    assert list(second.columns) == list(df.columns)
+    assert end_offset == os.path.getsize(csv_path)
+
+    assert list(iter_new_rows(csv_path, end_offset)) == []
+
+def test_iter_new_rows_resumes_from_a_mid_file_checkpoint(tmp_path):
+    from load_state import iter_new_rows
+
+    csv_path = tmp_path / "processed.csv"
+    df = make_processed_frame()
+    df.to_csv(csv_path, index=False)
+    whole = pd.read_csv(csv_path)
+
+    # The batch after the first one fails: the run keeps the watermark of the first batch only
+    batches = iter_new_rows(csv_path, 0, batch_rows=3)
+    first, checkpoint = next(batches)
+    assert first['treatment_id'].tolist() == [1, 2, 3]
+    assert 0 < checkpoint < os.path.getsize(csv_path)
+    batches.close()
+
+    # Rows appended meanwhile, the last one still being written without its newline
+    appended = df.iloc[[0, 1]].assign(treatment_id=[5, 6]).to_csv(index=False, header=False)
+    with open(csv_path, 'a', newline='') as f:
+        f.write(appended[:-5])
+    resumed = list(iter_new_rows(csv_path, checkpoint, batch_rows=3))
+    assert [batch['treatment_id'].tolist() for batch, _ in resumed] == [[4, 5]]
+    pd.testing.assert_frame_equal(resumed[0][0].iloc[[0]].reset_index(drop=True),
+                                  whole.iloc[[3]].reset_index(drop=True))
+
+    # The partial line is read once it is complete, from the watermark of the resumed batch
+    with open(csv_path, 'a', newline='') as f:
+        f.write(appended[-5:])
+    ((last, end_offset),) = iter_new_rows(csv_path, resumed[-1][1], batch_rows=3)
+    assert last['treatment_id'].tolist() == [6]
+    assert end_offset == os.path.getsize(csv_path)
+
+def test_provider_scd2_merge_matches_row_upserts(tmp_path, monkeypatch):
+    from Create_Schema import create_database_schema
+    import provider_scd_merge
+    from provider_scd_merge import PROVIDER_ATTRIBUTES, merge_provider_scd2
+    from transform_to_silver import upsert_provider_version
+
+    seed = [(1, 'Nandini', 'Srivastava', 8, 'Radiology', 'Mayo Clinic')]
+    batch = [
+        (1, 'Nandini', 'Srivastava', 8, 'Radiology', 'Mayo Clinic'),
+        (1, 'Nandini', 'Srivastava', 8, 'Radiology', 'Cleveland Clinic'),
+        (2, 'Arjun', 'Rao', 3, 'Cardiology', 'Mount Sinai Hospital'),
+        (1, 'Nandini', 'Srivastava', 8, 'Radiology', 'Mayo Clinic'),
+        (2, 'Arjun', 'Rao', 3, 'Cardiology', 'Mount Sinai Hospital'),
+    ]
+
+    results = {}
+    for name in ['row', 'merge', 'colliding_hashes']:
+        if name == 'colliding_hashes':
+            # Every row hashes alike: changes are still found on the values
+            monkeypatch.setattr(provider_scd_merge.pd.util, 'hash_pandas_object',
+                                lambda df, index: pd.Series(0, index=df.index, dtype='uint64'))
+        db_path = str(tmp_path / f"{name}.db")
+        create_database_schema(db_path)
+        conn = sqlite3.connect(db_path)
+        for provider in seed:
+            upsert_provider_version(conn.cursor(), provider, '2024-01-01')
+        if name == 'row':
+            inserted = sum(upsert_provider_version(conn.cursor(), p, '2024-06-01') for p in batch)
+        else:
+            inserted = merge_provider_scd2(conn, pd.DataFrame(batch, columns=['Provider_ID'] + PROVIDER_ATTRIBUTES), '2024-06-01')
+        conn.commit()
+        results[name] = (inserted, pd.read_sql_query("SELECT * FROM PROVIDER ORDER BY Version_ID", conn))
+        conn.close()
+
+    monkeypatch.undo()
+
+    for name in ['merge', 'colliding_hashes']:
+        assert results[name][0] == results['row'][0] == 3
+        pd.testing.assert_frame_equal(results[name][1], results['row'][1])
+
+def test_mappings_remap_categories():
+    from mappings import apply_mappings, apply_hospital_mapping
+
+    df = pd.DataFrame({
+        'state': ['Haryana', 'Washington', None, 'Punjab'],
+        'city': ['Pune', 'Pune', 'Jaipur', 'Seattle'],
+        'country': ['India'] * 4,
+        'affiliated_hospital': ['AIIMS', 'Unknown Clinic', 'AIIMS', 'Fortis Hospital']
+    })
+    result = apply_hospital_mapping(apply_mappings(df))
+
+    assert isinstance(result['state'].dtype, pd.CategoricalDtype)
+    assert result['state'].astype(object).where(result['state'].notna(), None).tolist() == ['Washington', 'Washington', None, 'New Jersey']
+    assert result['city'].astype(str).tolist() == ['Boston', 'Boston', 'Miami', 'Seattle']
+    assert result['country'].astype(str).unique().tolist() == ['United States']
+    assert result['affiliated_hospital'].astype(str).tolist() == [
+        'Mayo Clinic', 'Unknown Clinic', 'Mayo Clinic', 'Washington University in St. Louis Medical Center']
+
+def test_bulk_load_profile_restores_settings_and_indexes(tmp_path):
+    from Create_Schema import create_database_schema
+    from Create_Indexes import create_indexes
+    from sqlite_tuning import bulk_load_profile
+
+    db_path = str(tmp_path / "tuned.db")
+    create_database_schema(db_path)
+    create_indexes(db_path)
+    conn = sqlite3.connect(db_path)
+    index_count = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = 'TREATMENT'"
+    indexes_before = conn.execute(index_count).fetchone()[0]
+
+    with bulk_load_profile(conn, drop_indexes=True):
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        # Only the indexes the loader reads are left
+        assert {name for (name,) in conn.execute(index_count.replace('COUNT(*)', 'name'))} == \
+            {'idx_treatment_source', 'idx_treatment_patient', 'idx_treatment_location', 'idx_disease'}
+        conn.execute("INSERT INTO TREATMENT (Treatment_ID, Cost) VALUES (1, 10.0)")
+
+    with pytest.raises(RuntimeError):
+        with bulk_load_profile(conn, drop_indexes=True):
+            conn.execute("INSERT INTO TREATMENT (Treatment_ID, Cost) VALUES (2, 20.0)")
+            raise RuntimeError("load failed")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+    assert conn.execute(index_count).fetchone()[0] == indexes_before
+    assert conn.execute("SELECT Treatment_ID FROM TREATMENT").fetchall() == [(1,)]
+    conn.close()
+
+def test_index_advisor_flags_scans_and_applies_indexes(tmp_path):
+    from Create_Schema import create_database_schema
+    from index_advisor import RECOMMENDED_INDEXES, advise, analyze_workload
+
+    db_path = str(tmp_path / "advisor.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO TREATMENT (Treatment_ID, Provider_ID, Cost, Effectiveness_Score) VALUES (?, ?, ?, ?)",
+                     [(i, i % 7, 100.0 + i, i % 6) for i in range(1, 201)])
+    conn.commit()
+    report = analyze_workload(conn, repeat=1)
+    assert 'full scan of TREATMENT' in report['provider_treatment_stats']['issues']
+
+    conn.close()
+
+    assert advise(db_path, apply=True, repeat=1) == 0
+    conn = sqlite3.connect(db_path)
+    report = analyze_workload(conn, repeat=1)
+    assert 'full scan of TREATMENT' not in report['provider_treatment_stats']['issues']
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {name for name, _, _ in RECOMMENDED_INDEXES} <= existing
+    conn.close()
+
+def test_incremental_aggregates_match_full_rebuild(tmp_path):
+    from Create_Schema import create_database_schema
+    from aggregates import AGGREGATE_TABLES, rebuild_aggregates
+    from analytics_queries import AGGREGATE_QUERIES, ANALYTICAL_QUERIES
+    from transform_to_silver import load_frame
+
+    db_path = str(tmp_path / "aggregates.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    df = make_processed_frame()
+    for batch in [df.iloc[:2], df.iloc[2:]]:
+        load_frame(conn, batch.copy(), 'bulk')
+        conn.commit()
+
+    incremental = {t: pd.read_sql_query(f"SELECT * FROM {t} ORDER BY 1, 2, 3, 4", conn) for t in AGGREGATE_TABLES}
+    rebuild_aggregates(conn)
+    for table, frame in incremental.items():
+        pd.testing.assert_frame_equal(frame, pd.read_sql_query(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4", conn), obj=table)
+
+    for name, query in AGGREGATE_QUERIES.items():
+        expected = sorted(conn.execute(ANALYTICAL_QUERIES[name]['sql'], query['params']).fetchall(), key=str)
+        assert sorted(conn.execute(query['sql'], query['params']).fetchall(), key=str) == pytest.approx(expected), name
+    conn.close()
+
+def test_dimension_cache_resolves_known_members_in_memory(tmp_path):
+    from Create_Schema import create_database_schema
+    from dimension_cache import DimensionKeyCache
+    from transform_to_silver import load_bulk, prepare_dataframe
+
+    db_path = str(tmp_path / "cache.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    first = DimensionKeyCache(conn)
+    load_bulk(conn, prepare_dataframe(make_processed_frame()), first)
+    conn.commit()
+    assert first.stats['LOCATION'] == {'hits': 1, 'misses': 3}
+    assert first.stats['PATIENT'] == {'hits': 1, 'misses': 3}
+
+    cache = DimensionKeyCache(conn)
+    assert cache.locations == first.locations
+    counts = load_bulk(conn, prepare_dataframe(make_processed_frame()), cache)
+    assert counts['patients'] == counts['diseases'] == counts['locations'] == 0
+    assert all(counter == {'hits': 4, 'misses': 0} for counter in cache.stats.values())
+    conn.close()
+
+def test_run_metrics_time_stages_and_count_statements(tmp_path):
+    import json
+    from Create_Schema import create_database_schema
+    from instrumentation import RunMetrics, connect_with_metrics
+    from transform_to_silver import load_frame
+
+    db_path = str(tmp_path / "metrics.db")
+    create_database_schema(db_path)
+    metrics = RunMetrics('silver', {'mode': 'bulk'})
+    conn = connect_with_metrics(db_path, metrics)
+    load_frame(conn, make_processed_frame(), 'bulk', metrics=metrics)
+    conn.commit()
+    metrics.finish()
+
+    report = json.loads(open(metrics.write_report(str(tmp_path / "run_reports"))).read())
+    assert {'date_features', 'provider_scd', 'treatments', 'aggregates'} <= set(report['stages'])
+    assert report['stages']['treatments']['rows'] == 4
+    assert report['sql']['TREATMENT']['INSERT'] == 4
+    assert report['sql']['PATIENT']['INSERT'] == 3
+
+    metrics.save_to_db(conn)
+    assert conn.execute("SELECT Run_Name, Status FROM RUN_METRICS").fetchall() == [('silver', 'success')]
+    conn.close()
+
+def test_synthetic_generator_layout_and_hospital_changes(tmp_path):
+    from generate_synthetic_data import RAW_COLUMNS, generate_raw_file
+    from file_processing import process_dataframe
+    from transform_to_silver import prepare_dataframe
+
+    paths = {}
+    for name, rate in [('stable', 0.0), ('moving', 1.0), ('moving_again', 1.0)]:
+        paths[name] = tmp_path / f"{name}.csv"
+        generate_raw_file(paths[name], 2000, seed=7, chunksize=700, providers=10, hospital_change_rate=rate)
+
+    raw = pd.read_csv(paths['moving'])
+    assert list(raw.columns) == RAW_COLUMNS
+    assert raw['treatment_id'].tolist() == list(range(1, 2001))
+    assert paths['moving'].read_bytes() == paths['moving_again'].read_bytes()
+    assert (raw.groupby('provider_id')['affiliated_hospital'].nunique() == 2).all()
+    assert (pd.read_csv(paths['stable']).groupby('provider_id')['affiliated_hospital'].nunique() == 1).all()
+
+    silver = prepare_dataframe(process_dataframe(raw))
+    assert silver['country'].unique().tolist() == ['United States']
+    assert silver['Report_Duration'].min() >= 0
+
+def test_manifest_skips_unchanged_and_reprocesses_redelivered_files(tmp_path):
+    import os
+    from run_etl import run_etl
+    from file_manifest import classify_file, open_manifest
+    from generate_synthetic_data import generate_raw_file
+
+    raw_dir = tmp_path / "Healthcare_ETL_Project" / "raw_data"
+    raw_dir.mkdir(parents=True)
+    raw_file = raw_dir / "batch.csv"
+    generate_raw_file(raw_file, 50, seed=1)
+    (tmp_path / "processed_files.txt").write_text("old.csv\n")
+
+    run_etl(base_dir=tmp_path)
+    manifest = open_manifest(tmp_path / "Healthcare_ETL_Project" / "processed" / "file_manifest.db")
+    status, delivery = classify_file(manifest, raw_file)
+    assert status == 'unchanged' and delivery['hash'] is None, "Unchanged stat should skip hashing"
+
+    os.utime(raw_file, ns=(0, 0))
+    assert classify_file(manifest, raw_file)[0] == 'unchanged'
+
+    generate_raw_file(raw_file, 50, seed=2)
+    assert classify_file(manifest, raw_file)[0] == 'changed'
+    manifest.close()
+
+    run_etl(base_dir=tmp_path)
+    processed = pd.read_csv(tmp_path / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv")
+    assert processed.groupby('source_batch')['source_file'].count().to_dict() == {1: 50, 2: 50}
+    run_etl(base_dir=tmp_path)
+    assert len(pd.read_csv(tmp_path / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv")) == 100
+
+def test_redelivered_source_replaces_its_treatment_partition(tmp_path):
+    from Create_Schema import create_database_schema
+    from aggregates import AGGREGATE_TABLES, rebuild_aggregates
+    from dimension_cache import DimensionKeyCache
+    from transform_to_silver import load_csv_source
+
+    db_path = str(tmp_path / "partitions.db")
+    csv_path = tmp_path / "processed.csv"
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    cache = DimensionKeyCache(conn)
+
+    df = make_processed_frame()
+    df['source_file'] = ['a.csv', 'a.csv', 'b.csv', 'b.csv']
+    df['source_batch'] = 1
+    df.to_csv(csv_path, index=False)
+    load_csv_source(conn, csv_path, 'bulk', cache)
+
+    # a.csv comes back without treatment 2 (the only one of patient 9) and with a corrected cost
+    redelivery = df.iloc[:1].assign(source_batch=2, treatment_cost=100.0)
+    redelivery.to_csv(csv_path, mode='a', header=False, index=False)
+    counts = load_csv_source(conn, csv_path, 'bulk', cache)
+    assert counts['treatments_deleted'] == 2 and counts['treatments'] == 1
+
+    treatments = conn.execute("SELECT Treatment_ID, Cost, Source_File, Source_Batch FROM TREATMENT ORDER BY 1").fetchall()
+    assert treatments == [(1, 100.0, 'a.csv', 2), (3, df['treatment_cost'][2], 'b.csv', 1),
+                          (4, df['treatment_cost'][3], 'b.csv', 1)]
+    assert 9 not in {patient_id for (patient_id,) in conn.execute("SELECT Patient_ID FROM PATIENT")}
+    assert 9 not in cache.patients and 36 not in cache.diseases
+
+    incremental = {t: pd.read_sql_query(f"SELECT * FROM {t} ORDER BY 1, 2, 3, 4", conn) for t in AGGREGATE_TABLES}
+    rebuild_aggregates(conn)
+    for table, frame in incremental.items():
+        pd.testing.assert_frame_equal(frame, pd.read_sql_query(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4", conn), obj=table)
+    conn.close()
+
+def test_pipelined_runner_matches_serial_bronze_and_silver(tmp_path):
+    from Create_Schema import create_database_schema
+    from generate_synthetic_data import generate_raw_file
+    from pipeline_runner import run_pipeline
+    from run_etl import run_etl
+    import transform_to_silver
+
+    tables = {}
+    for name in ['serial', 'pipelined']:
+        project_dir = tmp_path / name / "Healthcare_ETL_Project"
+        (project_dir / "raw_data").mkdir(parents=True)
+        (project_dir / "db").mkdir()
+        for seed in [1, 2]:
+            generate_raw_file(project_dir / "raw_data" / f"part_{seed}.csv", 900, seed=seed)
+        db_path = str(project_dir / "db" / "healthcare_data.db")
+        create_database_schema(db_path)
+        processed_csv = str(project_dir / "processed" / "Healthcare_Dataset.csv")
+        if name == 'serial':
+            run_etl(chunksize=250, base_dir=tmp_path / name)
+            transform_to_silver.main(db_path=db_path, processed_csv_path=processed_csv)
+        else:
+            counts = run_pipeline(base_dir=tmp_path / name, chunksize=250, workers=2, queue_size=2, commit_every=3)
+            assert counts['treatments'] == 900
+            assert run_pipeline(base_dir=tmp_path / name) == {}
+
+        conn = sqlite3.connect(db_path)
+        tables[name] = {t: pd.read_sql_query(f"SELECT * FROM {t} ORDER BY 1", conn)
+                        for t in ['TREATMENT', 'PATIENT', 'LOCATION', 'AGG_MONTHLY_COST']}
+        tables[name]['processed'] = pd.read_csv(processed_csv)
+        assert conn.execute("SELECT Byte_Offset FROM ETL_LOAD_STATE").fetchone()[0] == os.path.getsize(processed_csv)
+        conn.close()
+
+    for table, expected in tables['serial'].items():
+        pd.testing.assert_frame_equal(tables['pipelined'][table], expected, obj=table)
+
+def test_pipelined_runner_failing_mid_file_leaves_no_partial_rows(tmp_path):
+    from Create_Schema import create_database_schema
+    from file_manifest import classify_file, open_manifest
+    from generate_synthetic_data import generate_raw_file
+    from pipeline_runner import run_pipeline
+
+    outputs = {}
+    for name in ['expected', 'failing']:
+        project_dir = tmp_path / name / "Healthcare_ETL_Project"
+        raw_dir = project_dir / "raw_data"
+        raw_dir.mkdir(parents=True)
+        (project_dir / "db").mkdir()
+        db_path = str(project_dir / "db" / "healthcare_data.db")
+        create_database_schema(db_path)
+        processed_csv = project_dir / "processed" / "Healthcare_Dataset.csv"
+        for seed in [1, 2]:
+            generate_raw_file(raw_dir / f"part_{seed}.csv", 900, seed=seed)
+
+        if name == 'failing':
+            # The third chunk of part_2.csv cannot be parsed, after two of its chunks were committed
+            lines = (raw_dir / "part_2.csv").read_text().splitlines(keepends=True)
+            lines.insert(600, lines[600].rstrip('\n') + ',unexpected,fields\n')
+            (raw_dir / "part_2.csv").write_text(''.join(lines))
+            with pytest.raises(Exception):
+                run_pipeline(base_dir=tmp_path / name, chunksize=250, workers=2, queue_size=2, commit_every=1)
+            assert pd.read_csv(processed_csv)['source_file'].unique().tolist() == ['part_1.csv']
+            conn = sqlite3.connect(db_path)
+            assert conn.execute("SELECT Row_Offset, Byte_Offset FROM ETL_LOAD_STATE").fetchone() == \
+                (900, os.path.getsize(processed_csv))
+            conn.close()
+            manifest = open_manifest(project_dir / "processed" / "file_manifest.db")
+            assert [classify_file(manifest, raw_dir / f"part_{seed}.csv")[0] for seed in [1, 2]] == ['unchanged', 'new']
+            manifest.close()
+            generate_raw_file(raw_dir / "part_2.csv", 900, seed=2)
+
+        # The rerun appends part_2.csv once
+        run_pipeline(base_dir=tmp_path / name, chunksize=250, workers=2, queue_size=2, commit_every=1)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT Byte_Offset FROM ETL_LOAD_STATE").fetchone()[0] == os.path.getsize(processed_csv)
+        outputs[name] = (processed_csv.read_bytes(),
+                         pd.read_sql_query("SELECT * FROM TREATMENT ORDER BY Treatment_ID", conn))
+        conn.close()
+
+    assert outputs['failing'][0] == outputs['expected'][0]
+    pd.testing.assert_frame_equal(outputs['failing'][1], outputs['expected'][1])
+
+def test_provider_versions_stamped_on_load_and_as_of_lookups(tmp_path):
+    from Create_Schema import create_database_schema
+    from provider_history import ProviderHistory
+    from transform_to_silver import load_bulk, load_row_by_row, prepare_dataframe
+
+    treatments = {}
+    for name, loader in [('row', load_row_by_row), ('bulk', load_bulk)]:
+        db_path = str(tmp_path / f"{name}.db")
+        create_database_schema(db_path)
+        conn = sqlite3.connect(db_path)
+        loader(conn, prepare_dataframe(make_processed_frame()), stamp_versions=True)
+        conn.commit()
+        treatments[name] = pd.read_sql_query('''
+        SELECT t.Treatment_ID, t.Provider_Version_ID, p.Affiliated_Hospital
+        FROM TREATMENT t JOIN PROVIDER p ON p.Version_ID = t.Provider_Version_ID
+        ORDER BY t.Treatment_ID
+        ''', conn)
+        conn.close()
+    pd.testing.assert_frame_equal(treatments['bulk'], treatments['row'])
+    assert treatments['bulk']['Affiliated_Hospital'].tolist() == make_processed_frame()['affiliated_hospital'].tolist()
+
+    conn = sqlite3.connect(str(tmp_path / "bulk.db"))
+    conn.executemany('''
+    INSERT INTO PROVIDER (Version_ID, Provider_ID, Affiliated_Hospital, Valid_From, Valid_To, Is_Current)
+    VALUES (?, 7, ?, ?, ?, ?)
+    ''', [(100, 'Mayo Clinic', '2024-01-01', '2024-06-01', 0), (101, 'Cleveland Clinic', '2024-06-01', None, 1)])
+    history = ProviderHistory(conn)
+    dates = ['2023-12-31', '2024-01-01', '2024-05-31 23:59:59', '2024-06-01', '2030-01-01', None]
+    expected = [None, 100, 100, 101, 101, None]
+    assert [history.version_at(7, at) for at in dates] == expected
+    assert history.versions_at([7] * len(dates), dates).tolist() == [pd.NA if v is None else v for v in expected]
+    assert history.hospital_at(7, '2024-03-01') == 'Mayo Clinic'
+    assert history.version_at(999, '2024-03-01') is None
+    conn.close()
+
+def test_query_service_caches_results_until_the_data_version_changes(tmp_path):
+    from Create_Schema import create_database_schema
+    from load_state import get_data_version
+    from query_service import QueryService
+    from transform_to_silver import load_frame
+
+    db_path = str(tmp_path / "queries.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    df = make_processed_frame()
+    load_frame(conn, df.iloc[:2].copy(), 'bulk')
+    conn.commit()
+    assert get_data_version(conn) == 1
+
+    with QueryService(db_path, tmp_path / "cache", max_entries=2) as service:
+        first = service.run('provider_treatment_stats')
+        pd.testing.assert_frame_equal(service.run('provider_treatment_stats'), first)
+        assert service.stats == {'hits': 1, 'misses': 1}
+
+        load_frame(conn, df.iloc[2:].copy(), 'bulk')
+        conn.commit()
+        assert service.run('provider_treatment_stats')['Treatment_Count'].sum() == 4
+        assert service.stats['misses'] == 2
+        assert len(list((tmp_path / "cache").glob("v1.*"))) == 0, "Results of the old version should be dropped"
+
+        service.run('top_providers_by_effectiveness', top_n=1)
+        service.run('avg_duration_by_type')
+        assert len(list((tmp_path / "cache").glob("*.pkl"))) == 2
+        service.run('avg_duration_by_type')
+        service.run('provider_treatment_stats')
+        assert service.stats['hits'] == 2, "The least recently used result should have been evicted"
+    conn.close()
+
+def test_staged_hospital_reassignment_matches_scd_trigger(tmp_path):
+    from Create_Schema import create_database_schema
+    from provider_scd_merge import PROVIDER_ATTRIBUTES, merge_provider_scd2, reassign_hospitals
+
+    providers = pd.DataFrame([(1, 'Nandini', 'Srivastava', 8, 'Radiology', 'Mayo Clinic'),
+                              (2, 'Arjun', 'Rao', 3, 'Cardiology', 'Mount Sinai Hospital'),
+                              (3, 'Kian', 'Menon', 5, 'Oncology', 'Cleveland Clinic')],
+                             columns=['Provider_ID'] + PROVIDER_ATTRIBUTES)
+    reassignments = pd.DataFrame({'Provider_ID': [2, 1, 1, 99],
+                                  'Affiliated_Hospital': ['Mayo Clinic', 'Cleveland Clinic', 'Johns Hopkins Hospital', 'Mayo Clinic']})
+
+    tables = {}
+    for name in ['trigger', 'staged']:
+        db_path = str(tmp_path / f"{name}.db")
+        create_database_schema(db_path, scd_trigger=(name == 'trigger'))
+        conn = sqlite3.connect(db_path)
+        merge_provider_scd2(conn, providers, '2024-01-01')
+        if name == 'trigger':
+            conn.executemany('UPDATE PROVIDER SET Affiliated_Hospital = ? WHERE Provider_ID = ? AND Is_Current = 1',
+                             [(hospital, provider_id) for provider_id, hospital in
+                              reassignments.drop_duplicates('Provider_ID', keep='last').itertuples(index=False)])
+        else:
+            assert reassign_hospitals(conn, reassignments) == 2
+        conn.commit()
+        tables[name] = {
+            'PROVIDER': pd.read_sql_query('''
+            SELECT Version_ID, Provider_ID, First_Name, Affiliated_Hospital, Is_Current, Valid_To IS NULL AS Open_Ended
+            FROM PROVIDER ORDER BY Version_ID''', conn),
+            'PROVIDER_LOG': pd.read_sql_query('SELECT Log_ID, Provider_ID, Version_ID, Action FROM PROVIDER_LOG', conn)
+        }
+        conn.close()
+
+    for table, expected in tables['trigger'].items():
+        pd.testing.assert_frame_equal(tables['staged'][table], expected, obj=table)
+    assert len(tables['staged']['PROVIDER']) == 5 and tables['staged']['PROVIDER']['Is_Current'].sum() == 3
+
+def test_schema_manifest_types_reads_and_keeps_stored_values(tmp_path):
+    from load_state import iter_new_rows
+    from schema_manifest import widen_floats
+    from transform_to_silver import SOURCE_COLUMNS
+
+    csv_path = tmp_path / "processed.csv"
+    df = make_processed_frame()
+    df['treatment_cost'] = [1176.47, 0.01, 99999.99, 291.1]
+    df['extra'] = 'not read'
+    df.to_csv(csv_path, index=False)
+
+    ((typed, _),) = iter_new_rows(str(csv_path), 0, SOURCE_COLUMNS, batch_rows=0)
+    assert 'extra' not in typed.columns
+    assert typed['treatment_id'].dtype == 'Int32' and typed['age'].dtype == 'Int16'
+    assert typed['treatment_cost'].dtype == 'float32'
+    assert isinstance(typed['gender'].dtype, pd.CategoricalDtype)
+    assert typed['treatment_outcome_date'].dtype.kind == 'M'
+
+    widened = widen_floats(typed)
+    assert widened['treatment_cost'].tolist() == df['treatment_cost'].tolist()
+    assert widened['mortality_rate'].tolist() == df['mortality_rate'].tolist()
+
+def test_duckdb_engine_matches_sqlite_and_follows_loads(tmp_path):
+    pytest.importorskip('duckdb')
+    from Create_Schema import create_database_schema
+    from analytics_engine import DuckDBEngine, SQLiteEngine
+    from analytics_queries import ANALYTICAL_QUERIES
+    from transform_to_silver import load_frame
+
+    db_path = str(tmp_path / "analytics.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    df = make_processed_frame()
+    load_frame(conn, df.iloc[:2].copy(), 'bulk')
+    conn.commit()
+
+    with SQLiteEngine(db_path) as sqlite_engine, DuckDBEngine(db_path) as duck_engine:
+        for name in ANALYTICAL_QUERIES:
+            expected, actual = sqlite_engine.run(name), duck_engine.run(name)
+            assert list(actual.columns) == list(expected.columns), name
+            # Queries without ORDER BY return their groups in any order
+            actual, expected = [frame.astype(object).where(frame.notna(), None).astype(str)
+                                .sort_values(list(frame.columns)).reset_index(drop=True)
+                                for frame in (actual, expected)]
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, obj=name)
+        assert not duck_engine.refresh(), "The mirror should be current"
+
+        load_frame(conn, df.iloc[2:].copy(), 'bulk')
+        conn.commit()
+        assert duck_engine.run('provider_treatment_stats')['Treatment_Count'].sum() == 4
+    conn.close()
+
+def test_partitioned_treatments_route_by_year_and_seal_closed_years(tmp_path):
+    from Create_Schema import create_database_schema
+    from Create_Indexes import create_indexes
+    from analytics_engine import SQLiteEngine
+    from analytics_queries import ANALYTICAL_QUERIES
+    from transform_to_silver import load_frame
+    from treatment_partitions import list_partitions, seal_partitions
+
+    df = make_processed_frame()
+    df['treatment_outcome_date'] = ['2023-12-30 08:00:00', '2024-01-07 09:30:00', '2025-02-14 10:00:00', None]
+    connections = {}
+    for layout in ['table', 'partitioned']:
+        db_path = str(tmp_path / f"{layout}.db")
+        create_database_schema(db_path, partitioned=layout == 'partitioned')
+        conn = connections[layout] = sqlite3.connect(db_path)
+        load_frame(conn, df.iloc[:2].copy(), 'row')
+        load_frame(conn, df.iloc[2:].copy(), 'bulk')
+        conn.commit()
+
+    conn = connections['partitioned']
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'TREATMENT'").fetchone() == ('view',)
+    assert list_partitions(conn) == ['TREATMENT_2023', 'TREATMENT_2024', 'TREATMENT_2025', 'TREATMENT_UNDATED']
+    assert [conn.execute(f"SELECT Treatment_ID FROM {table}").fetchall() for table in list_partitions(conn)] == \
+        [[(1,)], [(2,)], [(3,)], [(4,)]]
+    pd.testing.assert_frame_equal(pd.read_sql_query("SELECT * FROM TREATMENT ORDER BY 1", conn),
+                                  pd.read_sql_query("SELECT * FROM TREATMENT ORDER BY 1", connections['table']))
+
+    # The named queries give the same answers, the year-bounded one reading only its partitions
+    with SQLiteEngine(str(tmp_path / "table.db")) as table, SQLiteEngine(str(tmp_path / "partitioned.db")) as partitioned:
+        for name in ANALYTICAL_QUERIES:
+            expected, actual = table.run(name), partitioned.run(name)
+            pd.testing.assert_frame_equal(actual.sort_values(list(actual.columns)).reset_index(drop=True),
+                                          expected.sort_values(list(expected.columns)).reset_index(drop=True), obj=name)
+        assert partitioned.run('monthly_average_cost', start_year='2024', end_year='2024')['Month'].tolist() == ['01']
+        assert partitioned.conn.execute("SELECT name FROM sqlite_temp_master").fetchall() == []
+
+    # Sealed years reject writes, loads skip their rows, and they are left out of index builds
+    assert seal_partitions(conn, 2025) == ['TREATMENT_2023', 'TREATMENT_2024']
+    conn.commit()
+    with pytest.raises(sqlite3.IntegrityError, match="TREATMENT_2024 is sealed"):
+        conn.execute("DELETE FROM TREATMENT_2024")
+    late = df.iloc[1:2].assign(treatment_id=5)
+    assert load_frame(conn, late.copy(), 'bulk') == {'sealed_skipped': 1}
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM TREATMENT WHERE Treatment_ID = 5").fetchone() == (0,)
+    create_indexes(str(tmp_path / "partitioned.db"))
+    indexed = {table for (table,) in conn.execute("SELECT tbl_name FROM sqlite_master WHERE name LIKE 'idx_treatment_type%'")}
+    assert indexed == {'TREATMENT_2025', 'TREATMENT_UNDATED'}
+    for conn in connections.values():
+        conn.close()
+
+def test_batched_silver_load_resumes_from_the_last_checkpoint(tmp_path, monkeypatch):
+    import transform_to_silver
+    from Create_Schema import create_database_schema
+    from load_state import get_load_state
+
+    csv_path = tmp_path / "processed.csv"
+    make_processed_frame().to_csv(csv_path, index=False)
+    connections = {}
+    for name in ['single', 'batched']:
+        create_database_schema(str(tmp_path / f"{name}.db"))
+        connections[name] = sqlite3.connect(str(tmp_path / f"{name}.db"))
+    transform_to_silver.load_csv_source(connections['single'], str(csv_path), 'bulk', batch_rows=0)
+
+    # The second batch fails: the first one stays committed with its checkpoint
+    conn = connections['batched']
+    load_frame, calls = transform_to_silver.load_frame, []
+    def failing_load_frame(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        return load_frame(*args, **kwargs)
+    monkeypatch.setattr(transform_to_silver, 'load_frame', failing_load_frame)
+    with pytest.raises(sqlite3.OperationalError):
+        transform_to_silver.load_csv_source(conn, str(csv_path), 'bulk', batch_rows=2)
+    conn.rollback()
+    assert get_load_state(conn, 'processed.csv')[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM TREATMENT").fetchone() == (2,)
+
+    # The rerun resumes at row 3; provider 1 changes hospital in row 4, in a batch of its own
+    monkeypatch.undo()
+    counts = transform_to_silver.load_csv_source(conn, str(csv_path), 'bulk', batch_rows=1)
+    assert counts['treatments'] == 2
+    assert get_load_state(conn, 'processed.csv')[0] == 4
+    for sql in ["SELECT * FROM TREATMENT ORDER BY Treatment_ID",
+                "SELECT Provider_ID, Affiliated_Hospital, Valid_From, Valid_To, Is_Current FROM PROVIDER ORDER BY 1, 3, 5",
+                "SELECT * FROM PATIENT ORDER BY 1", "SELECT * FROM AGG_MONTHLY_COST ORDER BY 1"]:
+        pd.testing.assert_frame_equal(pd.read_sql_query(sql, conn), pd.read_sql_query(sql, connections['single']))
+    for conn in connections.values():
+        conn.close()
+
+def test_validation_quarantines_bad_rows_and_loads_the_rest(tmp_path):
+    from Create_Schema import create_database_schema
+    from transform_to_silver import load_csv_source, load_frame
+    from load_state import get_load_state
+
+    df = make_processed_frame()
+    bad = df.iloc[[0, 1, 2]].copy()
+    bad['treatment_id'] = [5, 6, 7]
+    bad['treatment_outcome_date'] = ['2024-02-30 08:00:00', '2024-01-07 09:30:00', '2024-02-14 10:00:00']
+    bad['provider_name'] = ['Nandini Srivastava', 'Madonna', 'Arjun Rao']
+    bad['treatment_outcome_status'] = ['successful', 'stable', 'Bogus']
+    bad['patient_name'] = ['Kian Menon', 'Kian Joshi', 'Cher']
+    csv_path = tmp_path / "processed.csv"
+    pd.concat([df, bad]).to_csv(csv_path, index=False)
+    create_database_schema(str(tmp_path / "healthcare.db"))
+    conn = sqlite3.connect(str(tmp_path / "healthcare.db"))
+
+    counts = load_csv_source(conn, str(csv_path), 'bulk', batch_rows=0)
+    assert counts['treatments'] == 4 and counts['quarantined'] == 3
+    assert [key for (key,) in conn.execute("SELECT Treatment_ID FROM TREATMENT ORDER BY 1")] == [1, 2, 3, 4]
+    assert conn.execute("SELECT Treatment_ID, Reason FROM QUARANTINE ORDER BY 1").fetchall() == [
+        (5, 'unparseable treatment_outcome_date'),
+        (6, 'provider_name without first and last name'),
+        (7, 'patient_name without first and last name; unknown treatment_outcome_status')]
+    assert '2024-02-30' in conn.execute("SELECT Row_Data FROM QUARANTINE WHERE Treatment_ID = 5").fetchone()[0]
+    # The checkpoint moves past the quarantined rows, so they are not read again
+    assert get_load_state(conn, 'processed.csv')[0] == 7
+
+    # A corrected row loads and leaves the quarantine
+    fixed = bad.iloc[[1]].copy()
+    fixed['provider_name'] = 'Madonna Ciccone'
+    assert load_frame(conn, fixed, 'bulk')['treatments'] == 1
+    assert [key for (key,) in conn.execute("SELECT Treatment_ID FROM QUARANTINE ORDER BY 1")] == [5, 7]
+    conn.close()
+
+def test_chunked_streaming_matches_whole_file_processing(tmp_path):
+    from generate_synthetic_data import RAW_COLUMNS, generate_raw_file
+    from run_etl import process_file
+
+    raw_file = tmp_path / "raw.csv"
+    generate_raw_file(raw_file, 1003, seed=3)
+    header_only = tmp_path / "header_only.csv"
+    header_only.write_text(','.join(RAW_COLUMNS) + '\n')
+
+    # 1003 rows do not fill the last chunk of 250
+    for source, expected_rows in [(raw_file, 1003), (header_only, 0)]:
+        outputs = {}
+        for chunksize in [0, 250]:
+            output_path = tmp_path / f"{source.stem}_{chunksize}.csv"
+            rows, _, _ = process_file(source, output_path, chunksize, source=(source.name, 1))
+            assert rows == expected_rows
+            outputs[chunksize] = output_path.read_bytes()
+        assert outputs[250] == outputs[0]
+        assert len(pd.read_csv(tmp_path / f"{source.stem}_250.csv")) == expected_rows
+
+def test_parallel_bronze_matches_serial_and_recovers_from_a_failed_worker(tmp_path):
+    from run_etl import run_etl
+    from file_manifest import classify_file, open_manifest
+    from generate_synthetic_data import generate_raw_file
+
+    outputs = {}
+    for name, workers in [('serial', 1), ('parallel', 2)]:
+        raw_dir = tmp_path / name / "Healthcare_ETL_Project" / "raw_data"
+        raw_dir.mkdir(parents=True)
+        for seed, stem in enumerate(['c', 'a', 'b'], start=1):
+            generate_raw_file(raw_dir / f"{stem}.csv", 300, seed=seed)
+        run_etl(chunksize=100, base_dir=tmp_path / name, workers=workers)
+        outputs[name] = (tmp_path / name / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv").read_bytes()
+    assert outputs['parallel'] == outputs['serial']
+    assert pd.read_csv(io.BytesIO(outputs['serial']))['source_file'].unique().tolist() == ['a.csv', 'b.csv', 'c.csv']
+
+    # b.csv cannot be transformed: a.csv is kept, b.csv and c.csv stay pending and no part file is left behind
+    project_dir = tmp_path / "failing" / "Healthcare_ETL_Project"
+    raw_dir = project_dir / "raw_data"
+    raw_dir.mkdir(parents=True)
+    for seed, stem in enumerate(['c', 'a'], start=1):
+        generate_raw_file(raw_dir / f"{stem}.csv", 300, seed=seed)
+    (raw_dir / "b.csv").write_text("unexpected,layout\n1,2\n")
+    with pytest.raises(KeyError):
+        run_etl(chunksize=100, base_dir=tmp_path / "failing", workers=2)
+    assert not (project_dir / "processed" / ".parts").exists()
+    manifest = open_manifest(project_dir / "processed" / "file_manifest.db")
+    assert [classify_file(manifest, raw_dir / f"{stem}.csv")[0] for stem in 'abc'] == ['unchanged', 'new', 'new']
+    manifest.close()
+
+    generate_raw_file(raw_dir / "b.csv", 300, seed=3)
+    run_etl(chunksize=100, base_dir=tmp_path / "failing", workers=2)
+    assert (project_dir / "processed" / "Healthcare_Dataset.csv").read_bytes() == outputs['serial']
+
+def test_serial_bronze_failing_mid_file_leaves_no_partial_rows(tmp_path, monkeypatch):
+    import file_processing
+    from run_etl import run_etl
+    from generate_synthetic_data import generate_raw_file
+
+    expected_dir = tmp_path / "expected" / "Healthcare_ETL_Project" / "raw_data"
+    expected_dir.mkdir(parents=True)
+    generate_raw_file(expected_dir / "a.csv", 300, seed=1)
+    run_etl(chunksize=100, base_dir=tmp_path / "expected")
+    expected = (tmp_path / "expected" / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv").read_bytes()
+
+    # The second chunk fails after the first one is written: nothing of the file reaches the processed CSV
+    project_dir = tmp_path / "failing" / "Healthcare_ETL_Project"
+    (project_dir / "raw_data").mkdir(parents=True)
+    generate_raw_file(project_dir / "raw_data" / "a.csv", 300, seed=1)
+    process_dataframe = file_processing.process_dataframe
+    calls = []
+    def failing_process_dataframe(df):
+        calls.append(len(df))
+        if len(calls) == 2:
+            raise RuntimeError("worker killed")
+        return process_dataframe(df)
+    monkeypatch.setattr(file_processing, 'process_dataframe', failing_process_dataframe)
+    with pytest.raises(RuntimeError):
+        run_etl(chunksize=100, base_dir=tmp_path / "failing")
+    monkeypatch.undo()
+    assert not (project_dir / "processed" / "Healthcare_Dataset.csv").exists()
+    assert not (project_dir / "processed" / ".parts").exists()
+
+    # The rerun processes the file once
+    run_etl(chunksize=100, base_dir=tmp_path / "failing")
+    assert (project_dir / "processed" / "Healthcare_Dataset.csv").read_bytes() == expected
+
+def test_parquet_round_trip_loads_the_same_silver_tables_as_csv(tmp_path):
+    from Create_Schema import create_database_schema
+    from generate_synthetic_data import generate_raw_file
+    from run_etl import run_etl
+    from columnar_store import list_parquet_sources, read_parquet_source
+    from schema_manifest import read_options, read_header, coerce_types
+    from file_processing import LINEAGE_COLUMNS
+    import transform_to_silver
+
+    tables = {}
+    for output_format in ['csv', 'parquet']:
+        project_dir = tmp_path / output_format / "Healthcare_ETL_Project"
+        (project_dir / "raw_data").mkdir(parents=True)
+        (project_dir / "db").mkdir()
+        generate_raw_file(project_dir / "raw_data" / "part_1.csv", 800, seed=1)
+        run_etl(chunksize=150, base_dir=tmp_path / output_format, output_format=output_format)
+        db_path = str(project_dir / "db" / "healthcare_data.db")
+        create_database_schema(db_path)
+        transform_to_silver.main(db_path=db_path, input_format=output_format,
+                                 processed_csv_path=str(project_dir / "processed" / "Healthcare_Dataset.csv"))
+        conn = sqlite3.connect(db_path)
+        tables[output_format] = {t: pd.read_sql_query(f"SELECT * FROM {t} ORDER BY 1", conn)
+                                 for t in ['TREATMENT', 'PATIENT', 'DISEASE', 'LOCATION', 'AGG_MONTHLY_COST']}
+        tables[output_format]['PROVIDER'] = pd.read_sql_query(
+            "SELECT * FROM PROVIDER ORDER BY Provider_ID, Version_ID", conn)
+        conn.close()
+
+    for table, expected in tables['csv'].items():
+        pd.testing.assert_frame_equal(tables['parquet'][table], expected, obj=table)
+    assert tables['parquet']['TREATMENT'].groupby(['Source_File', 'Source_Batch']).size().to_dict() == {
+        ('part_1.csv', 1): 800}
+
+    # The Parquet read gives the processed columns the same types as the CSV read
+    columns = transform_to_silver.SOURCE_COLUMNS + LINEAGE_COLUMNS
+    processed_csv = tmp_path / "csv" / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv"
+    from_csv = coerce_types(pd.read_csv(processed_csv, **read_options(read_header(processed_csv), columns)))
+    from_parquet = pd.concat([read_parquet_source(path, columns=columns) for path in
+                              list_parquet_sources(tmp_path / "parquet" / "Healthcare_ETL_Project" / "processed" / "parquet")],
+                             ignore_index=True)
+    assert from_parquet.dtypes.astype(str).to_dict() == from_csv[from_parquet.columns].dtypes.astype(str).to_dict()
+
+def test_derive_date_features_pins_known_dates_and_missing_values():
+    from transform_to_silver import derive_date_features
+
+    # Quarter boundaries, weekend days, a date before 1970 and missing dates
+    df = pd.DataFrame({
+        'treatment_start_date': ['2024-03-01 08:00', '2024-03-20 10:00', '2023-12-01', '1969-12-01', None, '2024-05-01'],
+        'treatment_completion_date': ['2024-03-29 17:00', '2024-03-30 10:00', '2023-12-24', '1969-12-30', None, None],
+        'treatment_outcome_date': ['2024-03-31 23:59', '2024-04-01 00:01', '2023-12-30', '1969-12-31', None, '2024-05-04']
+    }).apply(pd.to_datetime, format='ISO8601')
+    result = derive_date_features(df)
+
+    assert result['treatment_outcome_date'].tolist()[:4] == ['2024-03-31', '2024-04-01', '2023-12-30', '1969-12-31']
+    assert result['treatment_end_date'].tolist()[:4] == ['2024-03-29', '2024-03-30', '2023-12-24', '1969-12-30']
+    assert 'treatment_completion_date' not in result.columns
+    assert result['Outcome_Day'].tolist()[:4] == ['Sunday', 'Monday', 'Saturday', 'Wednesday']
+    assert result['Outcome_Day'].tolist()[5] == 'Saturday'
+    assert result['Outcome_Weekend_Flag'].tolist() == [1, 0, 1, 0, 0, 1]
+    assert result['Outcome_Quarter'].tolist() == [1, 2, 4, 4, pd.NA, 2]
+    assert result['Report_Duration'].tolist() == [2, 2, 6, 1, pd.NA, pd.NA]
+
+    # A missing date stays missing in every derived column
+    assert pd.isna(result.loc[4, 'treatment_outcome_date']) and pd.isna(result.loc[4, 'treatment_start_date'])
+    assert pd.isna(result.loc[4, 'Outcome_Day']) and pd.isna(result.loc[5, 'treatment_end_date'])
+
+def test_query_params_from_the_command_line_keep_the_default_types(tmp_path):
+    import subprocess
+    import sys
+    from Create_Schema import create_database_schema
+    from analytics_queries import ANALYTICAL_QUERIES
+    from query_service import parse_params
+    from transform_to_silver import load_frame
+
+    defaults = ANALYTICAL_QUERIES['top_providers_by_effectiveness']['params']
+    assert parse_params(['top_n=3'], defaults) == {'top_n': 3}
+    assert parse_params(['start_year=2020'], ANALYTICAL_QUERIES['monthly_average_cost']['params']) == {'start_year': '2020'}
+    assert parse_params(['since=-3 months']) == {'since': '-3 months'}
+    with pytest.raises(ValueError):
+        parse_params(['top_n=many'], defaults)
+
+    db_path = str(tmp_path / "queries.db")
+    create_database_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    load_frame(conn, make_processed_frame(), 'bulk')
+    conn.commit()
+    conn.close()
+
+    # Digit-only years are compared as text with strftime('%Y', Outcome_Date)
+    result = subprocess.run([sys.executable, 'query_service.py', 'monthly_average_cost', '--db', db_path,
+                             '--cache-dir', str(tmp_path / "cache"), '--param', 'start_year=2020',
+                             '--param', 'end_year=2030'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "No data returned" not in result.stdout
+    assert "3 rows" in result.stdout
+
+def test_bronze_reads_raw_files_with_blank_keys_and_non_numeric_measures(tmp_path):
+    from run_etl import run_etl
+    from generate_synthetic_data import generate_raw_file
+
+    raw_dir = tmp_path / "Healthcare_ETL_Project" / "raw_data"
+    raw_dir.mkdir(parents=True)
+    raw_file = raw_dir / "dirty.csv"
+    generate_raw_file(raw_file, 20, seed=4)
+    raw = pd.read_csv(raw_file, dtype=str)
+    raw.loc[1, 'provider_id'] = None
+    raw.loc[2, 'treatment_cost'] = 'abc'
+    raw.loc[3, 'age'] = 'unknown'
+    raw.loc[4, 'treatment_duration'] = '3.5'
+    raw.loc[5, ['treatment_cost', 'mortality_rate']] = ['twelve', '1e400x']
+    raw.to_csv(raw_file, index=False)
+
+    # Every chunking reads the file: the values that are not numbers are listed and left empty
+    for chunksize in [0, 4]:
+        processed_csv = tmp_path / "Healthcare_ETL_Project" / "processed" / "Healthcare_Dataset.csv"
+        processed_csv.unlink(missing_ok=True)
+        (tmp_path / "Healthcare_ETL_Project" / "processed" / "file_manifest.db").unlink(missing_ok=True)
+        run_etl(chunksize=chunksize, base_dir=tmp_path)
+        processed = pd.read_csv(processed_csv)
+        assert len(processed) == 20
+        assert processed['invalid_values'].dropna().to_dict() == {
+            2: 'treatment_cost=abc', 3: 'age=unknown', 4: 'treatment_duration=3.5',
+            5: 'treatment_cost=twelve; mortality_rate=1e400x'}
+        assert processed.loc[1:5, ['provider_id', 'treatment_cost', 'age', 'treatment_duration']].isna().sum().to_dict() == {
+            'provider_id': 1, 'treatment_cost': 2, 'age': 1, 'treatment_duration': 1}
+        assert processed.loc[6:, 'treatment_cost'].notna().all()
+
+def test_rows_with_missing_keys_or_invalid_numbers_are_quarantined_and_the_rest_load(tmp_path):
+    from Create_Schema import create_database_schema
+    from generate_synthetic_data import generate_raw_file
+    from pipeline_runner import run_pipeline
+    from run_etl import run_etl
+    from load_state import get_load_state
+    import transform_to_silver
+
+    # The Parquet intermediate quarantines the same rows as the processed CSV
+    results = {}
+    for name in ['serial', 'parquet', 'pipelined']:
+        project_dir = tmp_path / name / "Healthcare_ETL_Project"
+        (project_dir / "raw_data").mkdir(parents=True)
+        (project_dir / "db").mkdir()
+        raw_file = project_dir / "raw_data" / "dirty.csv"
+        generate_raw_file(raw_file, 12, seed=5)
+        raw = pd.read_csv(raw_file, dtype=str)
+        raw.loc[1, 'provider_id'] = None
+        raw.loc[2, 'treatment_cost'] = 'abc'
+        raw.loc[3, 'patient_name'] = None
+        raw.loc[4, 'treatment_id'] = None
+        raw.loc[5, 'treatment_outcome_date'] = '2024-02-30 08:00:00'
+        raw.to_csv(raw_file, index=False)
+        db_path = str(project_dir / "db" / "healthcare_data.db")
+        create_database_schema(db_path)
+        if name == 'serial':
+            run_etl(chunksize=5, base_dir=tmp_path / name)
+            transform_to_silver.main(db_path=db_path,
+                                     processed_csv_path=str(project_dir / "processed" / "Healthcare_Dataset.csv"))
+        elif name == 'parquet':
+            run_etl(chunksize=5, base_dir=tmp_path / name, output_format='parquet')
+            transform_to_silver.main(db_path=db_path, input_format='parquet',
+                                     parquet_dir=str(project_dir / "processed" / "parquet"))
+        else:
+            run_pipeline(base_dir=tmp_path / name, chunksize=5, workers=2)
+
+        conn = sqlite3.connect(db_path)
+        loaded = [key for (key,) in conn.execute("SELECT Treatment_ID FROM TREATMENT ORDER BY 1")]
+        assert loaded == sorted(int(key) for key in raw['treatment_id'].drop([1, 2, 3, 4, 5]))
+        results[name] = conn.execute("SELECT Treatment_ID, Reason FROM QUARANTINE ORDER BY Quarantine_ID").fetchall()
+        assert results[name] == [
+            (int(raw.loc[1, 'treatment_id']), 'missing provider_id'),
+            (int(raw.loc[2, 'treatment_id']), 'invalid numbers'),
+            (int(raw.loc[3, 'treatment_id']), 'patient_name without first and last name'),
+            (None, 'missing treatment_id'),
+            (int(raw.loc[5, 'treatment_id']), 'unparseable treatment_outcome_date')]
+        assert 'treatment_cost=abc' in conn.execute(
+            "SELECT Row_Data FROM QUARANTINE WHERE Reason = 'invalid numbers'").fetchone()[0]
+        assert '2024-02-30' in conn.execute(
+            "SELECT Row_Data FROM QUARANTINE WHERE Reason LIKE 'unparseable%'").fetchone()[0]
+        # The watermark moves past the quarantined rows
+        source = 'parquet/dirty.parquet' if name == 'parquet' else 'Healthcare_Dataset.csv'
+        assert get_load_state(conn, source)[0] == 12
+        conn.close()
+
+    # A full reload replaces the entries, including the one without a Treatment_ID (read in one batch with
+    # the unparseable date, so its dates stay text)
+    transform_to_silver.main(db_path=db_path, processed_csv_path=str(project_dir / "processed" / "Healthcare_Dataset.csv"),
+                             full_reload=True)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT Treatment_ID, Reason FROM QUARANTINE ORDER BY Treatment_ID NULLS LAST").fetchall() == \
+        sorted(results['serial'], key=lambda entry: (entry[0] is None, entry[0]))
+    conn.close()
+
+def test_partitioned_treatments_keep_one_row_per_id_and_skip_sealed_years(tmp_path):
+    from Create_Schema import create_database_schema
+    from transform_to_silver import load_frame
+    from treatment_partitions import seal_partitions
+
+    df = make_processed_frame().assign(source_file='a.csv', source_batch=1)
+    df['treatment_outcome_date'] = ['2023-12-30 08:00:00', '2024-01-07 09:30:00', '2025-02-14 10:00:00', None]
+    # Treatment 2 again from another file with another outcome year, and file a.csv re-delivered with
+    # treatment 3 moved to 2024
+    moved = df.iloc[[1]].assign(source_file='b.csv', treatment_outcome_date='2025-03-01 10:00:00')
+    redelivered = df.assign(source_batch=2)
+    redelivered.loc[2, 'treatment_outcome_date'] = '2024-02-20 10:00:00'
+    tables = {}
+    for layout in ['table', 'partitioned']:
+        for mode in ['bulk', 'row']:
+            db_path = str(tmp_path / f"{layout}_{mode}.db")
+            create_database_schema(db_path, partitioned=layout == 'partitioned')
+            conn = sqlite3.connect(db_path)
+            for frame in [df, moved, redelivered]:
+                load_frame(conn, frame.copy(), mode)
+            conn.commit()
+            tables[layout, mode] = {table: pd.read_sql_query(f"SELECT * FROM {table} ORDER BY 1", conn)
+                                    for table in ['TREATMENT', 'AGG_MONTHLY_COST']}
+            for table, rows in tables[layout, mode].items():
+                pd.testing.assert_frame_equal(rows, tables['table', 'bulk'][table], obj=table)
+            conn.close()
+
+    # The treatment stays in the partition holding it; the re-delivered file's rows move to their new year
+    treatments = tables['partitioned', 'bulk']['TREATMENT']
+    assert treatments['Treatment_ID'].tolist() == [1, 2, 3, 4]
+    assert treatments.loc[1, ['Outcome_Date', 'Source_File']].tolist() == ['2024-01-07', 'a.csv']
+    assert treatments.loc[2, 'Outcome_Date'] == '2024-02-20'
+
+    # With 2023 and 2024 sealed, a re-delivery replaces the rows of the open partitions and skips the others,
+    # including treatment 3, which is stored in 2024 and now dated 2025
+    conn = sqlite3.connect(str(tmp_path / "partitioned_bulk.db"))
+    seal_partitions(conn, 2025)
+    conn.commit()
+    again = redelivered.assign(source_batch=3, treatment_cost=100.0)
+    again.loc[2, 'treatment_outcome_date'] = '2025-05-01 10:00:00'
+    counts = load_frame(conn, again.copy(), 'bulk')
+    conn.commit()
+    assert (counts['treatments_deleted'], counts['treatments'], counts['sealed_skipped']) == (1, 1, 3)
+    assert conn.execute("SELECT Treatment_ID, Cost FROM TREATMENT ORDER BY 1").fetchall() == [
+        (1, 546.94), (2, 342.94), (3, 406.53), (4, 100.0)]
+    conn.close()
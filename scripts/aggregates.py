@@ -0,0 +1,154 @@
+# aggregates.py
+import os
+import sys
+import sqlite3
+import argparse
+
+# Materialized aggregates over TREATMENT. Sums and counts are stored instead of averages so that
+# dashboards can roll partitions up (month -> quarter -> year, state/type -> total) exactly.
+AGGREGATE_TABLES = {
+    'AGG_MONTHLY_COST': '''
+    CREATE TABLE IF NOT EXISTS AGG_MONTHLY_COST (
+        Outcome_Year TEXT,
+        Outcome_Month TEXT,
+        Outcome_Quarter INTEGER,
+        State TEXT,
+        Type TEXT,
+        Treatment_Count INTEGER,
+        Total_Cost REAL,
+        Cost_Count INTEGER,
+        Effectiveness_Sum INTEGER,
+        Effectiveness_Count INTEGER,
+        UNIQUE (Outcome_Year, Outcome_Month, State, Type)
+    );
+    ''',
+    'AGG_PROVIDER_TREATMENTS': '''
+    CREATE TABLE IF NOT EXISTS AGG_PROVIDER_TREATMENTS (
+        Provider_ID INTEGER PRIMARY KEY,
+        Treatment_Count INTEGER,
+        Total_Cost REAL,
+        Cost_Count INTEGER,
+        Effectiveness_Sum INTEGER,
+        Effectiveness_Count INTEGER
+    );
+    ''',
+    'AGG_DISEASE_EFFECTIVENESS': '''
+    CREATE TABLE IF NOT EXISTS AGG_DISEASE_EFFECTIVENESS (
+        Disease_ID INTEGER PRIMARY KEY,
+        Treatment_Count INTEGER,
+        Effectiveness_Sum INTEGER,
+        Effectiveness_Count INTEGER
+    );
+    '''
+}
+
+MONTHLY_COST_SELECT = '''
+SELECT strftime('%Y', t.Outcome_Date), strftime('%m', t.Outcome_Date), t.Outcome_Quarter, l.State, t.Type,
+       COUNT(*), SUM(t.Cost), COUNT(t.Cost), SUM(t.Effectiveness_Score), COUNT(t.Effectiveness_Score)
+FROM TREATMENT t
+LEFT JOIN LOCATION l ON l.Location_ID = t.Location_ID
+{where}
+GROUP BY 1, 2, 3, 4, 5
+'''
+
+PROVIDER_SELECT = '''
+SELECT Provider_ID, COUNT(*), SUM(Cost), COUNT(Cost), SUM(Effectiveness_Score), COUNT(Effectiveness_Score)
+FROM TREATMENT
+{where}
+GROUP BY Provider_ID
+'''
+
+DISEASE_SELECT = '''
+SELECT Disease_ID, COUNT(*), SUM(Effectiveness_Score), COUNT(Effectiveness_Score)
+FROM TREATMENT
+{where}
+GROUP BY Disease_ID
+'''
+
+# Function to create the aggregate tables; returns True when they were missing and need a full rebuild
+def ensure_aggregate_tables(conn):
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for ddl in AGGREGATE_TABLES.values():
+        conn.execute(ddl)
+    return any(table not in existing for table in AGGREGATE_TABLES)
+
+def next_month_start(year, month):
+    year, month = int(year), int(month)
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+
+# Function to stage a set of partition keys in a temp table so refreshes stay set-based
+def _stage_keys(conn, name, columns, keys):
+    conn.execute(f'DROP TABLE IF EXISTS temp.{name}')
+    conn.execute(f'CREATE TEMP TABLE {name} ({", ".join(columns)})')
+    conn.executemany(f'INSERT INTO temp.{name} VALUES ({", ".join("?" for _ in columns)})', keys)
+
+# Function to recompute only the aggregate partitions touched by a load.
+# months: (year, month) strings, None for treatments without an Outcome_Date; provider_ids/disease_ids: keys.
+# Runs inside the caller's transaction.
+def refresh_aggregates(conn, months=(), provider_ids=(), disease_ids=()):
+    months = set(months)
+    dated = sorted(month for month in months if month)
+    if dated:
+        # Each touched month becomes an Outcome_Date range so the recompute reads only its own rows
+        _stage_keys(conn, 'touched_months', ['Year', 'Month', 'Range_Start', 'Range_End'],
+                    [(year, month, f"{year}-{month}-01", next_month_start(year, month)) for year, month in dated])
+        conn.execute('''
+        DELETE FROM AGG_MONTHLY_COST
+        WHERE (Outcome_Year, Outcome_Month) IN (SELECT Year, Month FROM temp.touched_months)
+        ''')
+        conn.execute('INSERT INTO AGG_MONTHLY_COST ' + MONTHLY_COST_SELECT.format(
+            where='''JOIN temp.touched_months m ON t.Outcome_Date >= m.Range_Start AND t.Outcome_Date < m.Range_End'''))
+    if None in months:
+        conn.execute('DELETE FROM AGG_MONTHLY_COST WHERE Outcome_Year IS NULL')
+        conn.execute('INSERT INTO AGG_MONTHLY_COST ' + MONTHLY_COST_SELECT.format(where='WHERE t.Outcome_Date IS NULL'))
+
+    if len(provider_ids):
+        _stage_keys(conn, 'touched_providers', ['Provider_ID'], [(int(k),) for k in set(provider_ids)])
+        conn.execute('DELETE FROM AGG_PROVIDER_TREATMENTS WHERE Provider_ID IN (SELECT Provider_ID FROM temp.touched_providers)')
+        conn.execute('INSERT INTO AGG_PROVIDER_TREATMENTS ' + PROVIDER_SELECT.format(
+            where='WHERE Provider_ID IN (SELECT Provider_ID FROM temp.touched_providers)'))
+
+    if len(disease_ids):
+        _stage_keys(conn, 'touched_diseases', ['Disease_ID'], [(int(k),) for k in set(disease_ids)])
+        conn.execute('DELETE FROM AGG_DISEASE_EFFECTIVENESS WHERE Disease_ID IN (SELECT Disease_ID FROM temp.touched_diseases)')
+        conn.execute('INSERT INTO AGG_DISEASE_EFFECTIVENESS ' + DISEASE_SELECT.format(
+            where='WHERE Disease_ID IN (SELECT Disease_ID FROM temp.touched_diseases)'))
+
+# Function to get the partitions touched by a prepared silver frame ('YYYY-MM-DD' outcome dates)
+def touched_partitions(df):
+    outcome = df['treatment_outcome_date']
+    months = set(zip(outcome.str[:4].dropna(), outcome.str[5:7].dropna()))
+    if outcome.isna().any():
+        months.add(None)
+    return {
+        'months': months,
+        'provider_ids': df['provider_id'].dropna().unique(),
+        'disease_ids': df['disease_id'].dropna().unique()
+    }
+
+# Function to recompute every aggregate from TREATMENT
+def rebuild_aggregates(conn):
+    ensure_aggregate_tables(conn)
+    for table in AGGREGATE_TABLES:
+        conn.execute(f'DELETE FROM {table}')
+    conn.execute('INSERT INTO AGG_MONTHLY_COST ' + MONTHLY_COST_SELECT.format(where=''))
+    conn.execute('INSERT INTO AGG_PROVIDER_TREATMENTS ' + PROVIDER_SELECT.format(where='WHERE Provider_ID IS NOT NULL'))
+    conn.execute('INSERT INTO AGG_DISEASE_EFFECTIVENESS ' + DISEASE_SELECT.format(where='WHERE Disease_ID IS NOT NULL'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the materialized TREATMENT aggregates.")
+    parser.add_argument('--db', default=os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..', 'Healthcare_ETL_Project', 'db', 'healthcare_data.db')))
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.db)
+        rebuild_aggregates(conn)
+        conn.commit()
+        print("Aggregate tables rebuilt successfully.")
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
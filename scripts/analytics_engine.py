@@ -0,0 +1,185 @@
+# analytics_engine.py
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+import pandas as pd
+from analytics_queries import ANALYTICAL_QUERIES
+from load_state import get_data_version
+from treatment_partitions import pruned_treatments
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Tables copied to the columnar mirror, with the TEXT date columns that become typed there
+MIRROR_TABLES = ['TREATMENT', 'PROVIDER', 'PATIENT', 'DISEASE', 'LOCATION', 'EFFECTIVENESS']
+MIRROR_DATE_COLUMNS = {
+    'TREATMENT': {'Start_Date': 'DATE', 'Completion_Date': 'DATE', 'Outcome_Date': 'DATE'},
+    'PROVIDER': {'Valid_From': 'TIMESTAMP', 'Valid_To': 'TIMESTAMP'}
+}
+SQLITE_TO_DUCKDB_TYPES = {'INTEGER': 'BIGINT', 'REAL': 'DOUBLE', 'TEXT': 'VARCHAR'}
+MIRROR_CHUNKSIZE = 250_000
+
+def require_duckdb():
+    if duckdb is None:
+        raise ImportError("The DuckDB analytics engine needs duckdb: pip install duckdb")
+
+def default_db_path():
+    return str(Path(__file__).resolve().parent.parent / "Healthcare_ETL_Project" / "db" / "healthcare_data.db")
+
+# Common interface of the analytics backends: run a named query of analytics_queries.py with its default
+# parameters overridden by **params, and get the result as a DataFrame
+class AnalyticsEngine:
+    name = None
+
+    def run(self, name, **params):
+        if name not in ANALYTICAL_QUERIES:
+            raise KeyError(f"Unknown query {name}; available: {', '.join(ANALYTICAL_QUERIES)}")
+        query = ANALYTICAL_QUERIES[name]
+        return self.execute_query(query, {**query['params'], **params})
+
+    def execute_query(self, query, params):
+        return self.execute(query['sql'], params)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# The star schema itself (row store)
+class SQLiteEngine(AnalyticsEngine):
+    name = 'sqlite'
+
+    def __init__(self, db_path=None):
+        db_path = db_path or default_db_path()
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Database not found at {db_path}")
+        self.conn = sqlite3.connect(db_path)
+
+    # Queries bounded to some outcome years only read those partitions of a partitioned TREATMENT
+    def execute_query(self, query, params):
+        with pruned_treatments(self.conn, query, params):
+            return self.execute(query['sql'], params)
+
+    def execute(self, sql, params):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+# Function to rewrite the SQLite dialect of the named queries for DuckDB: :name parameters become $name and
+# date('now', modifier) becomes current_date plus the modifier as an interval
+def to_duckdb_sql(sql):
+    sql = re.sub(r"\bdate\('now',\s*:(\w+)\)", r"CAST(current_date + CAST($\1 AS INTERVAL) AS TIMESTAMP)", sql)
+    return re.sub(r"(?<![:\w]):(\w+)", r"$\1", sql)
+
+# Function to copy the star schema into a DuckDB file, in one DuckDB transaction so that readers see either
+# the old or the new mirror. Date columns are typed, the rest keep their SQLite affinity.
+def build_mirror(sqlite_conn, duck, data_version):
+    duck.execute('BEGIN TRANSACTION')
+    try:
+        for table in MIRROR_TABLES:
+            date_columns = MIRROR_DATE_COLUMNS.get(table, {})
+            columns = [(name, date_columns.get(name, SQLITE_TO_DUCKDB_TYPES.get(declared.upper(), 'VARCHAR')))
+                       for _, name, declared, *_ in sqlite_conn.execute(f'PRAGMA table_info({table})')]
+            duck.execute(f'DROP TABLE IF EXISTS {table}')
+            duck.execute(f'CREATE TABLE {table} ({", ".join(f"{name} {type_}" for name, type_ in columns)})')
+            select = ', '.join(f'TRY_CAST({name} AS {type_})' if name in date_columns else name
+                               for name, type_ in columns)
+            for chunk in pd.read_sql_query(f'SELECT * FROM {table}', sqlite_conn, chunksize=MIRROR_CHUNKSIZE,
+                                           dtype_backend='numpy_nullable'):
+                duck.register('mirror_chunk', chunk)
+                duck.execute(f'INSERT INTO {table} SELECT {select} FROM mirror_chunk')
+                duck.unregister('mirror_chunk')
+        duck.execute('CREATE OR REPLACE TABLE MIRROR_STATE AS SELECT ? AS Data_Version, current_timestamp AS Built_At',
+                     [data_version])
+        duck.execute('COMMIT')
+    except BaseException:
+        duck.execute('ROLLBACK')
+        raise
+
+def mirror_version(duck):
+    try:
+        return duck.execute('SELECT Data_Version FROM MIRROR_STATE').fetchone()[0]
+    except duckdb.CatalogException:
+        return None
+
+# Embedded columnar engine over a DuckDB mirror of the star schema (db/healthcare_analytics.duckdb).
+# The mirror remembers the data version (load_state.get_data_version) it was copied at and is rebuilt when
+# a load has committed since, so the first query after an ETL run refreshes it. No server is involved:
+# DuckDB runs in this process and the mirror is a local file.
+class DuckDBEngine(AnalyticsEngine):
+    name = 'duckdb'
+
+    def __init__(self, db_path=None, mirror_path=None, threads=None):
+        require_duckdb()
+        db_path = db_path or default_db_path()
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Database not found at {db_path}")
+        self.sqlite_conn = sqlite3.connect(db_path)
+        self.mirror_path = mirror_path or str(Path(db_path).resolve().parent / "healthcare_analytics.duckdb")
+        self.conn = duckdb.connect(self.mirror_path)
+        if threads:
+            self.conn.execute(f'SET threads = {int(threads)}')
+        self.refresh_seconds = None
+
+    # Function to rebuild the mirror when it is older than the star schema; returns True when it was rebuilt
+    def refresh(self, force=False):
+        data_version = get_data_version(self.sqlite_conn)
+        if not force and mirror_version(self.conn) == data_version:
+            return False
+        start = time.perf_counter()
+        build_mirror(self.sqlite_conn, self.conn, data_version)
+        self.refresh_seconds = time.perf_counter() - start
+        return True
+
+    def execute(self, sql, params):
+        self.refresh()
+        return self.conn.execute(to_duckdb_sql(sql), params or None).df()
+
+    def close(self):
+        self.conn.close()
+        self.sqlite_conn.close()
+
+ENGINES = {
+    'sqlite': SQLiteEngine,
+    'duckdb': DuckDBEngine
+}
+
+def open_engine(kind='sqlite', db_path=None, **options):
+    return ENGINES[kind](db_path, **options)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a named analytical query on SQLite or on the DuckDB mirror.")
+    parser.add_argument('query', nargs='?', help=f"one of: {', '.join(ANALYTICAL_QUERIES)}")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='duckdb')
+    parser.add_argument('--param', action='append', default=[], help="query parameter as name=value (repeatable)")
+    parser.add_argument('--db', default=None, help="SQLite database (default Healthcare_ETL_Project/db/healthcare_data.db)")
+    parser.add_argument('--refresh', action='store_true', help="rebuild the DuckDB mirror even if it is current")
+    args = parser.parse_args()
+
+    if not args.query and not args.refresh:
+        parser.error("a query name or --refresh is required")
+    try:
+        from query_service import parse_params
+        with open_engine(args.engine, args.db) as engine:
+            if args.engine == 'duckdb' and engine.refresh(force=args.refresh):
+                print(f"DuckDB mirror rebuilt in {engine.refresh_seconds:.2f}s: {engine.mirror_path}")
+            if args.query:
+                start = time.perf_counter()
+                df = engine.run(args.query, **parse_params(args.param, ANALYTICAL_QUERIES[args.query]['params']))
+                elapsed = time.perf_counter() - start
+                print(df.to_string(index=False) if not df.empty else "No data returned from the query.")
+                print(f"{len(df)} rows in {elapsed * 1000:.1f} ms on {engine.name}")
+    except (FileNotFoundError, ImportError, KeyError, ValueError) as e:
+        print(f"{e}")
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        sys.exit(1)
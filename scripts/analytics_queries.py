@@ -0,0 +1,224 @@
+# analytics_queries.py
+# Registry of the project's analytical queries (from notebooks/query_db.ipynb) and of the lookups the
+# silver loader runs on its hot path. Each entry is the SQL plus the default values of its parameters.
+# 'partition_years' names the parameters bounding the outcome years a query reads, so that a partitioned
+# TREATMENT (treatment_partitions.py) is only scanned for those years.
+
+ANALYTICAL_QUERIES = {
+    # 1.Calculate the average treatment duration per treatment type
+    'avg_duration_by_type': {
+        'sql': '''
+        WITH TreatmentSummary AS (
+            SELECT Type,
+                   AVG(Treatment_Duration) AS Avg_Treatment_Duration
+            FROM TREATMENT
+            GROUP BY Type
+        )
+        SELECT * FROM TreatmentSummary;
+        ''',
+        'params': {}
+    },
+    # 2.Find the most common outcome day of the week for treatments
+    'most_common_outcome_day': {
+        'sql': '''
+        WITH TreatmentDays AS (
+            SELECT Outcome_Day,
+                   COUNT(*) AS Frequency
+            FROM TREATMENT
+            GROUP BY Outcome_Day
+        )
+        SELECT Outcome_Day
+        FROM TreatmentDays
+        ORDER BY Frequency DESC
+        LIMIT 1;
+        ''',
+        'params': {}
+    },
+    # 3.Total number of treatments and the average treatment cost for each provider
+    'provider_treatment_stats': {
+        'sql': '''
+        WITH ProviderTreatmentStats AS (
+            SELECT Provider_ID,
+                   COUNT(*) AS Treatment_Count,
+                   AVG(Cost) AS Avg_Cost
+            FROM TREATMENT
+            GROUP BY Provider_ID
+        )
+        SELECT * FROM ProviderTreatmentStats;
+        ''',
+        'params': {}
+    },
+    # 4.Calculate average cost per month
+    'monthly_average_cost': {
+        'sql': '''
+        WITH MonthlyCost AS (
+            SELECT
+                strftime('%Y', Outcome_Date) AS Year,
+                strftime('%m', Outcome_Date) AS Month,
+                AVG(Cost) AS Average_Cost
+            FROM TREATMENT
+            WHERE Year BETWEEN :start_year AND :end_year
+            GROUP BY Year, Month
+            ORDER BY Year, Month
+        )
+        SELECT * FROM MonthlyCost;
+        ''',
+        'params': {'start_year': '2024', 'end_year': '2025'},
+        'partition_years': ('start_year', 'end_year')
+    },
+    # 5.How many doctors have changed their affiliated hospital in the last 6 months
+    'doctors_changed_hospital_count': {
+        'sql': '''
+        SELECT COUNT(DISTINCT p.Provider_ID) AS doctors_changed_hospital
+        FROM (
+            SELECT Provider_ID
+            FROM PROVIDER
+            GROUP BY Provider_ID
+            HAVING COUNT(DISTINCT Affiliated_Hospital) > 1
+        ) AS changed_providers
+        JOIN PROVIDER p ON changed_providers.Provider_ID = p.Provider_ID
+        WHERE p.Valid_From >= date('now', :since);
+        ''',
+        'params': {'since': '-6 months'}
+    },
+    # 6.Details of doctors have changed their affiliated hospital in the last 6 months
+    'doctors_changed_hospital_details': {
+        'sql': '''
+        SELECT DISTINCT p.Provider_ID, p.First_Name, p.Last_Name
+        FROM (
+            SELECT Provider_ID
+            FROM PROVIDER
+            GROUP BY Provider_ID
+            HAVING COUNT(DISTINCT Affiliated_Hospital) > 1
+        ) AS changed_providers
+        JOIN PROVIDER p ON changed_providers.Provider_ID = p.Provider_ID
+        WHERE p.Valid_From >= date('now', :since);
+        ''',
+        'params': {'since': '-6 months'}
+    },
+    # 7.Top 5 Providers with Highest Treatment Effectiveness
+    'top_providers_by_effectiveness': {
+        'sql': '''
+        SELECT Provider_ID, AVG(Effectiveness_Score) AS Avg_effectiveness
+        FROM TREATMENT
+        GROUP BY Provider_ID
+        ORDER BY avg_effectiveness DESC
+        LIMIT :top_n;
+        ''',
+        'params': {'top_n': 5}
+    },
+    # 8.Calculate the effectiveness score for treatments by disease
+    'effectiveness_by_disease': {
+        'sql': '''
+        WITH EffectivenessByDisease AS (
+            SELECT Disease_ID,
+                   AVG(Effectiveness_Score) AS Avg_Effectiveness_Score
+            FROM TREATMENT
+            WHERE Effectiveness_Score IS NOT NULL
+            GROUP BY Disease_ID
+        )
+        SELECT * FROM EffectivenessByDisease;
+        ''',
+        'params': {}
+    },
+    # 9.Determine the total cost of treatments by outcome quarter and year
+    'total_cost_by_quarter': {
+        'sql': '''
+        WITH CostSummary AS (
+            SELECT
+                strftime('%Y', Outcome_Date) AS Outcome_Year,
+                Outcome_Quarter,
+                SUM(Cost) AS Total_Cost
+            FROM TREATMENT
+            GROUP BY Outcome_Year, Outcome_Quarter
+        )
+        SELECT * FROM CostSummary;
+        ''',
+        'params': {}
+    },
+    # 10. Average_Duration of Report_Duration based on Treatment_Type
+    'avg_report_duration_by_type': {
+        'sql': '''
+        SELECT Type, ROUND(AVG(Report_Duration), 2) AS Average_Report_Duration FROM TREATMENT GROUP BY Type;
+        ''',
+        'params': {}
+    },
+    # 11. Number of Treatments on Weekend vs Weekday (notebooks/Data_Visualization.ipynb)
+    'weekend_vs_weekday': {
+        'sql': '''
+        SELECT Outcome_Weekend_Flag, COUNT(Treatment_ID) AS Treatment_Count
+        FROM TREATMENT
+        GROUP BY Outcome_Weekend_Flag
+        ORDER BY Outcome_Weekend_Flag;
+        ''',
+        'params': {}
+    }
+}
+
+# Dashboard versions of the analytical queries above, read from the aggregate tables maintained by
+# the silver load (aggregates.py) instead of scanning TREATMENT. Same names, parameters and results.
+AGGREGATE_QUERIES = {
+    'provider_treatment_stats': {
+        'sql': '''
+        SELECT Provider_ID, Treatment_Count, Total_Cost / Cost_Count AS Avg_Cost
+        FROM AGG_PROVIDER_TREATMENTS;
+        ''',
+        'params': {}
+    },
+    'monthly_average_cost': {
+        'sql': '''
+        SELECT Outcome_Year AS Year, Outcome_Month AS Month, SUM(Total_Cost) / SUM(Cost_Count) AS Average_Cost
+        FROM AGG_MONTHLY_COST
+        WHERE Outcome_Year BETWEEN :start_year AND :end_year
+        GROUP BY Outcome_Year, Outcome_Month
+        ORDER BY Outcome_Year, Outcome_Month;
+        ''',
+        'params': {'start_year': '2024', 'end_year': '2025'}
+    },
+    'top_providers_by_effectiveness': {
+        'sql': '''
+        SELECT Provider_ID, CAST(Effectiveness_Sum AS REAL) / Effectiveness_Count AS Avg_effectiveness
+        FROM AGG_PROVIDER_TREATMENTS
+        ORDER BY avg_effectiveness DESC
+        LIMIT :top_n;
+        ''',
+        'params': {'top_n': 5}
+    },
+    'effectiveness_by_disease': {
+        'sql': '''
+        SELECT Disease_ID, CAST(Effectiveness_Sum AS REAL) / Effectiveness_Count AS Avg_Effectiveness_Score
+        FROM AGG_DISEASE_EFFECTIVENESS
+        WHERE Effectiveness_Count > 0;
+        ''',
+        'params': {}
+    },
+    'total_cost_by_quarter': {
+        'sql': '''
+        SELECT Outcome_Year, Outcome_Quarter, SUM(Total_Cost) AS Total_Cost
+        FROM AGG_MONTHLY_COST
+        GROUP BY Outcome_Year, Outcome_Quarter;
+        ''',
+        'params': {}
+    }
+}
+
+LOADER_QUERIES = {
+    # Per-row SCD2 lookup in transform_to_silver.upsert_provider_version
+    'provider_current_version': {
+        'sql': '''
+        SELECT * FROM PROVIDER
+        WHERE Provider_ID = :provider_id AND Is_Current = 1
+        ''',
+        'params': {'provider_id': 1}
+    },
+    # Current versions loaded by provider_scd_merge.load_current_providers
+    'provider_current_versions': {
+        'sql': '''
+        SELECT Version_ID, Provider_ID, First_Name, Last_Name, Speciality_Id, Speciality_Name, Affiliated_Hospital
+        FROM PROVIDER
+        WHERE Is_Current = 1
+        ''',
+        'params': {}
+    }
+    # LOCATION members are resolved in memory by dimension_cache.DimensionKeyCache, which reads the table once
+}
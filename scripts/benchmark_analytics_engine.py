@@ -0,0 +1,57 @@
+# benchmark_analytics_engine.py
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from analytics_queries import ANALYTICAL_QUERIES
+from analytics_engine import SQLiteEngine, DuckDBEngine, default_db_path
+
+# Function to time a named query on an engine; returns the best of `repeat` runs and the row count
+def time_query(engine, name, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = engine.run(name)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, len(df)
+
+def benchmark(db_path, repeat, threads=None):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with SQLiteEngine(db_path) as sqlite_engine, \
+                DuckDBEngine(db_path, mirror_path=os.path.join(tmp_dir, "mirror.duckdb"), threads=threads) as duck_engine:
+            duck_engine.refresh(force=True)
+            print(f"DuckDB mirror built in {duck_engine.refresh_seconds:.2f}s")
+            print(f"{'Query':<34}{'Rows':>6}{'SQLite ms':>11}{'DuckDB ms':>11}{'Speedup':>9}")
+            totals = [0.0, 0.0]
+            for name in ANALYTICAL_QUERIES:
+                sqlite_seconds, rows = time_query(sqlite_engine, name, repeat)
+                duck_seconds, duck_rows = time_query(duck_engine, name, repeat)
+                if rows != duck_rows:
+                    print(f"{name}: {rows} rows on SQLite but {duck_rows} on DuckDB")
+                    return 1
+                totals[0] += sqlite_seconds
+                totals[1] += duck_seconds
+                print(f"{name:<34}{rows:>6}{sqlite_seconds * 1000:>11.1f}{duck_seconds * 1000:>11.1f}"
+                      f"{sqlite_seconds / duck_seconds:>8.1f}x")
+            print(f"{'all queries':<34}{'':>6}{totals[0] * 1000:>11.1f}{totals[1] * 1000:>11.1f}"
+                  f"{totals[0] / totals[1]:>8.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the named analytical queries on SQLite and on the DuckDB mirror.")
+    parser.add_argument('--db', default=default_db_path(), help="SQLite database to query")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per query; the best time is reported")
+    parser.add_argument('--threads', type=int, default=None, help="DuckDB threads (default: all cores)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Database not found at {args.db}")
+        sys.exit(1)
+    try:
+        sys.exit(benchmark(args.db, args.repeat, args.threads))
+    except ImportError as e:
+        print(f"{e}")
+        sys.exit(1)
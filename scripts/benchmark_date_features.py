@@ -0,0 +1,85 @@
+# benchmark_date_features.py
+import sys
+import time
+import argparse
+import tracemalloc
+import pandas as pd
+from transform_to_silver import derive_date_features, get_default_paths
+
+FEATURE_COLUMNS = ['treatment_start_date', 'treatment_end_date', 'treatment_outcome_date',
+                   'Outcome_Day', 'Outcome_Weekend_Flag', 'Report_Duration', 'Outcome_Quarter']
+
+# Previous date handling of transform_to_silver: .dt.date/.dt.time object columns, re-parsing for the
+# calculated fields and a strftime per row when the treatments were inserted
+def legacy_date_features(df):
+    df['treatment_start_date'] = pd.to_datetime(df['treatment_start_date'])
+    df['treatment_completion_date'] = pd.to_datetime(df['treatment_completion_date'])
+    df['treatment_outcome_date'] = pd.to_datetime(df['treatment_outcome_date'])
+
+    df['treatment_start_date_only'] = df['treatment_start_date'].dt.date
+    df['treatment_start_time_only'] = df['treatment_start_date'].dt.time
+    df['treatment_end_date_only'] = df['treatment_completion_date'].dt.date
+    df['treatment_end_time_only'] = df['treatment_completion_date'].dt.time
+    df['treatment_outcome_date_only'] = df['treatment_outcome_date'].dt.date
+    df['treatment_outcome_time'] = df['treatment_outcome_date'].dt.time
+
+    df.drop(columns=['treatment_start_date', 'treatment_completion_date', 'treatment_outcome_date'], inplace=True)
+    df.rename(columns={
+        'treatment_start_date_only': 'treatment_start_date',
+        'treatment_start_time_only': 'treatment_start_time',
+        'treatment_end_date_only': 'treatment_end_date',
+        'treatment_end_time_only': 'treatment_end_time',
+        'treatment_outcome_date_only': 'treatment_outcome_date'
+    }, inplace=True)
+
+    df['treatment_outcome_date_dt'] = pd.to_datetime(df['treatment_outcome_date'])
+    df['treatment_end_date_dt'] = pd.to_datetime(df['treatment_end_date'])
+    df['Outcome_Day'] = df['treatment_outcome_date_dt'].dt.day_name()
+    df['Outcome_Weekend_Flag'] = df['Outcome_Day'].isin(['Saturday', 'Sunday']).astype(int)
+    df['Report_Duration'] = (df['treatment_outcome_date_dt'] - df['treatment_end_date_dt']).dt.days
+    df['Outcome_Quarter'] = df['treatment_outcome_date_dt'].dt.quarter
+    df.drop(columns=['treatment_outcome_date_dt', 'treatment_end_date_dt'], inplace=True)
+
+    for column in ['treatment_start_date', 'treatment_end_date', 'treatment_outcome_date']:
+        df[column] = [value.strftime('%Y-%m-%d') if pd.notnull(value) else None for value in df[column]]
+    return df
+
+STAGES = {'legacy': legacy_date_features, 'vectorized': derive_date_features}
+
+# Function to run a stage once for time and once under tracemalloc for its peak allocations
+def measure(stage, df):
+    start = time.perf_counter()
+    result = STAGES[stage](df.copy())
+    elapsed = time.perf_counter() - start
+
+    frame = df.copy()
+    tracemalloc.start()
+    STAGES[stage](frame)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, result
+
+def benchmark(processed_csv_path, rows=None):
+    df = pd.read_csv(processed_csv_path, nrows=rows)
+    print(f"Deriving date features for {len(df)} records from {processed_csv_path}")
+
+    results = {stage: measure(stage, df) for stage in STAGES}
+    print(f"\n{'Stage':<12}{'Seconds':>10}{'Peak MB':>10}")
+    for stage, (elapsed, peak, _) in results.items():
+        print(f"{stage:<12}{elapsed:>10.2f}{peak:>10.1f}")
+
+    legacy = results['legacy'][2][FEATURE_COLUMNS].astype(object)
+    vectorized = results['vectorized'][2][FEATURE_COLUMNS].astype(object)
+    if not legacy.where(legacy.notna(), None).equals(vectorized.where(vectorized.notna(), None)):
+        print("Derived date features differ between the stages!")
+        return 1
+    print(f"\nOutputs match. Vectorized stage is {results['legacy'][0] / results['vectorized'][0]:.1f}x faster "
+          f"with {results['legacy'][1] / results['vectorized'][1]:.1f}x lower peak allocations.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy and vectorized date feature derivation.")
+    parser.add_argument('--csv', default=get_default_paths()[0], help="processed CSV to read")
+    parser.add_argument('--rows', type=int, default=None, help="only read the first N rows")
+    args = parser.parse_args()
+    sys.exit(benchmark(args.csv, args.rows))
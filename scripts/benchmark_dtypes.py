@@ -0,0 +1,77 @@
+# benchmark_dtypes.py
+import sys
+import time
+import argparse
+from pathlib import Path
+import pandas as pd
+from schema_manifest import RAW_COLUMNS, read_options, read_header, coerce_types
+from file_processing import LINEAGE_COLUMNS, process_dataframe
+from transform_to_silver import SOURCE_COLUMNS, prepare_dataframe
+
+MB = 1024 * 1024
+
+# Function to get the in-memory size of a frame, strings included
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / MB
+
+# Function to read a CSV and run one stage's transform on it; returns the parse time, the stage time and
+# the frame size after each. The typed reads include the conversion of the numeric columns.
+def run_stage(path, read_kwargs, transform):
+    start = time.perf_counter()
+    df = pd.read_csv(path, **read_kwargs)
+    if read_kwargs:
+        df = coerce_types(df)
+    parsed = time.perf_counter() - start
+    parsed_mb = frame_mb(df)
+    start = time.perf_counter()
+    df = transform(df)
+    return len(df), parsed, parsed_mb, time.perf_counter() - start, frame_mb(df)
+
+# The read each stage did before the schema manifest and the typed reads it does now: with the C parser
+# (chunked reads) and with the default engine of whole-file reads (pyarrow when installed)
+def stages(raw_csv, processed_csv):
+    silver_columns = SOURCE_COLUMNS + LINEAGE_COLUMNS
+    raw_header, processed_header = read_header(raw_csv), read_header(processed_csv)
+    return {
+        'bronze': (raw_csv, process_dataframe, {
+            'inferred': {},
+            'typed_c': read_options(raw_header, RAW_COLUMNS, parse_dates=False, chunked=True),
+            'typed': read_options(raw_header, RAW_COLUMNS, parse_dates=False)
+        }),
+        'silver': (processed_csv, prepare_dataframe, {
+            'inferred': {},
+            'typed_c': read_options(processed_header, silver_columns, chunked=True),
+            'typed': read_options(processed_header, silver_columns)
+        })
+    }
+
+def benchmark(raw_csv, processed_csv, repeat):
+    print(f"{'Stage':<8}{'Read':<10}{'Rows':>10}{'Parse s':>10}{'Parsed MB':>11}{'Stage s':>10}{'Stage MB':>10}")
+    for stage, (path, transform, variants) in stages(raw_csv, processed_csv).items():
+        results = {}
+        for name, read_kwargs in variants.items():
+            # Best of `repeat` runs for the timings; the sizes do not change between runs
+            runs = [run_stage(path, read_kwargs, transform) for _ in range(repeat)]
+            rows, _, parsed_mb, _, stage_mb = runs[0]
+            results[name] = (min(run[1] for run in runs), parsed_mb, min(run[3] for run in runs), stage_mb)
+            print(f"{stage:<8}{name:<10}{rows:>10}{results[name][0]:>10.2f}{parsed_mb:>11.1f}"
+                  f"{results[name][2]:>10.2f}{stage_mb:>10.1f}")
+        inferred, typed = results['inferred'], results['typed']
+        print(f"  {stage}: parse {inferred[0] / results['typed_c'][0]:.2f}x faster typed (C parser), "
+              f"{inferred[0] / typed[0]:.2f}x with {variants['typed'].get('engine', 'c')}; frame "
+              f"{inferred[1] / typed[1]:.1f}x smaller after parse and {inferred[3] / typed[3]:.1f}x after {stage}")
+    return 0
+
+if __name__ == "__main__":
+    project_dir = Path(__file__).resolve().parent.parent / "Healthcare_ETL_Project"
+    parser = argparse.ArgumentParser(description="Compare inferred and schema-manifest reads of the raw and processed CSVs.")
+    parser.add_argument('--raw-csv', required=True, help="a raw CSV (e.g. from generate_synthetic_data.py)")
+    parser.add_argument('--processed-csv', default=str(project_dir / "processed" / "Healthcare_Dataset.csv"))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per variant; the best time is reported")
+    args = parser.parse_args()
+
+    for path in [args.raw_csv, args.processed_csv]:
+        if not Path(path).exists():
+            print(f"CSV not found at: {path}")
+            sys.exit(1)
+    sys.exit(benchmark(args.raw_csv, args.processed_csv, args.repeat))
@@ -0,0 +1,71 @@
+# benchmark_intermediate_format.py
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+from Create_Schema import create_database_schema
+from run_etl import run_etl
+import transform_to_silver
+
+FORMATS = ['csv', 'parquet']
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+# Function to run bronze and silver end to end for one intermediate format in a scratch project
+def run_format(output_format, raw_files, tmp_dir, workers):
+    base_dir = Path(tmp_dir) / output_format
+    project_dir = base_dir / "Healthcare_ETL_Project"
+    (project_dir / "raw_data").mkdir(parents=True)
+    (project_dir / "db").mkdir()
+    for raw_file in raw_files:
+        shutil.copy(raw_file, project_dir / "raw_data")
+
+    processed_csv_path = project_dir / "processed" / "Healthcare_Dataset.csv"
+    db_path = str(project_dir / "db" / "healthcare_data.db")
+
+    with redirect_stdout(io.StringIO()):
+        create_database_schema(db_path)
+
+        start = time.perf_counter()
+        run_etl(base_dir=base_dir, workers=workers, output_format=output_format)
+        bronze_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transform_to_silver.main(processed_csv_path=str(processed_csv_path), db_path=db_path, input_format=output_format)
+        silver_seconds = time.perf_counter() - start
+
+    intermediate = processed_csv_path if output_format == 'csv' else processed_csv_path.parent / "parquet"
+    return bronze_seconds, silver_seconds, directory_size(intermediate)
+
+def benchmark(raw_dir, formats, workers):
+    raw_files = sorted(Path(raw_dir).glob("*.csv"))
+    if not raw_files:
+        print(f"No raw CSV files found in {raw_dir}")
+        return 1
+    print(f"Benchmarking {len(raw_files)} raw files ({directory_size(raw_dir) / 1024 ** 2:.1f} MB) from {raw_dir}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in formats:
+            results[output_format] = run_format(output_format, raw_files, tmp_dir, workers)
+
+    print(f"\n{'Format':<10}{'Bronze s':>10}{'Silver s':>10}{'Total s':>10}{'Disk MB':>10}")
+    for output_format, (bronze, silver, size) in results.items():
+        print(f"{output_format:<10}{bronze:>10.2f}{silver:>10.2f}{bronze + silver:>10.2f}{size / 1024 ** 2:>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the CSV and Parquet intermediate formats end to end.")
+    parser.add_argument('--raw-dir', default=str(Path(__file__).resolve().parent.parent / "Healthcare_ETL_Project" / "raw_data"))
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(benchmark(args.raw_dir, args.formats, args.workers))
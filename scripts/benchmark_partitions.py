@@ -0,0 +1,113 @@
+# benchmark_partitions.py
+import io
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import pandas as pd
+from contextlib import redirect_stdout
+from Create_Schema import create_database_schema
+from Create_Indexes import create_indexes
+from analytics_engine import SQLiteEngine
+from transform_to_silver import SOURCE_COLUMNS, get_default_paths, prepare_dataframe, populate_effectiveness, load_bulk
+from treatment_partitions import seal_partitions
+from file_processing import LINEAGE_COLUMNS
+from schema_manifest import read_options, read_header, coerce_types
+
+LAYOUTS = ['table', 'partitioned']
+
+# Function to time a named query (best of `repeat`); returns the seconds and the result
+def time_query(engine, name, params, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = engine.run(name, **params)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, df
+
+# Function to build one layout: the years before `open_from` are loaded as history (and sealed when
+# partitioned), then the open years are loaded incrementally, the indexes rebuilt and the queries run
+def run_layout(layout, df, db_path, open_from, queries, repeat):
+    partitioned = layout == 'partitioned'
+    years = df['treatment_outcome_date'].dt.year
+    history, recent = df[~(years >= open_from)], df[years >= open_from]
+    with redirect_stdout(io.StringIO()):
+        create_database_schema(db_path, partitioned=partitioned)
+        create_indexes(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        populate_effectiveness(conn.cursor())
+        load_bulk(conn, prepare_dataframe(history.copy()))
+        if partitioned:
+            seal_partitions(conn, open_from)
+        conn.commit()
+
+        timings = {}
+        start = time.perf_counter()
+        load_bulk(conn, prepare_dataframe(recent.copy()))
+        conn.commit()
+        timings[f'load {open_from}+ ({len(recent)} rows)'] = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        create_indexes(db_path, rebuild=True)
+        timings['Create_Indexes --rebuild'] = time.perf_counter() - start
+
+    results = {}
+    with SQLiteEngine(db_path) as engine:
+        for name, params in queries.items():
+            timings[name], results[name] = time_query(engine, name, params, repeat)
+    return timings, results
+
+def benchmark(processed_csv_path, open_from=None, repeat=3):
+    df = coerce_types(pd.read_csv(processed_csv_path,
+                                    **read_options(read_header(processed_csv_path), SOURCE_COLUMNS + LINEAGE_COLUMNS)))
+    years = df['treatment_outcome_date'].dt.year
+    open_from = open_from or int(years.max()) - 1
+    print(f"Benchmarking {len(df)} records with outcome years {int(years.min())}-{int(years.max())}; "
+          f"years before {open_from} are history")
+    queries = {
+        'monthly_average_cost': {'start_year': str(open_from - 1), 'end_year': str(open_from)},
+        'total_cost_by_quarter': {},
+        'provider_treatment_stats': {}
+    }
+
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for layout in LAYOUTS:
+            runs[layout] = run_layout(layout, df, os.path.join(tmp_dir, f"{layout}.db"), open_from, queries, repeat)
+
+    table, partitioned = runs['table'][0], runs['partitioned'][0]
+    print(f"\n{'Step':<40}{'Table s':>10}{'Partitioned s':>15}{'Speedup':>9}")
+    for step in table:
+        print(f"{step:<40}{table[step]:>10.3f}{partitioned[step]:>15.3f}{table[step] / partitioned[step]:>8.1f}x")
+
+    # Sums over partitions add the same values in another order: compared to the float tolerance
+    for name in queries:
+        expected, actual = (runs[layout][1][name].sort_values(list(runs[layout][1][name].columns[:2]))
+                            .reset_index(drop=True) for layout in LAYOUTS)
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+        except AssertionError:
+            print(f"{name} returns different results on the partitioned layout!")
+            return 1
+    print("\nQuery results match.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare TREATMENT as one table and as per-year partitions.")
+    parser.add_argument('--csv', default=get_default_paths()[0], help="processed CSV spanning several outcome years")
+    parser.add_argument('--open-from', type=int, default=None,
+                        help="first year loaded incrementally; earlier years are history (default: last year - 1)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per query; the best time is reported")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"CSV not found at: {args.csv}")
+        sys.exit(1)
+    sys.exit(benchmark(args.csv, args.open_from, args.repeat))
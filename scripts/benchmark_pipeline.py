@@ -0,0 +1,128 @@
+# benchmark_pipeline.py
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from generate_synthetic_data import generate_raw_file
+from instrumentation import reset_peak_rss, peak_rss_mb
+
+STAGES = ['bronze', 'silver', 'indexes']
+
+# Function to run one pipeline stage on a scratch project. It runs in a fresh process so the
+# RSS high-water mark belongs to that stage alone (pool workers of a parallel bronze are not included).
+def run_stage(stage, base_dir, options):
+    from run_etl import run_etl
+    from Create_Indexes import create_indexes
+    import transform_to_silver
+
+    project_dir = Path(base_dir) / "Healthcare_ETL_Project"
+    db_path = str(project_dir / "db" / "healthcare_data.db")
+    reset_peak_rss()
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if stage == 'bronze':
+            run_etl(chunksize=options['chunksize'], base_dir=base_dir, workers=options['workers'],
+                    output_format=options['format'])
+        elif stage == 'silver':
+            transform_to_silver.main(mode=options['mode'], db_path=db_path, input_format=options['format'],
+                                     processed_csv_path=str(project_dir / "processed" / "Healthcare_Dataset.csv"))
+        else:
+            create_indexes(db_path)
+        seconds = time.perf_counter() - start
+    return seconds, peak_rss_mb()
+
+# Function to generate a dataset of `rows` treatments and time every stage on it
+def run_size(rows, work_dir, options):
+    from Create_Schema import create_database_schema
+
+    base_dir = Path(work_dir) / f"rows_{rows}"
+    project_dir = base_dir / "Healthcare_ETL_Project"
+    (project_dir / "raw_data").mkdir(parents=True)
+    (project_dir / "db").mkdir()
+
+    start = time.perf_counter()
+    generate_raw_file(project_dir / "raw_data" / f"synthetic_{rows}.csv", rows, seed=options['seed'],
+                      hospital_change_rate=options['hospital_change_rate'])
+    print(f"Generated {rows} rows in {time.perf_counter() - start:.1f}s", flush=True)
+    with redirect_stdout(io.StringIO()):
+        create_database_schema(str(project_dir / "db" / "healthcare_data.db"))
+
+    results = {}
+    for stage in STAGES:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            seconds, peak = pool.submit(run_stage, stage, str(base_dir), options).result()
+        results[stage] = {'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds, 1),
+                          'peak_rss_mb': round(peak, 1)}
+        print(f"  {stage:<8}{seconds:>10.2f}s{rows / seconds:>14,.0f} rows/s{peak:>10.1f} MB", flush=True)
+    return results
+
+# Function to compare rows/sec with a previous results file; returns the regressions beyond `tolerance`
+def compare_with_baseline(results, baseline, tolerance):
+    regressions = []
+    for rows, stages in results.items():
+        for stage, result in stages.items():
+            previous = baseline.get('results', {}).get(rows, {}).get(stage)
+            if previous and result['rows_per_second'] < previous['rows_per_second'] * (1 - tolerance):
+                regressions.append(f"{stage} at {rows} rows: {result['rows_per_second']:,.0f} rows/s "
+                                   f"vs {previous['rows_per_second']:,.0f} in the baseline")
+    return regressions
+
+def benchmark(sizes, options, output=None, baseline_path=None, tolerance=0.2, work_dir=None):
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for rows in sizes:
+            print(f"Benchmarking {rows} rows", flush=True)
+            results[str(rows)] = run_size(rows, tmp_dir, options)
+
+    print(f"\n{'Rows':>12}  {'Stage':<8}{'Seconds':>10}{'Rows/sec':>14}{'Peak RSS MB':>13}")
+    for rows, stages in results.items():
+        for stage, result in stages.items():
+            print(f"{int(rows):>12}  {stage:<8}{result['seconds']:>10.2f}{result['rows_per_second']:>14,.0f}"
+                  f"{result['peak_rss_mb']:>13.1f}")
+
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'options': options, 'results': results}
+    output = output or os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project', 'run_reports',
+                                    f"benchmark_pipeline_{datetime.now().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(output)}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare_with_baseline(results, json.load(f), tolerance)
+        if regressions:
+            print(f"Throughput regressed by more than {tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No stage regressed by more than {tolerance:.0%} against {baseline_path}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bronze, silver and index stages on synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help="dataset sizes to generate (10000 to 50000000)")
+    parser.add_argument('--hospital-change-rate', type=float, default=0.1,
+                        help="share of providers changing hospital (drives SCD Type II versions)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="intermediate format")
+    parser.add_argument('--mode', choices=['bulk', 'row'], default='bulk', help="silver loader")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="bronze chunk size")
+    parser.add_argument('--workers', type=int, default=1, help="bronze worker processes")
+    parser.add_argument('--output', default=None, help="results JSON (default Healthcare_ETL_Project/run_reports)")
+    parser.add_argument('--baseline', default=None, help="previous results JSON to gate against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed rows/sec drop against the baseline")
+    parser.add_argument('--work-dir', default=None, help="where the scratch projects are created (default: system temp)")
+    args = parser.parse_args()
+
+    options = {'seed': args.seed, 'hospital_change_rate': args.hospital_change_rate, 'format': args.format,
+               'mode': args.mode, 'chunksize': args.chunksize, 'workers': args.workers}
+    sys.exit(benchmark(args.rows, options, args.output, args.baseline, args.tolerance, args.work_dir))
@@ -0,0 +1,104 @@
+# benchmark_provider_scd.py
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import pandas as pd
+from Create_Schema import create_database_schema
+from provider_scd_merge import PROVIDER_ATTRIBUTES, merge_provider_scd2, reassign_hospitals
+from transform_to_silver import upsert_provider_version
+
+HOSPITALS = ['Mayo Clinic', 'Cleveland Clinic', 'Johns Hopkins Hospital', 'Massachusetts General Hospital',
+             'Mount Sinai Hospital', 'UCLA Medical Center', 'Cedars-Sinai Medical Center']
+
+# Function to build the seeded providers and an incoming batch where `change_rate` of them moved hospital.
+# Like the processed data, the batch repeats each provider once per treatment (`rows_per_provider` times).
+def make_providers(count, change_rate, rows_per_provider, seed=42):
+    rng = random.Random(seed)
+    seeded = pd.DataFrame({
+        'Provider_ID': range(1, count + 1),
+        'First_Name': [f"First{i}" for i in range(1, count + 1)],
+        'Last_Name': [f"Last{i}" for i in range(1, count + 1)],
+        'Speciality_Id': [i % 12 for i in range(1, count + 1)],
+        'Speciality_Name': [f"Speciality{i % 12}" for i in range(1, count + 1)],
+        'Affiliated_Hospital': [rng.choice(HOSPITALS) for _ in range(count)]
+    })
+    incoming = seeded.copy()
+    moved = incoming.sample(frac=change_rate, random_state=seed).index
+    incoming.loc[moved, 'Affiliated_Hospital'] = [
+        rng.choice([h for h in HOSPITALS if h != current]) for current in incoming.loc[moved, 'Affiliated_Hospital']]
+    batch = pd.concat([incoming] * rows_per_provider, ignore_index=True)
+    return seeded, batch, incoming.loc[moved]
+
+def apply_trigger(conn, incoming, moved):
+    conn.executemany('''
+    UPDATE PROVIDER SET Affiliated_Hospital = ?
+    WHERE Provider_ID = ? AND Is_Current = 1
+    ''', [(hospital, int(provider_id)) for provider_id, hospital in moved[['Provider_ID', 'Affiliated_Hospital']].itertuples(index=False)])
+
+def apply_staged(conn, incoming, moved):
+    reassign_hospitals(conn, moved)
+
+def apply_row(conn, incoming, moved):
+    cursor = conn.cursor()
+    for provider in incoming.astype(object).itertuples(index=False, name=None):
+        upsert_provider_version(cursor, provider, '2024-06-01')
+
+def apply_merge(conn, incoming, moved):
+    merge_provider_scd2(conn, incoming, '2024-06-01')
+
+PATHS = {
+    'trigger': apply_trigger,
+    'staged': apply_staged,
+    'row': apply_row,
+    'merge': apply_merge
+}
+
+def benchmark(count, change_rate, rows_per_provider):
+    seeded, incoming, moved = make_providers(count, change_rate, rows_per_provider)
+    print(f"{count} providers, {len(moved)} changed hospital, {len(incoming)} incoming rows")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, apply in PATHS.items():
+            db_path = os.path.join(tmp_dir, f"{name}.db")
+            create_database_schema(db_path, scd_trigger=(name == 'trigger'))
+            conn = sqlite3.connect(db_path)
+            merge_provider_scd2(conn, seeded, '2024-01-01')
+            conn.commit()
+
+            start = time.perf_counter()
+            apply(conn, incoming, moved)
+            conn.commit()
+            elapsed = time.perf_counter() - start
+
+            state = pd.read_sql_query('''
+            SELECT Provider_ID, Affiliated_Hospital, Is_Current, Valid_To IS NULL AS Open_Ended
+            FROM PROVIDER ORDER BY Provider_ID, Is_Current, Affiliated_Hospital
+            ''', conn)
+            log_rows = conn.execute('SELECT COUNT(*) FROM PROVIDER_LOG').fetchone()[0]
+            conn.close()
+            results[name] = (elapsed, state, log_rows)
+
+    print(f"\n{'Path':<10}{'Seconds':>10}{'Providers/sec':>16}{'Versions':>10}{'Log rows':>10}")
+    for name, (elapsed, state, log_rows) in results.items():
+        print(f"{name:<10}{elapsed:>10.3f}{count / elapsed:>16,.0f}{len(state):>10}{log_rows:>10}")
+
+    reference = results['trigger'][1]
+    mismatched = [name for name, (_, state, _) in results.items() if not state.equals(reference)]
+    if mismatched:
+        print(f"Resulting PROVIDER history differs for: {', '.join(mismatched)}")
+        return 1
+    print("\nAll paths produce the same versions, Is_Current flags and open-ended Valid_To rows.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PROVIDER SCD2 trigger, staged reassignment, per-row and batch merge paths.")
+    parser.add_argument('--providers', type=int, default=5000)
+    parser.add_argument('--change-rate', type=float, default=0.3)
+    parser.add_argument('--rows-per-provider', type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(benchmark(args.providers, args.change_rate, args.rows_per_provider))
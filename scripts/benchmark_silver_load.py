@@ -0,0 +1,73 @@
+# benchmark_silver_load.py
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import pandas as pd
+from contextlib import nullcontext
+from Create_Schema import create_database_schema
+from Create_Indexes import create_indexes
+from sqlite_tuning import bulk_load_profile
+from transform_to_silver import LOADERS, SOURCE_COLUMNS, get_default_paths, prepare_dataframe, populate_effectiveness
+from file_processing import LINEAGE_COLUMNS
+from schema_manifest import read_options, read_header, coerce_types
+
+TABLES = ['PATIENT', 'PROVIDER', 'DISEASE', 'LOCATION', 'TREATMENT', 'PROVIDER_LOG']
+
+# Function to load the processed CSV into a fresh, indexed database with one loader and time it
+def run_loader(mode, df, db_path, tuned=False):
+    create_database_schema(db_path)
+    create_indexes(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        with bulk_load_profile(conn, drop_indexes=True) if tuned else nullcontext():
+            populate_effectiveness(conn.cursor())
+            LOADERS[mode](conn, prepare_dataframe(df.copy()))
+            conn.commit()
+        elapsed = time.perf_counter() - start
+
+        row_counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in TABLES}
+    finally:
+        conn.close()
+    return elapsed, row_counts
+
+def benchmark(processed_csv_path, modes, tuned=False):
+    df = coerce_types(pd.read_csv(processed_csv_path,
+                                    **read_options(read_header(processed_csv_path), SOURCE_COLUMNS + LINEAGE_COLUMNS)))
+    print(f"Benchmarking {len(df)} records from {processed_csv_path}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in modes:
+            elapsed, row_counts = run_loader(mode, df, os.path.join(tmp_dir, f"{mode}.db"))
+            results[mode] = (elapsed, row_counts)
+            if tuned:
+                elapsed, row_counts = run_loader(mode, df, os.path.join(tmp_dir, f"{mode}_tuned.db"), tuned=True)
+                results[f"{mode}+tuned"] = (elapsed, row_counts)
+
+    print(f"\n{'Loader':<14}{'Seconds':>10}{'Rows/sec':>12}  " + "  ".join(f"{t:>12}" for t in TABLES))
+    for mode, (elapsed, row_counts) in results.items():
+        print(f"{mode:<14}{elapsed:>10.2f}{len(df) / elapsed:>12,.0f}  " +
+              "  ".join(f"{row_counts[t]:>12}" for t in TABLES))
+
+    if len(results) > 1:
+        counts = [row_counts for _, row_counts in results.values()]
+        if any(c != counts[0] for c in counts[1:]):
+            print("Row counts differ between loaders!")
+            return 1
+        fastest = min(results, key=lambda m: results[m][0])
+        slowest = max(results, key=lambda m: results[m][0])
+        print(f"\nRow counts match. '{fastest}' is {results[slowest][0] / results[fastest][0]:.1f}x faster than '{slowest}'.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row counts and throughput of the silver loaders.")
+    parser.add_argument('--csv', default=get_default_paths()[0], help="processed CSV to load")
+    parser.add_argument('--modes', nargs='+', choices=sorted(LOADERS), default=['row', 'bulk'])
+    parser.add_argument('--tuned', action='store_true',
+                        help="also run each loader with the SQLite load profile and deferred index build")
+    args = parser.parse_args()
+    sys.exit(benchmark(args.csv, args.modes, args.tuned))
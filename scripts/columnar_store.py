@@ -0,0 +1,97 @@
+# columnar_store.py
+import os
+import pandas as pd
+from schema_manifest import DATE_COLUMNS, CATEGORY_COLUMNS, coerce_types, add_invalid_values
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+def require_pyarrow():
+    if pq is None:
+        raise ImportError("The Parquet intermediate format needs pyarrow: pip install pyarrow")
+
+# Function to give a processed frame typed datetime and categorical columns. A date that does not parse as
+# ISO 8601 becomes missing and is listed in invalid_values, so the silver validation quarantines its row as
+# it does for the processed CSV.
+def to_columnar(df):
+    found = []
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            values = df[column]
+            dates = pd.to_datetime(values, format='ISO8601', errors='coerce')
+            invalid = (values.notna() & dates.isna()).to_numpy()
+            if invalid.any():
+                found.append(column + '=' + values[invalid].astype(str))
+            df[column] = dates
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return add_invalid_values(df, found)
+
+# Arrow picks the smallest dictionary index per chunk; pin it to int32 so every row group shares one schema
+def _stable_schema(schema):
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return pa.schema(fields)
+
+# Function to write processed chunks of one source file as a single Parquet file (one row group per chunk).
+# The file is written under a temporary name and moved into place, so readers never see a partial file.
+def write_parquet(chunks, output_path):
+    require_pyarrow()
+    tmp_path = f"{output_path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(to_columnar(chunk), preserve_index=False)
+            if writer is None:
+                schema = _stable_schema(table.schema)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table.cast(schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return 0
+    os.replace(tmp_path, output_path)
+    return rows
+
+# Function to list the per-source Parquet files in a deterministic order
+def list_parquet_sources(parquet_dir):
+    if not os.path.isdir(parquet_dir):
+        return []
+    return sorted(os.path.join(parquet_dir, name) for name in os.listdir(parquet_dir) if name.endswith('.parquet'))
+
+def parquet_row_count(path):
+    require_pyarrow()
+    return pq.ParquetFile(path).metadata.num_rows
+
+# Function to read only the needed columns of a source, memory-mapped, starting at row_offset.
+# The columns get the schema_manifest.py types, the same as a read of the processed CSV.
+def read_parquet_source(path, columns=None, row_offset=0):
+    require_pyarrow()
+    if columns is not None:
+        # Columns added to the processed layout later (e.g. invalid_values) are absent from older files
+        names = pq.read_schema(path).names
+        columns = [column for column in columns if column in names]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    if row_offset:
+        table = table.slice(row_offset)
+    return coerce_types(table.to_pandas())
+
+# Function to read the (source_file, source_batch) lineage of a per-source Parquet file from its first row
+# group; None for files written before the lineage columns existed
+def parquet_lineage(path):
+    require_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    if 'source_file' not in parquet_file.schema_arrow.names or parquet_file.metadata.num_rows == 0:
+        return None
+    first = parquet_file.read_row_group(0, columns=['source_file', 'source_batch'])
+    return first.column('source_file')[0].as_py(), first.column('source_batch')[0].as_py()
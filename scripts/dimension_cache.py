@@ -0,0 +1,100 @@
+# dimension_cache.py
+import pandas as pd
+
+LOCATION_COLUMNS = ['country', 'state', 'city']
+
+# In-process cache of the surrogate/natural keys already stored in PATIENT, DISEASE and LOCATION.
+# It is preloaded from SQLite once per run and updated as members are inserted, so only new members
+# reach the database. One lookup is counted per treatment row and dimension: a hit is resolved in
+# memory, a miss is a new member that had to be written.
+# The cache trusts the connection it was loaded from: reload it after a rollback.
+class DimensionKeyCache:
+    def __init__(self, conn=None):
+        self.patients = set()
+        self.diseases = set()
+        self.locations = {}
+        self.stats = {table: {'hits': 0, 'misses': 0} for table in ['PATIENT', 'DISEASE', 'LOCATION']}
+        if conn is not None:
+            self.load(conn)
+
+    def load(self, conn):
+        self.patients = {patient_id for (patient_id,) in conn.execute('SELECT Patient_ID FROM PATIENT')}
+        self.diseases = {disease_id for (disease_id,) in conn.execute('SELECT Disease_ID FROM DISEASE')}
+        self.locations = {(country, state, city): location_id for location_id, country, state, city in
+                          conn.execute('SELECT Location_ID, Country, State, City FROM LOCATION')}
+
+    def _count(self, table, hits, misses):
+        self.stats[table]['hits'] += int(hits)
+        self.stats[table]['misses'] += int(misses)
+
+    # Per-row lookups (row loader): True when the member still has to be inserted
+    def patient_missing(self, patient_id):
+        return self._missing('PATIENT', self.patients, patient_id)
+
+    def disease_missing(self, disease_id):
+        return self._missing('DISEASE', self.diseases, disease_id)
+
+    def _missing(self, table, keys, key):
+        missing = key not in keys
+        self._count(table, not missing, missing)
+        keys.add(key)
+        return missing
+
+    def location_id(self, country, state, city):
+        location_id = self.locations.get((country, state, city))
+        self._count('LOCATION', location_id is not None, location_id is None)
+        return location_id
+
+    # Function to write a new LOCATION member and cache its Location_ID
+    def insert_location(self, cursor, key):
+        cursor.execute('INSERT OR IGNORE INTO LOCATION (Country, State, City) VALUES (?, ?, ?)', key)
+        if cursor.rowcount == 1:
+            self.locations[key] = cursor.lastrowid
+        else:
+            self.locations[key] = cursor.execute(
+                'SELECT Location_ID FROM LOCATION WHERE Country = ? AND State = ? AND City = ?', key).fetchone()[0]
+        return self.locations[key]
+
+    # Batch lookups (bulk loader): the deduplicated members of `members` that are not cached yet
+    def new_patients(self, members, rows):
+        return self._new_members('PATIENT', self.patients, members, 'patient_id', rows)
+
+    def new_diseases(self, members, rows):
+        return self._new_members('DISEASE', self.diseases, members, 'disease_id', rows)
+
+    def _new_members(self, table, keys, members, key_column, rows):
+        new = members[~members[key_column].isin(keys)]
+        self._count(table, rows - len(new), len(new))
+        keys.update(new[key_column].tolist())
+        return new
+
+    # Function to resolve the Location_ID of every row of `df`, inserting the new members first
+    def resolve_locations(self, cursor, df):
+        locations = df[LOCATION_COLUMNS].drop_duplicates()
+        keys = list(locations.itertuples(index=False, name=None))
+        inserted = 0
+        for key in keys:
+            if key not in self.locations:
+                self.insert_location(cursor, key)
+                inserted += 1
+        self._count('LOCATION', len(df) - inserted, inserted)
+
+        locations = locations.astype(object).assign(location_id=[self.locations[key] for key in keys])
+        location_ids = df[LOCATION_COLUMNS].astype(object).merge(locations, on=LOCATION_COLUMNS, how='left')
+        return location_ids['location_id'], inserted
+
+    # Function to drop members deleted from the database (e.g. orphans of a replaced source partition)
+    def forget(self, patient_ids=(), disease_ids=(), location_ids=()):
+        self.patients.difference_update(patient_ids)
+        self.diseases.difference_update(disease_ids)
+        location_ids = set(location_ids)
+        self.locations = {key: location_id for key, location_id in self.locations.items()
+                          if location_id not in location_ids}
+
+    def report(self):
+        lines = []
+        for table, counter in self.stats.items():
+            lookups = counter['hits'] + counter['misses']
+            rate = counter['hits'] / lookups if lookups else 0
+            lines.append(f"{table}: {counter['hits']} hits, {counter['misses']} misses ({rate:.1%} resolved in memory)")
+        return lines
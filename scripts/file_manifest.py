@@ -0,0 +1,95 @@
+# file_manifest.py
+import os
+import sqlite3
+import hashlib
+from datetime import datetime
+
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# One row per raw file name: the stat signature and content hash of the delivery that was processed.
+# Source_Batch counts the deliveries of a name (1 for the first, +1 for every re-delivery).
+MANIFEST_TABLE = '''
+CREATE TABLE IF NOT EXISTS FILE_MANIFEST (
+    File_Name TEXT PRIMARY KEY,
+    Size INTEGER,
+    Mtime_NS INTEGER,
+    Content_Hash TEXT,
+    Source_Batch INTEGER,
+    Rows INTEGER,
+    Processed_At TEXT
+);
+'''
+
+def open_manifest(manifest_path):
+    conn = sqlite3.connect(manifest_path)
+    conn.execute(MANIFEST_TABLE)
+    return conn
+
+def content_hash(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to decide what to do with a raw file. Returns (status, delivery) where status is
+# 'unchanged', 'new' or 'changed' and delivery holds the signature to record once it is processed.
+# An unchanged size and mtime is trusted without reading the file; otherwise the content is hashed,
+# so a file that was only touched or copied is not reprocessed.
+def classify_file(conn, file_path):
+    stat = os.stat(file_path)
+    delivery = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': None, 'batch': 1}
+    row = conn.execute('SELECT Size, Mtime_NS, Content_Hash, Source_Batch FROM FILE_MANIFEST WHERE File_Name = ?',
+                       (os.path.basename(file_path),)).fetchone()
+    if row is None:
+        delivery['hash'] = content_hash(file_path)
+        return 'new', delivery
+
+    size, mtime_ns, known_hash, batch = row
+    if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        return 'unchanged', delivery
+
+    delivery['hash'] = content_hash(file_path)
+    if delivery['hash'] == known_hash:
+        # Same content: refresh the stat signature so the next run skips it with the cheap check
+        conn.execute('UPDATE FILE_MANIFEST SET Size = ?, Mtime_NS = ? WHERE File_Name = ?',
+                     (stat.st_size, stat.st_mtime_ns, os.path.basename(file_path)))
+        conn.commit()
+        return 'unchanged', delivery
+    delivery['batch'] = (batch or 1) + 1
+    return 'changed', delivery
+
+# Function to record a processed delivery; committed at once so a crash never loses a finished file
+def record_delivery(conn, file_path, delivery, rows):
+    conn.execute('''
+    INSERT INTO FILE_MANIFEST (File_Name, Size, Mtime_NS, Content_Hash, Source_Batch, Rows, Processed_At)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(File_Name) DO UPDATE SET
+        Size = excluded.Size, Mtime_NS = excluded.Mtime_NS, Content_Hash = excluded.Content_Hash,
+        Source_Batch = excluded.Source_Batch, Rows = excluded.Rows, Processed_At = excluded.Processed_At
+    ''', (os.path.basename(file_path), delivery['size'], delivery['mtime_ns'], delivery['hash'], delivery['batch'],
+          rows, datetime.now().isoformat(timespec='seconds')))
+    conn.commit()
+
+# Function to import the names listed in the legacy processed_files.txt. Files still on disk are assumed
+# to have been processed as they are now; names no longer on disk are recorded without a signature, so
+# the file counts as a re-delivery if it comes back. Returns the imported names.
+def migrate_processed_list(conn, metadata_file, raw_data_dir):
+    if not os.path.exists(metadata_file):
+        return []
+    with open(metadata_file) as f:
+        names = [name for name in f.read().splitlines() if name]
+
+    known = {name for (name,) in conn.execute('SELECT File_Name FROM FILE_MANIFEST')}
+    imported = []
+    for name in names:
+        file_path = os.path.join(raw_data_dir, name)
+        if name in known:
+            continue
+        delivery = {'size': None, 'mtime_ns': None, 'hash': None, 'batch': 1}
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            delivery.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, hash=content_hash(file_path))
+        record_delivery(conn, file_path, delivery, None)
+        imported.append(name)
+    return imported
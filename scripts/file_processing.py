@@ -2,32 +2,84 @@
 import pandas as pd
 from pathlib import Path
 from mappings import apply_mappings, apply_hospital_mapping, convert_cost
+from instrumentation import RunMetrics
+from schema_manifest import RAW_COLUMNS, read_options, read_header, coerce_types
 import os
 
+DEFAULT_CHUNKSIZE = 100_000
+
+# Lineage columns added to every processed row: the raw file it came from and that file's delivery number
+LINEAGE_COLUMNS = ['source_file', 'source_batch']
+
+# Function to apply the mappings and transformations to one frame (a whole file or a chunk).
+# Keys and measures that are not numbers are left missing and listed in the invalid_values column, which is
+# written with the processed rows so the silver load can quarantine them.
+def process_dataframe(df):
+    df = coerce_types(df)
+    df = apply_mappings(df)
+    df = apply_hospital_mapping(df)
+    df = convert_cost(df)
+    return df
+
+# Function to tag processed rows with their source, given as (file name, delivery number)
+def tag_source(df, source):
+    if source:
+        df['source_file'], df['source_batch'] = source
+    return df
+
+# Function to read the column names of an existing CSV output (None when there is none yet)
+def csv_header(output_path):
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return None
+    return list(pd.read_csv(output_path, nrows=0).columns)
+
+# Function to get the typed read of a raw file (schema_manifest.py); dates stay text in bronze
+def bronze_read_options(source, chunked=False):
+    return read_options(read_header(source), RAW_COLUMNS, parse_dates=False, chunked=chunked)
+
 # Function to load and process the file
-def load_and_process_file(file_path):
+def load_and_process_file(file_path, metrics=None, source=None):
+    metrics = metrics or RunMetrics('bronze')
     if file_path.suffix == ".csv":
-        df = pd.read_csv(file_path)
+        with metrics.stage('parse') as stage:
+            df = pd.read_csv(file_path, **bronze_read_options(file_path))
+            stage['rows'] = len(df)
 
         # Apply mappings and transformations
-        df = apply_mappings(df)
-        df = apply_hospital_mapping(df)
-        df = convert_cost(df)  
-        return df
+        with metrics.stage('transform', rows=len(df)):
+            return tag_source(process_dataframe(df), source)
     else:
         print(f"Unsupported file format: {file_path.name}")
         return pd.DataFrame()
 
-# Function to mark a file as processed
-def mark_file_processed(file_path, metadata_file="processed_files.txt"):
-    file_name = file_path.name
-    if os.path.exists(metadata_file):
-        with open(metadata_file, "r") as f:
-            existing = set(f.read().splitlines())
-    else:
-        existing = set()
-
-    if file_name not in existing:
-        with open(metadata_file, "a") as f:
-            f.write(f"{file_name}\n")
+# Function to read and process a raw file in chunks of `chunksize` rows
+def iter_processed_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, metrics=None, source=None):
+    metrics = metrics or RunMetrics('bronze')
+    if file_path.suffix != ".csv":
+        print(f"Unsupported file format: {file_path.name}")
+        return
+    with pd.read_csv(file_path, chunksize=chunksize, **bronze_read_options(file_path, chunked=True)) as reader:
+        while True:
+            with metrics.stage('parse') as stage:
+                chunk = next(reader, None)
+                stage['rows'] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            with metrics.stage('transform', rows=len(chunk)):
+                chunk = tag_source(process_dataframe(chunk), source)
+            yield chunk
 
+# Function to stream a raw file into the processed output one chunk at a time,
+# so memory stays bounded by the chunk size instead of the file size.
+# `columns` keeps the layout of an existing output (e.g. a processed CSV written before the lineage columns).
+def stream_process_file(file_path, output_path, chunksize=DEFAULT_CHUNKSIZE, metrics=None, source=None, columns=None):
+    metrics = metrics or RunMetrics('bronze')
+    rows = 0
+    for chunk in iter_processed_chunks(file_path, chunksize, metrics, source):
+        with metrics.stage('write', rows=len(chunk)):
+            if columns:
+                chunk = chunk.reindex(columns=columns)
+            write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+            chunk.to_csv(output_path, mode='a', header=write_header, index=False)
+        rows += len(chunk)
+    return rows
@@ -0,0 +1,165 @@
+# generate_synthetic_data.py
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from mappings import hospital_mapping
+from schema_manifest import RAW_COLUMNS
+
+# Raw (pre-mapping) locations: every state/city pair is one the bronze mappings translate
+STATE_CITIES = [
+    ('Karnataka', 'Mysore'), ('Karnataka', 'Bangalore'), ('Karnataka', 'Mangalore'), ('Punjab', 'Amritsar'),
+    ('Punjab', 'Chandigarh'), ('Maharashtra', 'Pune'), ('Haryana', 'Faridabad'), ('Uttar Pradesh', 'Varanasi'),
+    ('Uttar Pradesh', 'Lucknow'), ('Madhya Pradesh', 'Gwalior'), ('Rajasthan', 'Jaipur'), ('Tamil Nadu', 'Madurai'),
+    ('West Bengal', 'Darjeeling')
+]
+HOSPITALS = list(hospital_mapping)
+SPECIALITIES = ['Radiology', 'Cardiology', 'Nephrology', 'Psychiatry', 'Urology', 'Oncology', 'Dermatology',
+                'Pediatrics']
+# (name, type, severity, transmission mode, mortality rate)
+DISEASES = [
+    ('Pneumonia', 'Infectious', 'Moderate', 'Airborne', 0.1),
+    ('Bone Fractures', 'Acute', 'Moderate', 'Indirect contact', 0.01),
+    ('Tumors', 'Non-infectious', 'Severe', 'Indirect contact', 0.2),
+    ('Kidney Stones', 'Non-infectious', 'Moderate', 'Indirect contact', 0.01),
+    ('Influenza', 'Infectious', 'Mild', 'Airborne', 0.02),
+    ('Hypertension', 'Chronic', 'Moderate', 'Non-communicable', 0.05),
+    ('Diabetes', 'Chronic', 'Severe', 'Non-communicable', 0.08),
+    ('Migraine', 'Chronic', 'Mild', 'Non-communicable', 0.0),
+    ('Dermatitis', 'Non-infectious', 'Mild', 'Direct contact', 0.0),
+    ('Depression', 'Chronic', 'Moderate', 'Non-communicable', 0.03)
+]
+OUTCOME_STATUSES = ['successful', 'stable', 'partially successful', 'unsuccessful', 'worsened', 'deceased']
+OUTCOME_WEIGHTS = [0.35, 0.25, 0.15, 0.1, 0.1, 0.05]
+TREATMENT_TYPES = ['pharmacological', 'surgical', 'preventive', 'therapeutic']
+FIRST_NAMES = ['Nandini', 'Kian', 'Namrata', 'Rashmi', 'Avani', 'Arjun', 'Rohan', 'Isha', 'Vikram', 'Meera',
+               'Aditya', 'Priya', 'Kabir', 'Sana', 'Dev', 'Anaya']
+LAST_NAMES = ['Srivastava', 'Menon', 'Joshi', 'Kulkarni', 'Chopra', 'Tripathi', 'Rao', 'Iyer', 'Nair', 'Gupta',
+              'Mehta', 'Reddy', 'Das', 'Bose']
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Function to build the dimension members every chunk draws from, so a provider, patient or disease
+# always carries the same attributes. `hospital_change_rate` is the share of providers that move to
+# another hospital once, at a random point of the generated period (new SCD Type II versions).
+def build_members(rng, providers, patients, hospital_change_rate):
+    provider_ids = np.arange(1, providers + 1)
+    speciality_ids = rng.integers(1, len(SPECIALITIES) + 1, providers)
+    first_hospital = rng.integers(0, len(HOSPITALS), providers)
+    changes = rng.random(providers) < hospital_change_rate
+    provider_members = pd.DataFrame({
+        'provider_id': provider_ids,
+        'provider_name': pd.Series(rng.choice(FIRST_NAMES, providers)) + ' ' + rng.choice(LAST_NAMES, providers),
+        'speciality_id_x': speciality_ids,
+        'speciality_name': np.array(SPECIALITIES)[speciality_ids - 1],
+        'first_hospital': first_hospital,
+        'second_hospital': (first_hospital + rng.integers(1, len(HOSPITALS), providers)) % len(HOSPITALS),
+        # Position in the period (0-1) from which the provider works at the second hospital
+        'change_at': np.where(changes, rng.uniform(0.1, 0.9, providers), 2.0)
+    })
+
+    patient_members = pd.DataFrame({
+        'patient_id': np.arange(1, patients + 1),
+        'patient_name': pd.Series(rng.choice(FIRST_NAMES, patients)) + ' ' + rng.choice(LAST_NAMES, patients),
+        'gender': rng.choice(['Male', 'Female'], patients),
+        'age': rng.integers(1, 90, patients)
+    })
+
+    disease_members = pd.DataFrame(DISEASES, columns=['disease_name', 'disease_type', 'severity',
+                                                      'transmission_mode', 'mortality_rate'])
+    disease_members.insert(0, 'disease_id', np.arange(1, len(DISEASES) + 1))
+    disease_members.insert(1, 'speciality_id_y', rng.integers(1, len(SPECIALITIES) + 1, len(DISEASES)))
+    return provider_members, patient_members, disease_members
+
+# Function to generate treatments [first_row, first_row + rows) of a `total_rows` dataset.
+# Start dates grow with treatment_id across `days`, like an append-only extract.
+def generate_chunk(rng, members, first_row, rows, total_rows, start_date, days):
+    provider_members, patient_members, disease_members = members
+    positions = (np.arange(first_row, first_row + rows) + rng.random(rows)) / total_rows
+
+    start = pd.Timestamp(start_date) + pd.to_timedelta(np.round(positions * days * 86400), unit='s')
+    duration = rng.integers(1, 15, rows)
+    completion = start + pd.to_timedelta(duration, unit='D')
+    outcome = completion + pd.to_timedelta(rng.integers(0, 10, rows), unit='D')
+
+    providers = provider_members.iloc[rng.integers(0, len(provider_members), rows)].reset_index(drop=True)
+    hospital = np.where(positions >= providers['change_at'].to_numpy(),
+                        providers['second_hospital'].to_numpy(), providers['first_hospital'].to_numpy())
+    patients = patient_members.iloc[rng.integers(0, len(patient_members), rows)].reset_index(drop=True)
+    diseases = disease_members.iloc[rng.integers(0, len(disease_members), rows)].reset_index(drop=True)
+    location = rng.integers(0, len(STATE_CITIES), rows)
+    outcome_text = outcome.strftime(DATE_FORMAT)
+
+    chunk = pd.DataFrame({
+        'treatment_id': np.arange(first_row + 1, first_row + rows + 1),
+        'treatment_start_date': start.strftime(DATE_FORMAT),
+        'treatment_completion_date': completion.strftime(DATE_FORMAT),
+        'treatment_outcome_status': rng.choice(OUTCOME_STATUSES, rows, p=OUTCOME_WEIGHTS),
+        'treatment_outcome_date': outcome_text,
+        'treatment_duration': duration,
+        # Costs are in INR, bronze converts them to USD
+        'treatment_cost': rng.uniform(1000, 100000, rows).round(2),
+        'treatment_type': rng.choice(TREATMENT_TYPES, rows),
+        'provider_id': providers['provider_id'],
+        'provider_name': providers['provider_name'],
+        'speciality_id_x': providers['speciality_id_x'],
+        'speciality_name': providers['speciality_name'],
+        'affiliated_hospital': np.array(HOSPITALS)[hospital],
+        'location_id': location + 1,
+        'country': 'India',
+        'state': np.array([state for state, _ in STATE_CITIES])[location],
+        'city': np.array([city for _, city in STATE_CITIES])[location],
+        'patient_id': patients['patient_id'],
+        'patient_name': patients['patient_name'],
+        'gender': patients['gender'],
+        'age': patients['age'],
+        'disease_id': diseases['disease_id'],
+        'speciality_id_y': diseases['speciality_id_y'],
+        'disease_name': diseases['disease_name'],
+        'disease_type': diseases['disease_type'],
+        'severity': diseases['severity'],
+        'transmission_mode': diseases['transmission_mode'],
+        'mortality_rate': diseases['mortality_rate'],
+        'added_at': outcome_text,
+        'modified_at': outcome_text
+    })
+    return chunk[RAW_COLUMNS]
+
+# Function to stream a synthetic raw extract to `output_path` in chunks (memory is bounded by chunksize).
+# The same seed and chunksize always produce the same file.
+def generate_raw_file(output_path, rows, seed=42, chunksize=500_000, providers=200, patients=None,
+                      hospital_change_rate=0.1, start_date='2024-01-01', days=730):
+    rng = np.random.default_rng(seed)
+    patients = patients or max(100, rows // 20)
+    members = build_members(rng, providers, patients, hospital_change_rate)
+
+    tmp_path = f"{output_path}.tmp"
+    for first_row in range(0, rows, chunksize):
+        chunk = generate_chunk(rng, members, first_row, min(chunksize, rows - first_row), rows, start_date, days)
+        chunk.to_csv(tmp_path, mode='w' if first_row == 0 else 'a', header=first_row == 0, index=False)
+    os.replace(tmp_path, output_path)
+    return rows
+
+if __name__ == "__main__":
+    default_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project', 'raw_data'))
+    parser = argparse.ArgumentParser(description="Write a synthetic raw healthcare extract in the Kaggle column layout.")
+    parser.add_argument('--rows', type=int, default=10_000, help="number of treatments (e.g. 10000 to 50000000)")
+    parser.add_argument('--output', default=None, help=f"CSV to write (default {default_dir}/synthetic_<rows>.csv)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunksize', type=int, default=500_000, help="rows generated and written per chunk")
+    parser.add_argument('--providers', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=None, help="distinct patients (default rows / 20)")
+    parser.add_argument('--hospital-change-rate', type=float, default=0.1,
+                        help="share of providers that change their affiliated hospital during the period")
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--days', type=int, default=730, help="length of the treatment period")
+    args = parser.parse_args()
+
+    if not 0 <= args.hospital_change_rate <= 1:
+        print("--hospital-change-rate must be between 0 and 1")
+        sys.exit(1)
+    output = args.output or os.path.join(default_dir, f"synthetic_{args.rows}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    generate_raw_file(output, args.rows, args.seed, args.chunksize, args.providers, args.patients,
+                      args.hospital_change_rate, args.start_date, args.days)
+    print(f"Wrote {args.rows} synthetic treatments to {output}")
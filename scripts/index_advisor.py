@@ -0,0 +1,150 @@
+# index_advisor.py
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from analytics_queries import ANALYTICAL_QUERIES, LOADER_QUERIES
+from treatment_partitions import existing_index_names, expand_index_statements
+
+# Composite/covering indexes matching the registered workload: (name, CREATE statement, queries served)
+RECOMMENDED_INDEXES = [
+    ('idx_provider_current',
+     'CREATE INDEX IF NOT EXISTS idx_provider_current ON PROVIDER(Provider_ID, Is_Current)',
+     'provider_current_version'),
+    ('idx_provider_hospital_history',
+     'CREATE INDEX IF NOT EXISTS idx_provider_hospital_history ON PROVIDER(Provider_ID, Affiliated_Hospital, Valid_From)',
+     'doctors_changed_hospital_count, doctors_changed_hospital_details'),
+    ('idx_treatment_type_durations',
+     'CREATE INDEX IF NOT EXISTS idx_treatment_type_durations ON TREATMENT(Type, Treatment_Duration, Report_Duration)',
+     'avg_duration_by_type, avg_report_duration_by_type'),
+    ('idx_treatment_outcome_day',
+     'CREATE INDEX IF NOT EXISTS idx_treatment_outcome_day ON TREATMENT(Outcome_Day)',
+     'most_common_outcome_day'),
+    ('idx_treatment_provider_stats',
+     'CREATE INDEX IF NOT EXISTS idx_treatment_provider_stats ON TREATMENT(Provider_ID, Cost, Effectiveness_Score)',
+     'provider_treatment_stats, top_providers_by_effectiveness'),
+    ('idx_treatment_disease_effectiveness',
+     'CREATE INDEX IF NOT EXISTS idx_treatment_disease_effectiveness ON TREATMENT(Disease_ID, Effectiveness_Score)',
+     'effectiveness_by_disease'),
+    ('idx_treatment_outcome_date_cost',
+     'CREATE INDEX IF NOT EXISTS idx_treatment_outcome_date_cost ON TREATMENT(Outcome_Date, Outcome_Quarter, Cost)',
+     'monthly_average_cost, total_cost_by_quarter')
+]
+
+def get_default_db_path():
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
+    return os.path.join(project_root, "db", "healthcare_data.db")
+
+def registered_queries():
+    return {**ANALYTICAL_QUERIES, **LOADER_QUERIES}
+
+def explain(conn, sql, params):
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+# Function to pick the problems out of a query plan: full scans of stored tables (scans of
+# CTE/subquery results are not counted) and temporary B-trees
+def plan_issues(plan, tables):
+    issues = []
+    for detail in plan:
+        if detail.startswith('SCAN ') and ' USING ' not in detail and detail.split()[1] in tables:
+            issues.append(f"full scan of {detail.split()[1]}")
+        elif detail.startswith('USE TEMP B-TREE'):
+            issues.append(detail.replace('USE ', '').lower())
+    return issues
+
+def indexes_used(plan):
+    used = set()
+    for detail in plan:
+        words = detail.split()
+        if 'INDEX' in words and words.index('INDEX') + 1 < len(words):
+            used.add(words[words.index('INDEX') + 1])
+    return used
+
+# Function to time a query (best of `repeat` runs, results fully fetched)
+def time_query(conn, sql, params, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def analyze_workload(conn, repeat=3):
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    report = {}
+    for name, query in registered_queries().items():
+        plan = explain(conn, query['sql'], query['params'])
+        report[name] = {
+            'plan': plan,
+            'issues': plan_issues(plan, tables),
+            'indexes': indexes_used(plan),
+            'seconds': time_query(conn, query['sql'], query['params'], repeat)
+        }
+    return report
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"{'Query':<36}{'ms':>10}  Issues")
+    for name, result in report.items():
+        issues = ', '.join(result['issues']) or '-'
+        print(f"{name:<36}{result['seconds'] * 1000:>10.2f}  {issues}")
+
+def unused_indexes(conn, report):
+    used = set().union(*(result['indexes'] for result in report.values()))
+    existing = [name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name")]
+    return [name for name in existing if name not in used]
+
+def advise(db_path, apply=False, repeat=3):
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return 1
+    conn = sqlite3.connect(db_path)
+    try:
+        before = analyze_workload(conn, repeat)
+        print_report("Current plans", before)
+
+        existing = existing_index_names(conn)
+        missing = [(name, sql, served) for name, sql, served in RECOMMENDED_INDEXES if name not in existing]
+        print("\nRecommended indexes:")
+        for name, sql, served in RECOMMENDED_INDEXES:
+            status = 'missing' if (name, sql, served) in missing else 'present'
+            print(f"  [{status}] {sql}  -- {served}")
+
+        unused = unused_indexes(conn, before)
+        if unused:
+            print(f"\nIndexes not used by any registered query: {', '.join(unused)}")
+
+        if not apply:
+            if missing:
+                print("\nRun with --apply to create the missing indexes.")
+            return 0
+
+        for name, sql, _ in missing:
+            start = time.perf_counter()
+            for statement in expand_index_statements(conn, [sql]):
+                conn.execute(statement)
+            print(f"Created {name} in {time.perf_counter() - start:.2f}s")
+        conn.execute('ANALYZE')
+        conn.commit()
+
+        after = analyze_workload(conn, repeat)
+        print_report("Plans after creating the recommended indexes", after)
+
+        print(f"\n{'Query':<36}{'Before ms':>12}{'After ms':>12}{'Speedup':>10}")
+        for name in before:
+            old, new = before[name]['seconds'], after[name]['seconds']
+            print(f"{name:<36}{old * 1000:>12.2f}{new * 1000:>12.2f}{old / new if new else float('inf'):>9.1f}x")
+        return 0
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain the registered workload and create the recommended indexes.")
+    parser.add_argument('--db', default=get_default_db_path())
+    parser.add_argument('--apply', action='store_true', help="create the missing recommended indexes")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per query (best is reported)")
+    args = parser.parse_args()
+    sys.exit(advise(args.db, args.apply, args.repeat))
@@ -0,0 +1,225 @@
+# instrumentation.py
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import resource
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+MB = 1024 * 1024
+
+# Function to get the peak resident set size of this process so far, in MB
+def max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return rss / MB if sys.platform == 'darwin' else rss / 1024
+
+# On Linux the RSS high-water mark (VmHWM) can be reset, which gives a true per-block peak.
+# Elsewhere the process-wide peak from getrusage is the best available figure.
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return max_rss_mb()
+
+# Function to get the statement type and target table of a SQL statement (the statements are
+# constants in the loaders, so the parse is cached)
+@lru_cache(maxsize=512)
+def statement_target(sql):
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else ''
+    match = re.search(r'\b(?:INTO|UPDATE|FROM|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?|INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+\s+ON)\s+([\w.]+)',
+                      sql, re.IGNORECASE)
+    table = match.group(1).upper() if match else '-'
+    return verb, table.replace('TEMP.', '')
+
+# Cursor counting every statement it executes (executemany counts one statement per parameter set)
+class CountingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        self.connection.metrics.count_sql(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        metrics = self.connection.metrics
+        if hasattr(seq_of_parameters, '__len__'):
+            metrics.count_sql(sql, len(seq_of_parameters))
+            return super().executemany(sql, seq_of_parameters)
+
+        def counted(parameters):
+            for params in parameters:
+                metrics.count_sql(sql)
+                yield params
+        return super().executemany(sql, counted(seq_of_parameters))
+
+# Connection whose cursors (including conn.execute and pandas' read_sql_query) count statements per table.
+# Statements run by triggers are not counted.
+class MetricsConnection(sqlite3.Connection):
+    metrics = None
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute does not go through cursor(), so the shortcuts are routed explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connect_with_metrics(db_path, metrics):
+    conn = sqlite3.connect(db_path, factory=MetricsConnection)
+    conn.metrics = metrics
+    return conn
+
+RUN_METRICS_TABLE = '''
+CREATE TABLE IF NOT EXISTS RUN_METRICS (
+    Run_ID TEXT PRIMARY KEY,
+    Run_Name TEXT,
+    Started_At TEXT,
+    Status TEXT,
+    Seconds REAL,
+    Rows INTEGER,
+    Rows_Per_Second REAL,
+    Bytes_Read INTEGER,
+    Peak_RSS_MB REAL,
+    Report TEXT
+);
+'''
+
+# Timings, throughput, memory and SQL statement counts of one ETL run.
+# Stages may run many times (per file, chunk or delta); their figures are accumulated.
+class RunMetrics:
+    # reset_peak=False keeps the process-wide high-water mark, for metrics recorded by concurrent threads
+    def __init__(self, run_name, options=None, reset_peak=True):
+        self.run_name = run_name
+        self.options = options or {}
+        self.started_at = datetime.now()
+        self.run_id = f"{self.started_at.strftime('%Y%m%dT%H%M%S%f')}_{run_name}"
+        self.stages = {}
+        self.sql = {}
+        self.rows = 0
+        self.bytes_read = 0
+        self.status = 'running'
+        self._start = time.perf_counter()
+        self._active = 0
+        self._reset_peak = reset_peak
+
+    def count_sql(self, sql, statements=1):
+        verb, table = statement_target(sql)
+        counts = self.sql.setdefault(table, {})
+        counts[verb] = counts.get(verb, 0) + statements
+
+    # Context manager timing a stage; the block can add 'rows' and 'bytes_read' to the yielded record,
+    # which also receives the stage's 'seconds' and 'peak_rss_mb' on exit.
+    # The RSS high-water mark is reset by outermost stages only, so nested stages report their enclosing peak.
+    # tracemalloc is deliberately not used: it slows pandas' CSV writer down by an order of magnitude.
+    @contextmanager
+    def stage(self, name, rows=0, bytes_read=0):
+        record = {'rows': rows, 'bytes_read': bytes_read}
+        record['per_block_peak'] = reset_peak_rss() if self._active == 0 and self._reset_peak else False
+        self._active += 1
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self._active -= 1
+            record['seconds'] = time.perf_counter() - start
+            record['peak_rss_mb'] = peak_rss_mb()
+            self.add_stage(name, record['seconds'], record['rows'], record['bytes_read'],
+                           record['peak_rss_mb'], record['per_block_peak'])
+
+    def add_stage(self, name, seconds, rows=0, bytes_read=0, peak=None, per_block_peak=False):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0, 'bytes_read': 0,
+                                              'peak_rss_mb': 0.0, 'per_block_peak': per_block_peak})
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+        stage['rows'] += rows
+        stage['bytes_read'] += bytes_read
+        stage['peak_rss_mb'] = max(stage['peak_rss_mb'], peak or 0.0)
+        stage['per_block_peak'] = stage['per_block_peak'] and per_block_peak
+
+    # Function to fold in the metrics a pool worker recorded for its file
+    def merge(self, other):
+        for name, stage in other.stages.items():
+            self.add_stage(name, stage['seconds'], stage['rows'], stage['bytes_read'], stage['peak_rss_mb'],
+                           stage['per_block_peak'])
+            self.stages[name]['calls'] += stage['calls'] - 1
+        for table, counts in other.sql.items():
+            for verb, count in counts.items():
+                self.sql.setdefault(table, {})[verb] = self.sql.get(table, {}).get(verb, 0) + count
+
+    def finish(self, status='success'):
+        self.status = status
+        self.seconds = time.perf_counter() - self._start
+        return self.report()
+
+    def report(self):
+        seconds = getattr(self, 'seconds', time.perf_counter() - self._start)
+        stages = {}
+        for name, stage in self.stages.items():
+            stages[name] = {**stage, 'seconds': round(stage['seconds'], 4),
+                            'rows_per_second': round(stage['rows'] / stage['seconds'], 1) if stage['seconds'] else None,
+                            'peak_rss_mb': round(stage['peak_rss_mb'], 1)}
+        return {
+            'run_id': self.run_id,
+            'run': self.run_name,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(seconds, 4),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / seconds, 1) if seconds else None,
+            'bytes_read': self.bytes_read,
+            'peak_rss_mb': round(max_rss_mb(), 1),
+            'options': self.options,
+            'stages': stages,
+            'sql': self.sql
+        }
+
+    # Function to write the report as JSON (through a temporary file, like the processed-file list)
+    def write_report(self, report_dir):
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"{self.run_id}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def save_to_db(self, conn):
+        report = self.report()
+        conn.execute(RUN_METRICS_TABLE)
+        conn.execute('''
+        INSERT OR REPLACE INTO RUN_METRICS
+        (Run_ID, Run_Name, Started_At, Status, Seconds, Rows, Rows_Per_Second, Bytes_Read, Peak_RSS_MB, Report)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (report['run_id'], report['run'], report['started_at'], report['status'], report['seconds'],
+              report['rows'], report['rows_per_second'], report['bytes_read'], report['peak_rss_mb'],
+              json.dumps(report, default=str)))
+        conn.commit()
+
+    def print_summary(self):
+        report = self.report()
+        print(f"\n{'Stage':<20}{'Calls':>7}{'Seconds':>10}{'Rows':>12}{'Rows/sec':>12}{'MB read':>10}{'Peak RSS MB':>13}")
+        for name, stage in report['stages'].items():
+            rate = f"{stage['rows_per_second']:,.0f}" if stage['rows_per_second'] and stage['rows'] else '-'
+            print(f"{name:<20}{stage['calls']:>7}{stage['seconds']:>10.2f}{stage['rows']:>12}{rate:>12}"
+                  f"{stage['bytes_read'] / MB:>10.1f}{stage['peak_rss_mb']:>13.1f}")
+        if report['sql']:
+            print("SQL statements per table: " + ", ".join(
+                f"{table} " + "/".join(f"{verb} {count}" for verb, count in sorted(counts.items()))
+                for table, counts in sorted(report['sql'].items())))
@@ -0,0 +1,108 @@
+# load_state.py
+import io
+import os
+import sqlite3
+from itertools import islice
+import pandas as pd
+from schema_manifest import read_options, read_header, coerce_types
+from datetime import datetime
+
+# Rows the silver load commits per transaction (0 loads a whole delta in one transaction)
+DEFAULT_BATCH_ROWS = 500_000
+
+# Watermark of the silver load: how far into each processed source the database has been loaded
+def ensure_load_state_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ETL_LOAD_STATE (
+        Source TEXT PRIMARY KEY,
+        Row_Offset INTEGER,
+        Byte_Offset INTEGER,
+        Max_Treatment_ID INTEGER,
+        Updated_At TEXT
+    );
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ETL_DATA_VERSION (
+        Id INTEGER PRIMARY KEY CHECK (Id = 1),
+        Version INTEGER NOT NULL,
+        Updated_At TEXT
+    );
+    ''')
+
+def get_load_state(conn, source):
+    row = conn.execute('''
+    SELECT Row_Offset, Byte_Offset FROM ETL_LOAD_STATE WHERE Source = ?
+    ''', (source,)).fetchone()
+    return row if row else (0, 0)
+
+# Must run in the same transaction as the data it describes so the watermark never gets ahead of the load
+def save_load_state(conn, source, row_offset, byte_offset, max_treatment_id):
+    conn.execute('''
+    INSERT INTO ETL_LOAD_STATE (Source, Row_Offset, Byte_Offset, Max_Treatment_ID, Updated_At)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(Source) DO UPDATE SET
+        Row_Offset = excluded.Row_Offset,
+        Byte_Offset = excluded.Byte_Offset,
+        Max_Treatment_ID = COALESCE(MAX(Max_Treatment_ID, excluded.Max_Treatment_ID), Max_Treatment_ID, excluded.Max_Treatment_ID),
+        Updated_At = excluded.Updated_At
+    ''', (source, row_offset, byte_offset, max_treatment_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+# Function to get the highest Treatment_ID of a batch for its watermark (None when no row has one)
+def max_treatment_id(treatment_ids):
+    value = treatment_ids.max()
+    return None if pd.isna(value) else int(value)
+
+# Data version of the star schema: a counter bumped by every load transaction, so readers (query_service.py)
+# can tell whether results computed earlier are still current. Like the watermark it must be bumped in the
+# transaction it describes.
+def bump_data_version(conn):
+    conn.execute('''
+    INSERT INTO ETL_DATA_VERSION (Id, Version, Updated_At) VALUES (1, 1, ?)
+    ON CONFLICT(Id) DO UPDATE SET Version = Version + 1, Updated_At = excluded.Updated_At
+    ''', (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+
+# Function to read the data version; 0 for a database that was never loaded (or predates the counter)
+def get_data_version(conn):
+    try:
+        row = conn.execute('SELECT Version FROM ETL_DATA_VERSION WHERE Id = 1').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+# Function to forget the watermark of one source, or of every source when none is given
+def reset_load_state(conn, source=None):
+    if source is None:
+        conn.execute('DELETE FROM ETL_LOAD_STATE')
+    else:
+        conn.execute('DELETE FROM ETL_LOAD_STATE WHERE Source = ?', (source,))
+
+# Function to read the rows appended to a CSV after byte_offset in batches of `batch_rows` lines (all of them
+# at once when batch_rows is 0). Yields each batch with the byte offset just past its last line, which is the
+# watermark to store when the batch commits. It stops at the last complete line present when it was called:
+# a trailing line that is still being written (no newline yet) and rows appended later are left for the next
+# run. When `columns` is given only those columns are read, with the schema_manifest.py types.
+def iter_new_rows(csv_path, byte_offset=0, columns=None, batch_rows=DEFAULT_BATCH_ROWS):
+    file_size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        if byte_offset > file_size:
+            print(f"{csv_path} is smaller than the stored watermark, reloading it from the start.")
+            byte_offset = 0
+        byte_offset = max(byte_offset, len(header))
+        options = read_options(read_header(header), columns) if columns else {}
+
+        f.seek(byte_offset)
+        while True:
+            lines = list(islice(f, batch_rows or None))
+            complete = len(lines) == batch_rows
+            size = sum(len(line) for line in lines)
+            while lines and (byte_offset + size > file_size or not lines[-1].endswith(b'\n')):
+                size -= len(lines.pop())
+                complete = False
+            if not lines:
+                return
+            df = pd.read_csv(io.BytesIO(header + b''.join(lines)), **options)
+            yield (coerce_types(df) if columns else df), byte_offset + size
+            byte_offset += size
+            if not complete:
+                return
@@ -1,4 +1,5 @@
 # mappings.py
+import numpy as np
 import pandas as pd
 
 # Define mappings
@@ -48,19 +49,45 @@ hospital_mapping = {
     'Fortis Hospital': 'Washington University in St. Louis Medical Center'
 }
 
+# Single driving table: processed column -> mapping applied to it
+COLUMN_MAPPINGS = {
+    'state': state_mapping,
+    'city': city_mapping,
+    'country': country_mapping,
+    'affiliated_hospital': hospital_mapping
+}
+
+# Function to remap a low-cardinality column through its categories instead of its rows.
+# The column becomes a Categorical and only the distinct values are looked up, so the cost
+# grows with the number of distinct values rather than the number of rows.
+def remap_categories(series, mapping):
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    mapped = series.cat.categories.map(lambda value: mapping.get(value, value))
+    if mapped.is_unique:
+        return series.cat.rename_categories(mapped)
+
+    # Several source values map to the same target (or to a value already present): merge their codes
+    new_codes, new_categories = pd.factorize(mapped)
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, new_codes[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=new_categories), index=series.index, name=series.name)
+
+def apply_column_mappings(df, columns):
+    for column in columns:
+        df[column] = remap_categories(df[column], COLUMN_MAPPINGS[column])
+    return df
+
 # Function to apply mappings to the data
 def apply_mappings(df):
-    df['state'] = df['state'].replace(state_mapping)
-    df['city'] = df['city'].replace(city_mapping)
-    df['country'] = df['country'].replace(country_mapping)
-    return df
+    return apply_column_mappings(df, ['state', 'city', 'country'])
 
 def apply_hospital_mapping(df):
-    df['affiliated_hospital'] = df['affiliated_hospital'].map(hospital_mapping).fillna(df['affiliated_hospital'])
-    return df
+    return apply_column_mappings(df, ['affiliated_hospital'])
 
-# Function to convert treatment costs to USD
+# Function to convert treatment costs to USD.
+# Computed in float64 and stored back in the column's own type (float32 when read through schema_manifest.py)
 def convert_cost(df, exchange_rate=85):
-    df['treatment_cost'] = df['treatment_cost'] / exchange_rate
-    df['treatment_cost'] = df['treatment_cost'].round(2)
+    dtype = df['treatment_cost'].dtype
+    df['treatment_cost'] = (df['treatment_cost'].astype('float64') / exchange_rate).round(2).astype(dtype)
     return df
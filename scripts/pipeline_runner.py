@@ -0,0 +1,289 @@
+# pipeline_runner.py
+import io
+import os
+import sys
+import queue
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from file_processing import DEFAULT_CHUNKSIZE, process_dataframe, tag_source, csv_header, bronze_read_options
+from file_manifest import open_manifest, classify_file, record_delivery, migrate_processed_list
+from load_state import ensure_load_state_table, get_load_state, save_load_state, max_treatment_id
+from aggregates import ensure_aggregate_tables, rebuild_aggregates, refresh_aggregates
+from source_partitions import ensure_source_partitions
+from provider_history import ensure_provider_version_column
+from dimension_cache import DimensionKeyCache
+from validation import ensure_quarantine_table
+from instrumentation import RunMetrics, connect_with_metrics
+from transform_to_silver import validate_dataframe, prepare_dataframe, load_frame, load_csv_source
+
+# Pipelined bronze + silver run: raw chunks go straight through to the star schema.
+#   reader thread  cuts the raw CSVs into blocks of `chunksize` lines and submits them to the worker pool
+#   worker pool    parses each block, applies the mappings.py transforms, renders the processed CSV rows
+#                  validates the rows and derives the date features of the clean ones
+#   writer         (the calling thread) is the only user of the SQLite connection: it loads each chunk, commits
+#                  every `commit_every` chunks and appends a file's processed CSV rows once the file is complete
+# Parsing runs in the workers rather than in the reader thread so that it does not compete with the writer
+# for the GIL; the reader only does I/O. Raw files must not have line breaks inside quoted fields.
+# The reader and the writer are connected by a bounded queue of pending chunks in file order. When the writer
+# falls behind, the reader blocks on the full queue, so at most `queue_size` chunks are in memory at once.
+
+QUEUE_POLL_SECONDS = 0.1
+
+# Function run in a pool worker: parse and transform one block of raw lines. Returns the chunk as processed
+# CSV rows (for the bronze output, rejected rows included), the processed column names, the silver-ready frame,
+# the rows failing validation and the worker's metrics.
+def transform_chunk(header, block, source, columns=None):
+    metrics = RunMetrics('pipeline')
+    with metrics.stage('parse', bytes_read=len(block)) as stage:
+        chunk = pd.read_csv(io.BytesIO(header + block), **bronze_read_options(header))
+        stage['rows'] = len(chunk)
+    with metrics.stage('transform', rows=len(chunk)):
+        df = tag_source(process_dataframe(chunk), source)
+    with metrics.stage('render_csv', rows=len(df)):
+        header = list(df.columns)
+        csv_rows = (df.reindex(columns=columns) if columns else df).to_csv(index=False, header=False)
+    df, rejected = validate_dataframe(df, metrics)
+    df = prepare_dataframe(df, metrics)
+    return csv_rows, header, df, rejected, metrics
+
+# Function to put an item on the queue, giving up when the writer has stopped
+def put_until_stopped(chunks, item, stop):
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# Reader thread: cut every pending file into blocks of lines and queue the worker futures in file order.
+# An (file_path, None) item marks the end of a file and None the end of the run.
+def read_chunks(pending, sources, chunksize, columns, pool, chunks, stop, errors, metrics):
+    try:
+        for file_path in pending:
+            with open(file_path, 'rb') as raw:
+                header = raw.readline()
+                while not stop.is_set():
+                    with metrics.stage('read') as stage:
+                        lines = list(islice(raw, chunksize))
+                        stage['rows'], stage['bytes_read'] = len(lines), sum(map(len, lines))
+                    if not lines:
+                        break
+                    future = pool.submit(transform_chunk, header, b''.join(lines), sources[file_path], columns)
+                    if not put_until_stopped(chunks, (file_path, future), stop):
+                        return
+            metrics.bytes_read += file_path.stat().st_size
+            if not put_until_stopped(chunks, (file_path, None), stop):
+                return
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        put_until_stopped(chunks, None, stop)
+
+# Function to append a file's buffered rows to the processed CSV and empty the part file; returns the byte
+# offset after them
+def append_part(output, header, part):
+    if output.tell() == 0:
+        output.write(pd.DataFrame(columns=header).to_csv(index=False))
+    part.seek(0)
+    shutil.copyfileobj(part, output, 16 * 1024 * 1024)
+    part.seek(0)
+    part.truncate()
+    output.flush()
+    return output.tell()
+
+# Writer: load the queued chunks in order. The rendered rows of the current file are kept in a part file and
+# appended to the processed CSV only when the file is complete, so a run that fails mid-file leaves no rows
+# behind for the rerun to append again. The watermark saved with every commit covers only the rows already in
+# the processed CSV, so a later transform_to_silver run does not load them again. A file is recorded in the
+# manifest right after its rows are appended and before the commit holding its last chunk: if that commit
+# fails, the next run loads the rows from the processed CSV instead of processing the file again.
+def write_chunks(conn, manifest, chunks, processed_file, deliveries, mode, commit_every, cache, metrics,
+                 stamp_versions=False):
+    source = os.path.basename(processed_file)
+    row_offset, _ = get_load_state(conn, source)
+    counts = {}
+    uncommitted = 0
+    loaded_max = None
+    # Aggregate partitions touched since the last commit, recomputed once per transaction
+    partitions = {}
+
+    def commit(byte_offset):
+        with metrics.stage('aggregates'):
+            refresh_aggregates(conn, **partitions)
+        partitions.clear()
+        save_load_state(conn, source, row_offset, byte_offset, loaded_max)
+        with metrics.stage('commit'):
+            conn.commit()
+
+    with open(processed_file, 'a', newline='') as output, \
+            tempfile.TemporaryFile('w+', newline='', dir=os.path.dirname(processed_file)) as part:
+        byte_offset = output.tell()
+        part_header = None
+        part_rows = 0
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            file_path, future = item
+            if future is None:
+                # End of a file: append its rows, mark it processed, then commit its last chunks
+                if part_rows:
+                    with metrics.stage('append_part', rows=part_rows):
+                        byte_offset = append_part(output, part_header, part)
+                    row_offset += part_rows
+                    part_rows = 0
+                rows = deliveries[file_path].get('rows', 0)
+                with metrics.stage('mark_processed'):
+                    record_delivery(manifest, file_path, deliveries[file_path], rows)
+                commit(byte_offset)
+                uncommitted = 0
+                print(f"File {file_path.name} processed and loaded ({rows} records).", flush=True)
+                continue
+
+            with metrics.stage('wait_for_worker'):
+                csv_rows, header, df, rejected, worker_metrics = future.result()
+            metrics.merge(worker_metrics)
+            with metrics.stage('write', rows=len(df)):
+                part.write(csv_rows)
+            part_header = header
+            for key, value in load_frame(conn, df, mode, cache, metrics, prepared=True,
+                                         partitions=partitions, stamp_versions=stamp_versions,
+                                         rejected=rejected).items():
+                counts[key] = counts.get(key, 0) + value
+
+            # The watermark moves past the quarantined rows too: they are in the processed CSV
+            treatment_ids = pd.concat([df['treatment_id'], rejected['treatment_id']])
+            part_rows += len(treatment_ids)
+            chunk_max = max_treatment_id(treatment_ids)
+            if chunk_max is not None:
+                loaded_max = chunk_max if loaded_max is None else max(loaded_max, chunk_max)
+            metrics.rows += len(treatment_ids)
+            deliveries[file_path]['rows'] = deliveries[file_path].get('rows', 0) + len(treatment_ids)
+            uncommitted += 1
+            if uncommitted >= commit_every:
+                commit(byte_offset)
+                uncommitted = 0
+    return counts
+
+def run_pipeline(base_dir=None, db_path=None, chunksize=DEFAULT_CHUNKSIZE, workers=2, queue_size=4,
+                 commit_every=10, mode='bulk', stamp_provider_versions=False):
+    base_dir = Path(base_dir) if base_dir else Path(__file__).resolve().parent.parent
+    project_dir = base_dir / "Healthcare_ETL_Project"
+    raw_data_dir = project_dir / "raw_data"
+    processed_dir = project_dir / "processed"
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    processed_file = processed_dir / "Healthcare_Dataset.csv"
+    db_path = db_path or str(project_dir / "db" / "healthcare_data.db")
+
+    options = {'chunksize': chunksize, 'workers': workers, 'queue_size': queue_size, 'commit_every': commit_every,
+               'mode': mode, 'stamp_provider_versions': stamp_provider_versions}
+    metrics = RunMetrics('pipeline', options, reset_peak=False)
+    reader_metrics = RunMetrics('pipeline', reset_peak=False)
+    try:
+        conn = connect_with_metrics(db_path, metrics)
+        manifest = open_manifest(processed_dir / "file_manifest.db")
+        ensure_load_state_table(conn)
+        ensure_source_partitions(conn)
+        ensure_provider_version_column(conn)
+        ensure_quarantine_table(conn)
+        if ensure_aggregate_tables(conn):
+            rebuild_aggregates(conn)
+        cache = DimensionKeyCache(conn)
+
+        # Rows written by an earlier run_etl but not loaded yet go first, so the watermark can follow the CSV
+        if processed_file.exists() and get_load_state(conn, processed_file.name)[1] < processed_file.stat().st_size:
+            print("Loading the rows of the processed CSV that are not in the database yet.")
+            load_csv_source(conn, str(processed_file), mode, cache, metrics, stamp_provider_versions)
+
+        migrate_processed_list(manifest, base_dir / "processed_files.txt", raw_data_dir)
+        pending = []
+        deliveries = {}
+        for file_path in sorted(raw_data_dir.glob("*.csv")):
+            status, delivery = classify_file(manifest, file_path)
+            if status == 'unchanged':
+                print(f"Skipping already processed file: {file_path.name}")
+                continue
+            if status == 'changed':
+                print(f"File {file_path.name} was re-delivered with new content, processing it as batch {delivery['batch']}")
+            pending.append(file_path)
+            deliveries[file_path] = delivery
+        if not pending:
+            print("No new raw files to process.")
+            metrics.finish()
+            return {}
+        sources = {file_path: (file_path.name, delivery['batch']) for file_path, delivery in deliveries.items()}
+
+        print(f"Pipelining {len(pending)} files: {workers} transform workers, up to {queue_size} chunks in flight.",
+              flush=True)
+        chunks = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reader = threading.Thread(target=read_chunks, name='pipeline-reader',
+                                      args=(pending, sources, chunksize, csv_header(processed_file), pool, chunks,
+                                            stop, errors, reader_metrics))
+            reader.start()
+            try:
+                counts = write_chunks(conn, manifest, chunks, processed_file, deliveries, mode, commit_every,
+                                      cache, metrics, stamp_provider_versions)
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                stop.set()
+                reader.join()
+                pool.shutdown(cancel_futures=True)
+        if errors:
+            raise errors[0]
+        metrics.finish()
+        return counts
+
+    finally:
+        if metrics.status == 'running':
+            metrics.finish('failed')
+        metrics.merge(reader_metrics)
+        metrics.bytes_read += reader_metrics.bytes_read
+        metrics.print_summary()
+        print(f"Run report written to {metrics.write_report(project_dir / 'run_reports')}")
+        if 'manifest' in locals():
+            manifest.close()
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process new raw files and load them into the star schema in one "
+                                                 "pipelined pass (reader thread, transform workers, single writer).")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="rows per raw chunk")
+    parser.add_argument('--workers', type=int, default=2, help="transform worker processes")
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help="chunks parsed ahead of the writer; bounds memory to about this many chunks")
+    parser.add_argument('--commit-every', type=int, default=10, help="chunks loaded per SQLite transaction")
+    parser.add_argument('--mode', choices=['bulk', 'row'], default='bulk', help="silver loader")
+    parser.add_argument('--db', default=None, help="SQLite database (default Healthcare_ETL_Project/db/healthcare_data.db)")
+    parser.add_argument('--stamp-provider-versions', action='store_true',
+                        help="store in TREATMENT.Provider_Version_ID the PROVIDER version each treatment was recorded against")
+    args = parser.parse_args()
+
+    if args.chunksize < 1 or args.workers < 1 or args.queue_size < 1 or args.commit_every < 1:
+        print("--chunksize, --workers, --queue-size and --commit-every must be at least 1")
+        sys.exit(1)
+    try:
+        counts = run_pipeline(db_path=args.db, chunksize=args.chunksize, workers=args.workers,
+                              queue_size=args.queue_size, commit_every=args.commit_every, mode=args.mode,
+                              stamp_provider_versions=args.stamp_provider_versions)
+    except FileNotFoundError as fe:
+        print(f"{fe}")
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        sys.exit(1)
+    for key, value in counts.items():
+        print(f"{key.replace('_', ' ').capitalize()}: {value}")
@@ -0,0 +1,111 @@
+# provider_history.py
+import os
+import sys
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+from treatment_partitions import add_treatment_column
+
+# Function to add TREATMENT.Provider_Version_ID (the PROVIDER version a treatment was recorded against)
+# to a database created before the column existed
+def ensure_provider_version_column(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(TREATMENT)')}
+    if 'Provider_Version_ID' not in columns:
+        add_treatment_column(conn, 'Provider_Version_ID', 'INTEGER')
+
+def to_timestamps(values):
+    return pd.to_datetime(pd.Series(values), format='ISO8601').astype('datetime64[ns]')
+
+# As-of lookups over the PROVIDER SCD Type II history.
+# The versions are held in one array sorted by (Provider_ID, Valid_From, Version_ID), with the slice of each
+# provider indexed by Provider_ID, so a single lookup is a binary search in that provider's intervals and a
+# bulk lookup is one merge_asof. A version answers for Valid_From <= at < Valid_To (open-ended when Valid_To
+# is NULL); of several versions starting at the same time the last one inserted wins.
+# Valid_From is the date the version was loaded, not a business date: dates before a provider's first version
+# have no answer.
+class ProviderHistory:
+    def __init__(self, conn):
+        self.load(conn)
+
+    def load(self, conn):
+        history = pd.read_sql_query('''
+        SELECT Version_ID, Provider_ID, Affiliated_Hospital, Valid_From, Valid_To
+        FROM PROVIDER
+        ''', conn)
+        history['Valid_From'] = to_timestamps(history['Valid_From'])
+        history['Valid_To'] = to_timestamps(history['Valid_To'])
+        self.history = history.sort_values(['Provider_ID', 'Valid_From', 'Version_ID'],
+                                           kind='stable').reset_index(drop=True)
+
+        provider_ids = self.history['Provider_ID'].to_numpy()
+        bounds = np.flatnonzero(np.diff(provider_ids)) + 1
+        starts = np.concatenate([[0], bounds]).astype(int)
+        ends = np.concatenate([bounds, [len(provider_ids)]]).astype(int)
+        self._slices = dict(zip(provider_ids[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+        self._valid_from = self.history['Valid_From'].to_numpy()
+        self._valid_to = self.history['Valid_To'].to_numpy()
+        self._version_ids = self.history['Version_ID'].to_numpy()
+
+    # Function to get the Version_ID of one provider at a date/time (None when no version was valid)
+    def version_at(self, provider_id, at):
+        if provider_id not in self._slices or pd.isna(at):
+            return None
+        at = pd.Timestamp(at).to_datetime64()
+        start, end = self._slices[provider_id]
+        position = start + int(np.searchsorted(self._valid_from[start:end], at, side='right')) - 1
+        if position < start:
+            return None
+        valid_to = self._valid_to[position]
+        if not np.isnat(valid_to) and at >= valid_to:
+            return None
+        return int(self._version_ids[position])
+
+    # Function to get the Version_IDs for many (provider, date) pairs at once; returns an Int64 Series
+    # aligned to the inputs, <NA> where no version was valid
+    def versions_at(self, provider_ids, dates):
+        queries = pd.DataFrame({'Provider_ID': np.asarray(provider_ids, dtype='int64'),
+                                'At': to_timestamps(dates).to_numpy()})
+        queries['Row'] = np.arange(len(queries))
+        queries = queries.dropna(subset=['At']).sort_values('At', kind='stable')
+
+        history = self.history.sort_values(['Valid_From', 'Version_ID'], kind='stable')
+        matched = pd.merge_asof(queries, history[['Provider_ID', 'Valid_From', 'Valid_To', 'Version_ID']],
+                                left_on='At', right_on='Valid_From', by='Provider_ID', direction='backward')
+        expired = matched['Valid_To'].notna() & (matched['At'] >= matched['Valid_To'])
+        matched.loc[expired, 'Version_ID'] = np.nan
+
+        versions = pd.Series(pd.NA, index=range(len(provider_ids)), dtype='Int64')
+        versions.iloc[matched['Row'].to_numpy()] = matched['Version_ID'].astype('Int64').to_numpy()
+        return versions
+
+    # Function to get the affiliated hospital of one provider at a date/time
+    def hospital_at(self, provider_id, at):
+        version_id = self.version_at(provider_id, at)
+        if version_id is None:
+            return None
+        return self.history.loc[self.history['Version_ID'] == version_id, 'Affiliated_Hospital'].iloc[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up the PROVIDER version valid for a provider at a date.")
+    parser.add_argument('--provider', type=int, required=True, help="Provider_ID")
+    parser.add_argument('--at', required=True, help="date or timestamp, e.g. 2025-03-01 or '2025-03-01 10:00:00'")
+    parser.add_argument('--db', default=os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..', 'Healthcare_ETL_Project', 'db', 'healthcare_data.db')))
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.db)
+        history = ProviderHistory(conn)
+        version_id = history.version_at(args.provider, args.at)
+        if version_id is None:
+            print(f"Provider {args.provider} has no version valid at {args.at}.")
+        else:
+            print(f"Provider {args.provider} at {args.at}: Version_ID {version_id}, "
+                  f"{history.hospital_at(args.provider, args.at)}")
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
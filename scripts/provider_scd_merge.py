@@ -0,0 +1,164 @@
+# provider_scd_merge.py
+import numpy as np
+import pandas as pd
+
+PROVIDER_ATTRIBUTES = ['First_Name', 'Last_Name', 'Speciality_Id', 'Speciality_Name', 'Affiliated_Hospital']
+
+# Function to compare two frames element-wise, treating NULL == NULL as unchanged
+def _same_values(left, right):
+    left = left.astype(object)
+    right = right.astype(object)
+    return ((left == right) | (left.isna() & right.isna())).all(axis=1)
+
+# Function to compare the rows at positions `left` of a frame with the rows at positions `right`, column by
+# column in their own dtypes, treating NULL == NULL as unchanged
+def _same_rows(df, left, right):
+    same = np.ones(len(left), dtype=bool)
+    for column in df.columns:
+        values = df[column].reset_index(drop=True)
+        left_values = values.iloc[left].reset_index(drop=True)
+        right_values = values.iloc[right].reset_index(drop=True)
+        same &= ((left_values == right_values).fillna(False) | (left_values.isna() & right_values.isna())).to_numpy(bool)
+    return same
+
+# Function to load the current version of every provider in one query
+def load_current_providers(conn):
+    return pd.read_sql_query(f'''
+    SELECT Version_ID, Provider_ID, {', '.join(PROVIDER_ATTRIBUTES)}
+    FROM PROVIDER
+    WHERE Is_Current = 1
+    ''', conn)
+
+# Batch SCD Type 2 merge for the PROVIDER dimension.
+# `incoming` holds Provider_ID plus PROVIDER_ATTRIBUTES in arrival order. Every row whose attributes
+# differ from the provider's previous version (in the table or earlier in the batch) becomes a new
+# version; the superseded versions are expired with Valid_To = valid_from. The result matches applying
+# the rows one by one with transform_to_silver.upsert_provider_version. Runs inside the caller's
+# transaction and returns the number of versions inserted.
+# With return_versions=True it returns (inserted, versions): the Version_ID each incoming row resolves to
+# (the version its attributes created or matched when the rows are applied in order), aligned to `incoming`.
+def merge_provider_scd2(conn, incoming, valid_from, return_versions=False):
+    incoming = incoming[['Provider_ID'] + PROVIDER_ATTRIBUTES].reset_index(drop=True)
+    if incoming.empty:
+        return (0, pd.Series([], dtype='Int64')) if return_versions else 0
+    current = load_current_providers(conn)
+    provider_ids = incoming['Provider_ID']
+
+    # The batch repeats each provider once per treatment: drop rows identical to the provider's previous
+    # row, so the diff below only sees the candidate change points. A cheap row hash picks the repeats and
+    # their values are then compared with the previous row's, so a hash collision cannot hide a change.
+    groups = provider_ids.to_numpy()
+    hashes = pd.util.hash_pandas_object(incoming[PROVIDER_ATTRIBUTES], index=False)
+    candidates = np.flatnonzero((hashes.groupby(groups, sort=False).shift() == hashes).to_numpy())
+    previous_rows = pd.Series(np.arange(len(incoming))).groupby(groups, sort=False).shift().to_numpy()
+    repeated = np.zeros(len(incoming), dtype=bool)
+    repeated[candidates] = _same_rows(incoming[PROVIDER_ATTRIBUTES], candidates,
+                                      previous_rows[candidates].astype(np.int64))
+    kept_rows = np.flatnonzero(~repeated)
+    incoming = incoming.iloc[kept_rows].reset_index(drop=True)
+
+    # Stack the current versions in front of the batch so each incoming row is diffed against its predecessor
+    stacked = pd.concat([current[['Provider_ID'] + PROVIDER_ATTRIBUTES].astype(object),
+                         incoming.astype(object)], ignore_index=True)
+    previous = stacked.groupby('Provider_ID', sort=False)[PROVIDER_ATTRIBUTES].shift()
+    is_first = ~stacked['Provider_ID'].duplicated()
+    changed = (~_same_values(stacked[PROVIDER_ATTRIBUTES], previous) | is_first).iloc[len(current):]
+
+    new_versions = incoming[changed.to_numpy()].copy()
+    if new_versions.empty:
+        return (0, _row_versions(provider_ids, current, [], [])) if return_versions else 0
+
+    # Only the last new version of each provider stays current
+    is_last = ~new_versions['Provider_ID'].duplicated(keep='last')
+    new_versions['Valid_From'] = valid_from
+    new_versions['Valid_To'] = None
+    new_versions.loc[~is_last, 'Valid_To'] = valid_from
+    new_versions['Is_Current'] = is_last.astype(int)
+
+    expired = current.loc[current['Provider_ID'].isin(new_versions['Provider_ID']), 'Version_ID']
+
+    cursor = conn.cursor()
+    cursor.executemany('''
+    UPDATE PROVIDER
+    SET Valid_To = ?, Is_Current = 0
+    WHERE Version_ID = ?
+    ''', [(valid_from, int(version_id)) for version_id in expired])
+
+    (last_version_id,) = cursor.execute('SELECT COALESCE(MAX(Version_ID), 0) FROM PROVIDER').fetchone()
+    records = new_versions.astype(object).where(new_versions.notna(), None)
+    cursor.executemany(f'''
+    INSERT INTO PROVIDER (
+        Provider_ID, {', '.join(PROVIDER_ATTRIBUTES)}, Valid_From, Valid_To, Is_Current
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', list(records.itertuples(index=False, name=None)))
+    if not return_versions:
+        return len(new_versions)
+
+    # Version_IDs are assigned in insertion order, i.e. in the arrival order of the change points
+    new_version_ids = [version_id for (version_id,) in cursor.execute(
+        'SELECT Version_ID FROM PROVIDER WHERE Version_ID > ? ORDER BY Version_ID', (last_version_id,))]
+    change_rows = kept_rows[changed.to_numpy()]
+    return len(new_versions), _row_versions(provider_ids, current, change_rows, new_version_ids)
+
+# Function to resolve every incoming row to a Version_ID: the version created at the provider's last change
+# point up to that row, or the provider's version from before the batch
+def _row_versions(provider_ids, current, change_rows, new_version_ids):
+    versions = pd.Series(pd.NA, index=provider_ids.index, dtype='Int64')
+    versions.iloc[change_rows] = new_version_ids
+    versions = versions.groupby(provider_ids.to_numpy(), sort=False).ffill()
+    before_batch = provider_ids.map(current.set_index('Provider_ID')['Version_ID']).astype('Int64')
+    return versions.fillna(before_batch)
+
+# Set-based version of the trg_provider_scd2 trigger (Provider_SCD.py) for hospital reassignments.
+# `reassignments` holds Provider_ID and Affiliated_Hospital; the last row of a provider wins. The changes are
+# staged in a temp table and matched to the current versions they supersede. One UPDATE then expires those
+# versions and one INSERT copies them with the new hospital, in staging order, so Version_IDs come out as with
+# per-row UPDATEs through the trigger. The PROVIDER_LOG rows are written by the trg_after_provider_insert logging trigger, as for every
+# other PROVIDER insert. Providers without a current version or already at that hospital are left alone.
+# Runs inside the caller's transaction and returns the number of providers reassigned.
+def reassign_hospitals(conn, reassignments, changed_at=None):
+    staged = reassignments[['Provider_ID', 'Affiliated_Hospital']].drop_duplicates('Provider_ID', keep='last')
+    if changed_at is None:
+        # One timestamp for the whole batch, in the trigger's DATETIME('now') format
+        (changed_at,) = conn.execute("SELECT DATETIME('now')").fetchone()
+
+    conn.execute('DROP TABLE IF EXISTS temp.staged_reassignments')
+    conn.execute('''
+    CREATE TEMP TABLE staged_reassignments (
+        Stage_Order INTEGER PRIMARY KEY,
+        Provider_ID INTEGER,
+        Affiliated_Hospital TEXT,
+        Version_ID INTEGER
+    )
+    ''')
+    conn.executemany('''
+    INSERT INTO temp.staged_reassignments (Provider_ID, Affiliated_Hospital) VALUES (?, ?)
+    ''', [(int(provider_id), hospital) for provider_id, hospital in staged.astype(object).itertuples(index=False)])
+    # The current version each change supersedes; NULL when there is nothing to change
+    conn.execute('''
+    UPDATE temp.staged_reassignments
+    SET Version_ID = (
+        SELECT p.Version_ID FROM PROVIDER p
+        WHERE p.Provider_ID = staged_reassignments.Provider_ID AND p.Is_Current = 1
+          AND p.Affiliated_Hospital IS NOT staged_reassignments.Affiliated_Hospital
+    )
+    ''')
+
+    conn.execute('''
+    UPDATE PROVIDER
+    SET Valid_To = ?, Is_Current = 0
+    WHERE Version_ID IN (SELECT Version_ID FROM temp.staged_reassignments)
+    ''', (changed_at,))
+    cursor = conn.execute(f'''
+    INSERT INTO PROVIDER (
+        Provider_ID, {', '.join(PROVIDER_ATTRIBUTES)}, Valid_From, Valid_To, Is_Current
+    )
+    SELECT p.Provider_ID, p.First_Name, p.Last_Name, p.Speciality_Id, p.Speciality_Name, s.Affiliated_Hospital,
+           ?, NULL, 1
+    FROM temp.staged_reassignments s
+    JOIN PROVIDER p ON p.Version_ID = s.Version_ID
+    ORDER BY s.Stage_Order
+    ''', (changed_at,))
+    reassigned = cursor.rowcount
+    conn.execute('DROP TABLE temp.staged_reassignments')
+    return reassigned
@@ -0,0 +1,160 @@
+# query_service.py
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import hashlib
+import argparse
+from datetime import date
+from pathlib import Path
+import pandas as pd
+from analytics_queries import ANALYTICAL_QUERIES, AGGREGATE_QUERIES
+from load_state import get_data_version
+from treatment_partitions import pruned_treatments
+
+DEFAULT_MAX_ENTRIES = 64
+
+# Named analytical queries (analytics_queries.py) with an on-disk result cache.
+# A result is pickled under `cache_dir` keyed by the query name, its SQL, its parameters and the data version
+# of the database (load_state.get_data_version), which every load transaction bumps. A repeated query against
+# unchanged data is read back from disk instead of re-running the aggregation; once a load commits, the stored
+# results no longer match the version and are deleted on the next lookup.
+# Queries using date('now', ...) also key on today's date. The cache keeps at most `max_entries` results and
+# evicts the least recently used one, tracked with the file modification time.
+# Writes that bypass the loaders (e.g. manual UPDATEs from the notebook) must call
+# load_state.bump_data_version or pass refresh=True.
+class QueryService:
+    def __init__(self, db_path=None, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES, use_aggregates=False):
+        project_dir = Path(__file__).resolve().parent.parent / "Healthcare_ETL_Project"
+        db_path = db_path or str(project_dir / "db" / "healthcare_data.db")
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Database not found at {db_path}")
+        self.conn = sqlite3.connect(db_path)
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(db_path).resolve().parent / "query_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.use_aggregates = use_aggregates
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Function to get the SQL and default parameters of a named query (the aggregate-table version when asked for)
+    def query(self, name):
+        if self.use_aggregates and name in AGGREGATE_QUERIES:
+            return AGGREGATE_QUERIES[name]
+        if name not in ANALYTICAL_QUERIES:
+            raise KeyError(f"Unknown query {name}; available: {', '.join(ANALYTICAL_QUERIES)}")
+        return ANALYTICAL_QUERIES[name]
+
+    def _entry_path(self, name, sql, params, version):
+        key = repr((sql, sorted(params.items())))
+        if "'now'" in sql:
+            key += date.today().isoformat()
+        digest = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+        return self.cache_dir / f"v{version}.{name}.{digest}.pkl"
+
+    # Function to delete the results stored for an older data version
+    def _drop_stale(self, version):
+        prefix = f"v{version}."
+        for path in self.cache_dir.glob("v*.pkl"):
+            if not path.name.startswith(prefix):
+                path.unlink(missing_ok=True)
+
+    def _evict(self):
+        entries = sorted(self.cache_dir.glob("v*.pkl"), key=lambda path: path.stat().st_mtime_ns)
+        for path in entries[:max(len(entries) - self.max_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+    # Function to run a named query; returns its result as a DataFrame, from the cache when the data is unchanged
+    def run(self, name, refresh=False, **params):
+        query = self.query(name)
+        params = {**query['params'], **params}
+        version = get_data_version(self.conn)
+        path = self._entry_path(name, query['sql'], params, version)
+
+        if not refresh and path.exists():
+            with open(path, 'rb') as f:
+                df = pickle.load(f)
+            os.utime(path)
+            self.stats['hits'] += 1
+            return df
+
+        self.stats['misses'] += 1
+        self._drop_stale(version)
+        with pruned_treatments(self.conn, query, params):
+            df = pd.read_sql_query(query['sql'], self.conn, params=params)
+        # Written under a temporary name first so a concurrent reader never sees a partial file
+        partial = path.with_suffix('.tmp')
+        with open(partial, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+        self._evict()
+        return df
+
+    # Function to delete every cached result
+    def clear(self):
+        for path in self.cache_dir.glob("v*.pkl"):
+            path.unlink(missing_ok=True)
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        rate = self.stats['hits'] / lookups if lookups else 0
+        return f"{self.stats['hits']} hits, {self.stats['misses']} misses ({rate:.1%} served from the cache)"
+
+# Function to turn ["start_year=2024", ...] into a parameter dict. Each value gets the type of the query's
+# default for that parameter (`defaults`), otherwise it stays text: the year parameters are compared with
+# strftime() text in SQLite, where an integer never equals a string.
+def parse_params(pairs, defaults=None):
+    defaults = defaults or {}
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise ValueError(f"Parameter {pair} must be given as name=value")
+        param_type = type(defaults[key]) if key in defaults and defaults[key] is not None else str
+        try:
+            params[key] = param_type(value)
+        except ValueError:
+            raise ValueError(f"Parameter {key} must be a {param_type.__name__}, got {value!r}")
+    return params
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a named analytical query through the result cache.")
+    parser.add_argument('query', nargs='?', help=f"one of: {', '.join(ANALYTICAL_QUERIES)}")
+    parser.add_argument('--param', action='append', default=[], help="query parameter as name=value (repeatable)")
+    parser.add_argument('--db', default=None, help="SQLite database (default Healthcare_ETL_Project/db/healthcare_data.db)")
+    parser.add_argument('--cache-dir', default=None, help="result cache folder (default query_cache next to the database)")
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help="results kept in the cache")
+    parser.add_argument('--aggregates', action='store_true', help="read from the aggregate tables where possible")
+    parser.add_argument('--refresh', action='store_true', help="re-run the query even if a cached result exists")
+    parser.add_argument('--clear', action='store_true', help="delete every cached result")
+    args = parser.parse_args()
+
+    if not args.query and not args.clear:
+        parser.error("a query name or --clear is required")
+    try:
+        with QueryService(args.db, args.cache_dir, args.max_entries, args.aggregates) as service:
+            if args.clear:
+                service.clear()
+                print(f"Cleared the result cache in {service.cache_dir}")
+            if args.query:
+                start = time.perf_counter()
+                df = service.run(args.query, refresh=args.refresh,
+                                 **parse_params(args.param, service.query(args.query)['params']))
+                elapsed = time.perf_counter() - start
+                print(df.to_string(index=False) if not df.empty else "No data returned from the query.")
+                print(f"{len(df)} rows in {elapsed * 1000:.1f} ms; cache: {service.report()}")
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"{e}")
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        sys.exit(1)
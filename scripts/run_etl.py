@@ -1,53 +1,229 @@
 # run_etl.py
 import os
+import shutil
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
-from file_processing import load_and_process_file, mark_file_processed
+from file_processing import (DEFAULT_CHUNKSIZE, load_and_process_file, stream_process_file, iter_processed_chunks,
+                             csv_header)
+from file_manifest import open_manifest, classify_file, record_delivery, migrate_processed_list
+from columnar_store import require_pyarrow, write_parquet
+from instrumentation import RunMetrics
 
-def run_etl():
+# Function to process one raw file into output_path; runs in the ETL process or in a pool worker.
+# `source` is the (file name, delivery number) lineage stamped on each row and `columns` the layout of
+# an existing processed CSV. Returns the row count, the file's time/memory record and its stage metrics.
+def process_file(file_path, output_path, chunksize=DEFAULT_CHUNKSIZE, output_format='csv', source=None, columns=None):
+    metrics = RunMetrics('bronze')
+    with metrics.stage('file', bytes_read=file_path.stat().st_size) as memory:
+        if output_format == 'parquet':
+            # One typed Parquet file per source file, replaced as a whole
+            chunks = (iter_processed_chunks(file_path, chunksize, metrics, source) if chunksize
+                      else [load_and_process_file(file_path, metrics, source)])
+            rows = write_parquet(chunks, output_path)
+        elif chunksize:
+            # Stream the file chunk by chunk into the output
+            rows = stream_process_file(file_path, output_path, chunksize, metrics, source, columns)
+        else:
+            df = load_and_process_file(file_path, metrics, source)
+            if columns:
+                df = df.reindex(columns=columns)
+            rows = len(df)
+            with metrics.stage('write', rows=rows):
+                if output_path.exists():
+                    df.to_csv(output_path, mode='a', header=False, index=False)
+                else:
+                    df.to_csv(output_path, index=False)
+            del df
+        memory['rows'] = rows
+    return rows, memory, metrics
+
+# Function to append a worker's part file to the processed CSV (dropping its header if the CSV already has one)
+def append_part(part_path, processed_file):
+    has_header = processed_file.exists() and processed_file.stat().st_size > 0
+    with open(part_path, 'rb') as src, open(processed_file, 'ab') as dst:
+        if has_header:
+            src.readline()
+        shutil.copyfileobj(src, dst, 16 * 1024 * 1024)
+    part_path.unlink()
+
+# Function to record a processed file in the run metrics
+def record_file(metrics, rows, memory, file_metrics):
+    metrics.merge(file_metrics)
+    metrics.rows += rows
+    metrics.bytes_read += memory['bytes_read']
+
+def run_etl(chunksize=DEFAULT_CHUNKSIZE, base_dir=None, workers=1, output_format='csv', metrics_db=None):
     print("Starting ETL process...", flush=True)
 
-    base_dir = Path(__file__).resolve().parent.parent
+    base_dir = Path(base_dir) if base_dir else Path(__file__).resolve().parent.parent
+    metrics = RunMetrics('bronze', {'chunksize': chunksize, 'workers': workers, 'format': output_format})
+    try:
+        process_raw_files(base_dir, chunksize, workers, output_format, metrics)
+        metrics.finish()
+    except BaseException:
+        metrics.finish('failed')
+        raise
+    finally:
+        metrics.print_summary()
+        print(f"Run report written to {metrics.write_report(base_dir / 'Healthcare_ETL_Project' / 'run_reports')}")
+        if metrics_db:
+            conn = sqlite3.connect(metrics_db)
+            try:
+                metrics.save_to_db(conn)
+            finally:
+                conn.close()
 
+# Function to transform every raw file not processed yet into the processed output
+def process_raw_files(base_dir, chunksize, workers, output_format, metrics):
     raw_data_dir = base_dir / "Healthcare_ETL_Project" / "raw_data"
     processed_dir = base_dir / "Healthcare_ETL_Project" / "processed"
     processed_dir.mkdir(parents=True, exist_ok=True)
 
     processed_file = processed_dir / "Healthcare_Dataset.csv"
+    parquet_dir = processed_dir / "parquet"
     processed_metadata_file = base_dir / "processed_files.txt"
 
-    # Read processed files
-    processed_files = set()
-    if processed_metadata_file.exists():
-        with open(processed_metadata_file, "r") as f:
-            processed_files = set(f.read().splitlines())
+    if output_format == 'parquet':
+        require_pyarrow()
+        parquet_dir.mkdir(exist_ok=True)
+
+    # Manifest of processed deliveries (name, size, mtime, content hash), seeded from the legacy name list
+    manifest = open_manifest(processed_dir / "file_manifest.db")
+    try:
+        imported = migrate_processed_list(manifest, processed_metadata_file, raw_data_dir)
+        if imported:
+            print(f"Imported {len(imported)} file names from {processed_metadata_file.name} into the manifest")
+        process_pending_files(manifest, raw_data_dir, processed_dir, processed_file, parquet_dir,
+                              chunksize, workers, output_format, metrics)
+    finally:
+        manifest.close()
 
+def process_pending_files(manifest, raw_data_dir, processed_dir, processed_file, parquet_dir,
+                          chunksize, workers, output_format, metrics):
     new_files_processed = []
+    memory_report = {}
 
-    for file_path in raw_data_dir.glob("*.csv"):
-        if file_path.name in processed_files:
+    # Files are always handled in name order so the processed CSV is deterministic.
+    # Unchanged files are skipped on their size and mtime; a re-delivered file (same name, new content)
+    # is processed again as the next batch of that source.
+    pending = []
+    deliveries = {}
+    for file_path in sorted(raw_data_dir.glob("*.csv")):
+        status, delivery = classify_file(manifest, file_path)
+        if status == 'unchanged':
             print(f"Skipping already processed file: {file_path.name}")
             continue
+        if status == 'changed':
+            print(f"File {file_path.name} was re-delivered with new content, processing it as batch {delivery['batch']}")
+        pending.append(file_path)
+        deliveries[file_path] = delivery
+    sources = {file_path: (file_path.name, delivery['batch']) for file_path, delivery in deliveries.items()}
 
-        print(f"Processing file: {file_path.name}")
-        df = load_and_process_file(file_path)
-        print(f"Loaded {len(df)} records from {file_path.name}")
+    # New rows keep the layout of a processed CSV written before the lineage columns existed
+    columns = csv_header(processed_file) if output_format == 'csv' else None
 
-        if processed_file.exists():
-            df.to_csv(processed_file, mode='a', header=False, index=False)
-        else:
-            df.to_csv(processed_file, index=False)
+    if workers > 1 and len(pending) > 1 and output_format == 'parquet':
+        # Every source gets its own Parquet file, so workers write their output directly
+        print(f"Processing {len(pending)} files with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(file_path, pool.submit(process_file, file_path, parquet_dir / f"{file_path.stem}.parquet",
+                                               chunksize, output_format, sources[file_path]))
+                       for file_path in pending]
+            for file_path, future in futures:
+                rows, memory, file_metrics = future.result()
+                record_file(metrics, rows, memory, file_metrics)
+                with metrics.stage('mark_processed'):
+                    record_delivery(manifest, file_path, deliveries[file_path], rows)
+
+                print(f"Loaded {rows} records from {file_path.name}")
+                memory_report[file_path.name] = memory
+                new_files_processed.append(file_path.name)
+                print(f"File {file_path.name} processed and saved.")
+    elif workers > 1 and len(pending) > 1:
+        # Transform files concurrently into part files, then append the parts in name order.
+        # When a file fails, the files before it are appended and marked processed; the parts of the
+        # files after it are discarded, so they are processed again by the next run.
+        parts_dir = processed_dir / ".parts"
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        parts_dir.mkdir()
+        print(f"Processing {len(pending)} files with {workers} workers")
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = []
+                for file_path in pending:
+                    part_path = parts_dir / f"{file_path.stem}.part.csv"
+                    futures.append((file_path, part_path, pool.submit(process_file, file_path, part_path, chunksize,
+                                                                      'csv', sources[file_path], columns)))
 
-        new_files_processed.append(file_path.name)
-        print(f"File {file_path.name} processed and saved.")
+                for file_path, part_path, future in futures:
+                    rows, memory, file_metrics = future.result()
+                    record_file(metrics, rows, memory, file_metrics)
+                    with metrics.stage('append_part', rows=rows):
+                        append_part(part_path, processed_file)
+                    # Marked only after its rows are in the processed CSV
+                    with metrics.stage('mark_processed'):
+                        record_delivery(manifest, file_path, deliveries[file_path], rows)
 
-    # Append new processed file names to metadata
-    if new_files_processed:
-        with open(processed_metadata_file, "a") as f:
-            for fname in new_files_processed:
-                f.write(fname + "\n")
+                    print(f"Loaded {rows} records from {file_path.name}")
+                    memory_report[file_path.name] = memory
+                    new_files_processed.append(file_path.name)
+                    print(f"File {file_path.name} processed and saved.")
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    else:
+        # CSV output is streamed into a part file and appended once the whole file is transformed,
+        # so a run killed mid-file leaves no partial rows behind for the rerun to duplicate
+        parts_dir = processed_dir / ".parts"
+        if output_format == 'csv':
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            parts_dir.mkdir()
+        try:
+            for file_path in pending:
+                print(f"Processing file: {file_path.name}")
+                if output_format == 'parquet':
+                    output_path = parquet_dir / f"{file_path.stem}.parquet"
+                else:
+                    output_path = parts_dir / f"{file_path.stem}.part.csv"
+                rows, memory, file_metrics = process_file(file_path, output_path, chunksize, output_format,
+                                                          sources[file_path], columns)
+                record_file(metrics, rows, memory, file_metrics)
+                if output_format == 'csv' and output_path.exists():
+                    with metrics.stage('append_part', rows=rows):
+                        append_part(output_path, processed_file)
+                # Marked only after its rows are in the processed output
+                with metrics.stage('mark_processed'):
+                    record_delivery(manifest, file_path, deliveries[file_path], rows)
+                print(f"Loaded {rows} records from {file_path.name}")
+
+                memory_report[file_path.name] = memory
+                new_files_processed.append(file_path.name)
+                print(f"File {file_path.name} processed and saved.")
+        finally:
+            if output_format == 'csv':
+                shutil.rmtree(parts_dir, ignore_errors=True)
 
     print(f"Processed files this run: {new_files_processed}")
 
+    # Memory high-water mark per file
+    if memory_report:
+        print("\nMemory high-water mark per file:")
+        print(f"{'File':<40}{'Seconds':>10}{'Peak RSS MB':>14}")
+        for fname, memory in memory_report.items():
+            scope = '' if memory['per_block_peak'] else ' (process peak)'
+            print(f"{fname:<40}{memory['seconds']:>10.2f}{memory['peak_rss_mb']:>14.1f}{scope}")
+
 if __name__ == "__main__":
-    run_etl()
+    parser = argparse.ArgumentParser(description="Process new raw healthcare files into the processed CSV.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk when streaming raw files (0 reads each file whole)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes transforming raw files concurrently")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="processed output: the cumulative CSV or one typed Parquet file per raw file")
+    parser.add_argument('--metrics-db', default=None,
+                        help="also record the run report in the RUN_METRICS table of this SQLite database")
+    args = parser.parse_args()
+    run_etl(chunksize=args.chunksize, workers=args.workers, output_format=args.format, metrics_db=args.metrics_db)
@@ -0,0 +1,144 @@
+# schema_manifest.py
+import io
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Column layout of the raw Kaggle extract read by run_etl/load_and_process_file
+RAW_COLUMNS = [
+    'treatment_id', 'treatment_start_date', 'treatment_completion_date', 'treatment_outcome_status',
+    'treatment_outcome_date', 'treatment_duration', 'treatment_cost', 'treatment_type', 'provider_id',
+    'provider_name', 'speciality_id_x', 'speciality_name', 'affiliated_hospital', 'location_id', 'country',
+    'state', 'city', 'patient_id', 'patient_name', 'gender', 'age', 'disease_id', 'speciality_id_y',
+    'disease_name', 'disease_type', 'severity', 'transmission_mode', 'mortality_rate', 'added_at', 'modified_at'
+]
+
+# Types of the healthcare columns, used for every CSV read of the raw and processed data instead of letting
+# pandas infer int64/float64/object on each run:
+#   keys       nullable Int32
+#   measures   nullable Int32/Int16, float32 for cost and mortality rate
+#   labels     categoricals for the low-cardinality text columns
+#   dates      parsed to datetime64 (ISO 8601) by the silver reads; bronze only passes them through, so it
+#              keeps them as text and the processed CSV is written exactly as before
+# Columns not listed (the names) are read as strings.
+# The keys and measures (NUMERIC_COLUMNS) are parsed without a type and converted by coerce_types after the
+# read, so a blank key or a value that is not a number does not fail the read of the whole file.
+DATE_COLUMNS = ['treatment_start_date', 'treatment_completion_date', 'treatment_outcome_date',
+                'added_at', 'modified_at']
+
+CATEGORY_COLUMNS = ['treatment_outcome_status', 'treatment_type', 'speciality_name', 'affiliated_hospital',
+                    'country', 'state', 'city', 'gender', 'disease_name', 'disease_type', 'severity',
+                    'transmission_mode', 'source_file']
+
+KEY_COLUMNS = ['treatment_id', 'provider_id', 'patient_id', 'disease_id', 'location_id',
+               'speciality_id_x', 'speciality_id_y']
+
+NUMERIC_COLUMNS = KEY_COLUMNS + ['treatment_duration', 'age', 'treatment_cost', 'mortality_rate']
+
+COLUMN_TYPES = {
+    **{column: 'Int32' for column in KEY_COLUMNS},
+    'treatment_duration': 'Int32',
+    'age': 'Int16',
+    'source_batch': 'Int32',
+    'treatment_cost': 'float32',
+    'mortality_rate': 'float32',
+    **{column: 'category' for column in CATEGORY_COLUMNS}
+}
+
+# Column listing, per row, the values that could not be converted to their type (e.g. "treatment_cost=abc", or a
+# date columnar_store.to_columnar cannot parse). The values themselves become missing; the silver validation
+# quarantines the rows listed here.
+INVALID_VALUES_COLUMN = 'invalid_values'
+
+# float32 keeps about 7 significant digits: the values are widened back to float64 and rounded to their
+# source precision before they are computed on or written to SQLite, so the stored numbers are unchanged
+# (costs are exact to the cent below 131,072 USD per treatment)
+FLOAT_DECIMALS = {
+    'treatment_cost': 2,
+    'mortality_rate': 6
+}
+
+# Function to build the pd.read_csv arguments for a file with the given header.
+# `columns` are the columns to read (usecols); by default every column of the header.
+# parse_dates=False leaves the date columns as text (e.g. when they are only passed through).
+# Whole-file reads use pyarrow's CSV parser when it is installed (about twice as fast); it cannot read in
+# chunks, so pass chunked=True for reads with a chunksize. Pass the frame read through coerce_types.
+def read_options(header, columns=None, parse_dates=True, chunked=False):
+    usecols = [column for column in header if columns is None or column in columns]
+    options = {
+        'usecols': usecols,
+        'dtype': {column: COLUMN_TYPES[column] for column in usecols
+                  if column in COLUMN_TYPES and column not in NUMERIC_COLUMNS}
+    }
+    if INVALID_VALUES_COLUMN in usecols:
+        options['dtype'][INVALID_VALUES_COLUMN] = 'str'
+    if pyarrow is not None and not chunked:
+        options['engine'] = 'pyarrow'
+        # pandas' pyarrow reader fails on a blank integer column as soon as any dtype is given, even for other
+        # columns: the categories are set by coerce_types after the read instead
+        del options['dtype']
+    dates = [column for column in usecols if column in DATE_COLUMNS]
+    if parse_dates and dates:
+        options['parse_dates'] = dates
+        options['date_format'] = 'ISO8601'
+    return options
+
+# Function to give a frame read with read_options (or from Parquet) its COLUMN_TYPES. In the numeric columns
+# a value that is not a number (or not a whole number in range for the integer columns) becomes missing and is
+# listed with its column in INVALID_VALUES_COLUMN, which is always added. Columns already typed are kept.
+def coerce_types(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if 'source_batch' in df.columns:
+        df['source_batch'] = df['source_batch'].astype(COLUMN_TYPES['source_batch'])
+
+    found = []
+    for column in NUMERIC_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        numbers = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+        column_type = pd.api.types.pandas_dtype(COLUMN_TYPES[column])
+        if pd.api.types.is_integer_dtype(column_type):
+            limits = np.iinfo(column_type.numpy_dtype)
+            valid = numbers.between(limits.min, limits.max)
+            if not pd.api.types.is_integer_dtype(numbers):
+                valid &= numbers % 1 == 0
+            numbers = numbers.where(valid | numbers.isna())
+        invalid = (values.notna() & numbers.isna()).to_numpy()
+        if invalid.any():
+            found.append(column + '=' + values[invalid].astype(str))
+        df[column] = numbers.astype(column_type)
+
+    return add_invalid_values(df, found)
+
+# Function to append "column=value" entries (Series indexed like `df`, one per column) to INVALID_VALUES_COLUMN,
+# which is added when missing
+def add_invalid_values(df, found):
+    if INVALID_VALUES_COLUMN not in df.columns:
+        df[INVALID_VALUES_COLUMN] = pd.Series(None, index=df.index, dtype='str')
+    elif df[INVALID_VALUES_COLUMN].dtype != 'str':
+        df[INVALID_VALUES_COLUMN] = df[INVALID_VALUES_COLUMN].astype('str')
+    if found:
+        listed = pd.concat(found).groupby(level=0).agg('; '.join)
+        previous = df.loc[listed.index, INVALID_VALUES_COLUMN]
+        df.loc[listed.index, INVALID_VALUES_COLUMN] = (previous + '; ' + listed).fillna(listed)
+    return df
+
+# Function to read the header of a CSV given as a path or as its first line in bytes
+def read_header(source):
+    if isinstance(source, bytes):
+        return list(pd.read_csv(io.BytesIO(source), nrows=0).columns)
+    return list(pd.read_csv(source, nrows=0).columns)
+
+# Function to widen the float32 columns of a frame back to float64 at their source precision
+def widen_floats(df):
+    for column, decimals in FLOAT_DECIMALS.items():
+        if column in df.columns and df[column].dtype == 'float32':
+            df[column] = df[column].astype('float64').round(decimals)
+    return df
@@ -0,0 +1,129 @@
+# source_partitions.py
+import pandas as pd
+from aggregates import touched_partitions
+from file_processing import LINEAGE_COLUMNS
+from schema_manifest import read_options, read_header, coerce_types
+from treatment_partitions import add_treatment_column, expand_index_statements, sealed_partitions, treatment_tables
+
+# Lineage columns of TREATMENT: the raw file a row was loaded from and that file's delivery number.
+# The rows of one Source_File form a partition that is replaced as a whole when the file is re-delivered.
+TREATMENT_LINEAGE_COLUMNS = [('Source_File', 'TEXT'), ('Source_Batch', 'INTEGER')]
+
+# Indexes keeping a partition replace proportional to the replaced file: finding the partition and
+# checking whether its PATIENT/DISEASE/LOCATION members are still referenced by other treatments
+PARTITION_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_treatment_source ON TREATMENT(Source_File, Source_Batch)',
+    'CREATE INDEX IF NOT EXISTS idx_treatment_patient ON TREATMENT(Patient_ID)',
+    'CREATE INDEX IF NOT EXISTS idx_treatment_location ON TREATMENT(Location_ID)',
+    'CREATE INDEX IF NOT EXISTS idx_disease ON TREATMENT(Disease_ID)'
+]
+
+# Dimension members that can be left without treatments when a partition is deleted
+# (PROVIDER versions are the affiliation history and are kept)
+ORPHAN_DIMENSIONS = [('PATIENT', 'Patient_ID'), ('DISEASE', 'Disease_ID'), ('LOCATION', 'Location_ID')]
+
+# Function to add the lineage columns and partition indexes to a TREATMENT table created before them
+# (on every outcome-year partition when TREATMENT is partitioned by treatment_partitions.py)
+def ensure_source_partitions(conn):
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(TREATMENT)')}
+    for column, column_type in TREATMENT_LINEAGE_COLUMNS:
+        if column not in existing:
+            add_treatment_column(conn, column, column_type)
+    for statement in expand_index_statements(conn, PARTITION_INDEXES):
+        conn.execute(statement)
+
+# Function to get the batch of each source file currently loaded in TREATMENT (files never loaded are left out)
+def loaded_batches(conn, source_files):
+    batches = {}
+    for source_file in source_files:
+        (batch,) = conn.execute('SELECT MAX(Source_Batch) FROM TREATMENT WHERE Source_File = ?',
+                                (source_file,)).fetchone()
+        if batch is not None:
+            batches[source_file] = batch
+    return batches
+
+# Function to keep only the newest delivery of each source file in a delta of processed rows
+# (a file re-delivered twice between two loads is in the delta with both batches). Untagged rows are kept.
+def newest_batches(df):
+    newest = df.groupby('source_file', observed=True)['source_batch'].transform('max')
+    return df[df['source_file'].isna() | (df['source_batch'] == newest)]
+
+# Function to decide which partitions a delta replaces: source files delivered in a newer batch than the
+# one in TREATMENT, plus the files in `force` (reloaded on request). Rows of a batch older than the loaded
+# one are dropped. Returns the rows to load and the source files whose partition has to be deleted first.
+def plan_replacement(conn, df, force=()):
+    if 'source_file' not in df.columns or df['source_file'].isna().all():
+        return df, []
+    df = newest_batches(df)
+    batches = df.dropna(subset=['source_file']).groupby('source_file', observed=True)['source_batch'].max()
+    loaded = loaded_batches(conn, batches.index)
+
+    replace = [source_file for source_file, batch in batches.items()
+               if source_file in force or (source_file in loaded and batch > loaded[source_file])]
+    stale = [source_file for source_file, batch in batches.items()
+             if source_file in loaded and batch < loaded[source_file]]
+    if stale:
+        print(f"Skipping rows of older deliveries than the ones loaded: {', '.join(stale)}")
+        df = df[~df['source_file'].isin(stale)]
+    return df, replace
+
+# Function to delete the TREATMENT partitions of `source_files` and the PATIENT/DISEASE/LOCATION members
+# only they referenced. Runs inside the caller's transaction, before the new rows are inserted, so members
+# of the new delivery are written again with its attributes. Rows in sealed outcome-year partitions cannot
+# be deleted: they are kept and counted per table under 'sealed'. Returns the deleted row count, the
+# orphans removed per dimension and the aggregate partitions the deleted rows touched.
+def delete_source_partitions(conn, source_files, cache=None):
+    params = [(source_file,) for source_file in source_files]
+    sealed = {}
+    for table in sealed_partitions(conn):
+        kept = sum(conn.execute(f'SELECT COUNT(*) FROM {table} WHERE Source_File = ?', param).fetchone()[0]
+                   for param in params)
+        if kept:
+            sealed[table] = kept
+
+    conn.execute('DROP TABLE IF EXISTS temp.replaced_treatments')
+    conn.execute('''
+    CREATE TEMP TABLE replaced_treatments (
+        Treatment_ID INTEGER PRIMARY KEY, Outcome_Date TEXT, Patient_ID INTEGER, Provider_ID INTEGER,
+        Location_ID INTEGER, Disease_ID INTEGER
+    )
+    ''')
+    tables = treatment_tables(conn, open_only=True)
+    for table in tables:
+        conn.executemany(f'''
+        INSERT OR IGNORE INTO temp.replaced_treatments
+        SELECT Treatment_ID, Outcome_Date, Patient_ID, Provider_ID, Location_ID, Disease_ID
+        FROM {table} WHERE Source_File = ?
+        ''', params)
+    deleted = 0
+    for table in tables:
+        deleted += conn.execute(f'''
+        DELETE FROM {table} WHERE Treatment_ID IN (SELECT Treatment_ID FROM temp.replaced_treatments)
+        ''').rowcount
+
+    orphans = {}
+    for table, column in ORPHAN_DIMENSIONS:
+        keys = [key for (key,) in conn.execute(f'''
+        SELECT DISTINCT r.{column} FROM temp.replaced_treatments r
+        WHERE r.{column} IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM TREATMENT t WHERE t.{column} = r.{column})
+        ''')]
+        conn.executemany(f'DELETE FROM {table} WHERE {column} = ?', [(key,) for key in keys])
+        orphans[table] = keys
+    if cache is not None:
+        cache.forget(orphans['PATIENT'], orphans['DISEASE'], orphans['LOCATION'])
+
+    replaced = pd.read_sql_query('''
+    SELECT Outcome_Date AS treatment_outcome_date, Provider_ID AS provider_id, Disease_ID AS disease_id
+    FROM temp.replaced_treatments
+    ''', conn)
+    conn.execute('DROP TABLE temp.replaced_treatments')
+    return {'treatments': deleted, 'orphans': {table: len(keys) for table, keys in orphans.items()},
+            'partitions': touched_partitions(replaced), 'sealed': sealed}
+
+# Function to read one source file's rows from the cumulative processed CSV, chunk by chunk
+def read_source_rows(processed_csv_path, source_file, columns, chunksize=100_000):
+    options = read_options(read_header(processed_csv_path), columns + LINEAGE_COLUMNS, chunked=True)
+    with pd.read_csv(processed_csv_path, chunksize=chunksize, **options) as reader:
+        frames = [coerce_types(chunk[chunk['source_file'] == source_file].copy()) for chunk in reader]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns + LINEAGE_COLUMNS)
@@ -0,0 +1,85 @@
+# sqlite_tuning.py
+from contextlib import contextmanager
+from treatment_partitions import INDEX_PATTERN, partition_suffix, treatment_tables
+from source_partitions import PARTITION_INDEXES
+
+# Settings used for the duration of a bulk load
+LOAD_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -512000,      # negative = KiB, i.e. ~500 MB of page cache
+    'temp_store': 'MEMORY',
+    'mmap_size': 1073741824     # 1 GB
+}
+
+# Tables whose secondary indexes may be dropped before a large load and rebuilt afterwards
+SECONDARY_INDEX_TABLES = ('TREATMENT', 'PROVIDER')
+
+# Indexes the loader itself reads (source partition lookups and orphan checks), kept during a load
+LOADER_INDEXES = {INDEX_PATTERN.search(statement).group(1) for statement in PARTITION_INDEXES}
+
+def get_pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+# Function to switch a connection to the load settings; returns the previous values for restore_pragmas.
+# synchronous=NORMAL keeps a WAL database consistent after a crash (only the last commits can be lost);
+# OFF is faster but a power loss during the load can corrupt the file.
+def apply_load_pragmas(conn, synchronous='NORMAL'):
+    settings = dict(LOAD_PRAGMAS, synchronous=synchronous)
+    previous = {name: get_pragma(conn, name) for name in settings}
+    for name, value in settings.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return previous
+
+# Function to put the connection back to durable settings: every commit of the load is checkpointed
+# into the main database file with synchronous=FULL before the original journal mode is restored.
+def restore_pragmas(conn, previous):
+    conn.execute('PRAGMA synchronous = FULL')
+    if str(get_pragma(conn, 'journal_mode')).lower() == 'wal':
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    for name in ['cache_size', 'temp_store', 'mmap_size', 'journal_mode', 'synchronous']:
+        conn.execute(f'PRAGMA {name} = {previous[name]}')
+
+# Function to drop the secondary indexes of `tables`; returns their CREATE statements for rebuild_indexes.
+# Automatic indexes behind PRIMARY KEY/UNIQUE constraints have no SQL and are kept. A partitioned TREATMENT
+# stands for its open partitions (sealed ones take no writes). The LOADER_INDEXES, and their copies on the
+# partitions, are kept: without them every partition replace would scan TREATMENT.
+def drop_secondary_indexes(conn, tables=SECONDARY_INDEX_TABLES):
+    tables = [name for table in tables
+              for name in (treatment_tables(conn, open_only=True) if table == 'TREATMENT' else [table])]
+    placeholders = ', '.join('?' for _ in tables)
+    indexes = conn.execute(f'''
+    SELECT name, sql, tbl_name FROM sqlite_master
+    WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    ''', tuple(tables)).fetchall()
+    kept = {f'{name}_{partition_suffix(table)}' for name in LOADER_INDEXES for table in tables} | LOADER_INDEXES
+    indexes = [(name, sql) for name, sql, _ in indexes if name not in kept]
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.commit()
+    return [sql for _, sql in indexes]
+
+def rebuild_indexes(conn, statements):
+    for sql in statements:
+        conn.execute(sql)
+    conn.commit()
+
+# Context manager applying the load profile around a bulk load. Pending work is committed before the
+# journal mode switch. On error the load is rolled back; dropped indexes are always rebuilt and the
+# durable settings always restored.
+@contextmanager
+def bulk_load_profile(conn, synchronous='NORMAL', drop_indexes=False, tables=SECONDARY_INDEX_TABLES):
+    conn.commit()
+    previous = apply_load_pragmas(conn, synchronous)
+    dropped = drop_secondary_indexes(conn, tables) if drop_indexes else []
+    try:
+        yield
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if dropped:
+            print(f"Rebuilding {len(dropped)} secondary indexes.")
+            rebuild_indexes(conn, dropped)
+        restore_pragmas(conn, previous)
@@ -1,200 +1,576 @@
 import pandas as pd
+import numpy as np
 import sqlite3
 import os
 import sys
+import argparse
+from contextlib import nullcontext
 from datetime import datetime
+from provider_scd_merge import PROVIDER_ATTRIBUTES, merge_provider_scd2
+from provider_history import ensure_provider_version_column
+from load_state import (ensure_load_state_table, get_load_state, save_load_state, reset_load_state, iter_new_rows,
+                        max_treatment_id, bump_data_version, DEFAULT_BATCH_ROWS)
+from sqlite_tuning import bulk_load_profile
+from aggregates import ensure_aggregate_tables, rebuild_aggregates, refresh_aggregates, touched_partitions
+from dimension_cache import DimensionKeyCache
+from instrumentation import RunMetrics, connect_with_metrics
+from columnar_store import list_parquet_sources, parquet_row_count, read_parquet_source, parquet_lineage
+from file_processing import LINEAGE_COLUMNS
+from schema_manifest import widen_floats, INVALID_VALUES_COLUMN
+from source_partitions import (ensure_source_partitions, loaded_batches, plan_replacement, delete_source_partitions,
+                               read_source_rows)
+from treatment_partitions import TreatmentWriter, plan_partition_writes
+from validation import validate_frame, quarantine_rows, release_quarantined, ensure_quarantine_table
 
-def main():
-    try:
-        # Setting up paths
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
-        db_dir = os.path.join(project_root, "db")
-        processed_csv_path = os.path.join(project_root, "processed", "Healthcare_Dataset.csv")
-        db_path = os.path.join(db_dir, "healthcare_data.db")
-
-        if not os.path.exists(processed_csv_path):
-            raise FileNotFoundError(f"Processed CSV not found at: {processed_csv_path}")
-
-        # Loading data
-        df = pd.read_csv(processed_csv_path)
-
-        print(f"Loaded {len(df)} records from processed CSV.")
-
-        # Transform date columns
-        df['treatment_start_date'] = pd.to_datetime(df['treatment_start_date'])
-        df['treatment_completion_date'] = pd.to_datetime(df['treatment_completion_date'])
-        df['treatment_outcome_date'] = pd.to_datetime(df['treatment_outcome_date'])
-
-        df['treatment_start_date_only'] = df['treatment_start_date'].dt.date
-        df['treatment_start_time_only'] = df['treatment_start_date'].dt.time
-        df['treatment_end_date_only'] = df['treatment_completion_date'].dt.date
-        df['treatment_end_time_only'] = df['treatment_completion_date'].dt.time
-        df['treatment_outcome_date_only'] = df['treatment_outcome_date'].dt.date
-        df['treatment_outcome_time'] = df['treatment_outcome_date'].dt.time
-
-        df.drop(columns=['treatment_start_date', 'treatment_completion_date', 'treatment_outcome_date'], inplace=True)
-        df.rename(columns={
-            'treatment_start_date_only': 'treatment_start_date',
-            'treatment_start_time_only': 'treatment_start_time',
-            'treatment_end_date_only': 'treatment_end_date',
-            'treatment_end_time_only': 'treatment_end_time',
-            'treatment_outcome_date_only': 'treatment_outcome_date'
-        }, inplace=True)
-
-        # Add calculated fields
-        df['treatment_outcome_date_dt'] = pd.to_datetime(df['treatment_outcome_date'])
-        df['treatment_end_date_dt'] = pd.to_datetime(df['treatment_end_date'])
-        df['Outcome_Day'] = df['treatment_outcome_date_dt'].dt.day_name()
-        df['Outcome_Weekend_Flag'] = df['Outcome_Day'].isin(['Saturday', 'Sunday']).astype(int)
-        df['Report_Duration'] = (df['treatment_outcome_date_dt'] - df['treatment_end_date_dt']).dt.days
-        df['Outcome_Quarter'] = df['treatment_outcome_date_dt'].dt.quarter
-        df.drop(columns=['treatment_outcome_date_dt', 'treatment_end_date_dt'], inplace=True)
-
-        # Split names
+# Effectiveness table mapping
+EFFECTIVENESS_MAPPING = {
+    'deceased': 0,
+    'worsened': 1,
+    'unsuccessful': 2,
+    'partially successful': 3,
+    'stable': 4,
+    'successful': 5
+}
+
+PROVIDER_COLUMNS = ['provider_id', 'provider_first_name', 'provider_last_name',
+                    'speciality_id_x', 'speciality_name', 'affiliated_hospital']
+
+def get_default_paths():
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
+    processed_csv_path = os.path.join(project_root, "processed", "Healthcare_Dataset.csv")
+    db_path = os.path.join(project_root, "db", "healthcare_data.db")
+    return processed_csv_path, db_path
+
+# Function to derive the date fields and split the names of the processed data
+# Date columns of the processed data and the names of their 'YYYY-MM-DD' silver columns
+DATE_COLUMNS = {
+    'treatment_start_date': 'treatment_start_date',
+    'treatment_completion_date': 'treatment_end_date',
+    'treatment_outcome_date': 'treatment_outcome_date'
+}
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Function to convert a datetime column to numpy day precision (NaT preserved)
+def to_days(series):
+    return pd.to_datetime(series, format='ISO8601').to_numpy().astype('datetime64[D]')
+
+# Function to derive the silver date columns in one vectorized pass: every date is parsed once into
+# datetime64[D] and the ISO strings, day name, weekend flag, quarter and report duration come from it
+def derive_date_features(df):
+    days = {column: to_days(df[column]) for column in DATE_COLUMNS}
+    outcome = days['treatment_outcome_date']
+    outcome_missing = np.isnat(outcome)
+
+    for column, silver_column in DATE_COLUMNS.items():
+        iso = pd.Series(days[column].astype('U10'), index=df.index)
+        df[silver_column] = iso.where(~np.isnat(days[column]))
+    df.drop(columns=['treatment_completion_date'], inplace=True)
+
+    # 1970-01-01 was a Thursday (3 with Monday = 0)
+    day_of_week = (outcome.astype('int64') + 3) % 7
+    df['Outcome_Day'] = pd.Categorical.from_codes(np.where(outcome_missing, -1, day_of_week), DAY_NAMES)
+    df['Outcome_Weekend_Flag'] = ((day_of_week >= 5) & ~outcome_missing).astype('int64')
+
+    report_duration = (outcome - days['treatment_completion_date']).astype('int64')
+    report_missing = outcome_missing | np.isnat(days['treatment_completion_date'])
+    df['Report_Duration'] = pd.arrays.IntegerArray(np.where(report_missing, 0, report_duration), report_missing)
+
+    month = outcome.astype('datetime64[M]').astype('int64') % 12
+    df['Outcome_Quarter'] = pd.arrays.IntegerArray(np.where(outcome_missing, 0, month // 3 + 1), outcome_missing)
+    return df
+
+# Function to set aside the rows failing the validation.py rules; returns the clean rows and the rejected ones
+def validate_dataframe(df, metrics=None):
+    metrics = metrics or RunMetrics('silver')
+    with metrics.stage('validate', rows=len(df)):
+        return validate_frame(df, EFFECTIVENESS_MAPPING)
+
+def prepare_dataframe(df, metrics=None):
+    metrics = metrics or RunMetrics('silver')
+    df = widen_floats(df)
+    with metrics.stage('date_features', rows=len(df)):
+        df = derive_date_features(df)
+
+    # Split names
+    with metrics.stage('name_split', rows=len(df)):
         df[['provider_first_name', 'provider_last_name']] = df['provider_name'].str.split(' ', n=1, expand=True)
         df[['patient_first_name', 'patient_last_name']] = df['patient_name'].str.split(' ', n=1, expand=True)
 
-        # Connect to SQLite
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        print("Connected to database.")
+    # Rows processed before the lineage columns existed are loaded without a source partition
+    for column in LINEAGE_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    return df
 
-        # Effectiveness table mapping
-        effectiveness_mapping = {
-            'deceased': 0,
-            'worsened': 1,
-            'unsuccessful': 2,
-            'partially successful': 3,
-            'stable': 4,
-            'successful': 5
-        }
-
-        inserted_patients = 0
-        inserted_providers = 0
-        inserted_diseases = 0
-        inserted_locations = 0
-        inserted_treatments = 0
-
-        # Insert Effectiveness data
-        for idx, (status, score) in enumerate(effectiveness_mapping.items(), start=1):
-            cursor.execute('''
-                INSERT OR IGNORE INTO EFFECTIVENESS (Effectiveness_ID, Outcome_Status, Effectiveness_Score)
-                VALUES (?, ?, ?)
-            ''', (idx, status, score))
-        print("Effectiveness scores populated.")
+# Function to insert the Effectiveness data
+def populate_effectiveness(cursor):
+    for idx, (status, score) in enumerate(EFFECTIVENESS_MAPPING.items(), start=1):
+        cursor.execute('''
+            INSERT OR IGNORE INTO EFFECTIVENESS (Effectiveness_ID, Outcome_Status, Effectiveness_Score)
+            VALUES (?, ?, ?)
+        ''', (idx, status, score))
 
-        # Insert records
-        for _, row in df.iterrows():
-            # PATIENT
+# PROVIDER SCD TYPE 2: expire the current version and insert a new one when any attribute changed.
+# Returns 1 when a new version (or a new provider) was inserted, otherwise 0.
+def upsert_provider_version(cursor, provider, today):
+    provider_id, first_name, last_name, spec_id, spec_name, hospital = provider
+
+    cursor.execute('''
+    SELECT * FROM PROVIDER
+    WHERE Provider_ID = ? AND Is_Current = 1
+    ''', (provider_id,))
+    existing = cursor.fetchone()
+
+    if existing:
+        _, _, old_fname, old_lname, old_spec_id, old_spec_name, old_hosp, _, _, _ = existing
+        if (old_fname == first_name and
+            old_lname == last_name and
+            old_spec_id == spec_id and
+            old_spec_name == spec_name and
+            old_hosp == hospital):
+            return 0
+
+        cursor.execute('''
+        UPDATE PROVIDER
+        SET Valid_To = ?, Is_Current = 0
+        WHERE Provider_ID = ? AND Is_Current = 1
+        ''', (today, provider_id))
+
+    cursor.execute('''
+    INSERT INTO PROVIDER (
+        Provider_ID, First_Name, Last_Name, Speciality_Id, Speciality_Name, Affiliated_Hospital,
+        Valid_From, Valid_To, Is_Current
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 1)
+    ''', (provider_id, first_name, last_name, spec_id, spec_name, hospital, today))
+    return 1
+
+# Function to convert a DataFrame into sqlite3 parameter tuples (NaN/NaT become NULL)
+def to_records(frame):
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+# Original loader: one round trip per dimension and per row.
+# stamp_versions=True also stores the PROVIDER version each treatment was recorded against.
+def load_row_by_row(conn, df, cache=None, metrics=None, stamp_versions=False):
+    metrics = metrics or RunMetrics('silver')
+    with metrics.stage('row_loader', rows=len(df)):
+        return insert_rows(conn, df, cache or DimensionKeyCache(conn), stamp_versions)
+
+def insert_rows(conn, df, cache, stamp_versions=False):
+    cursor = conn.cursor()
+    writer = TreatmentWriter(conn)
+    counts = {'patients': 0, 'providers': 0, 'diseases': 0, 'locations': 0, 'treatments': 0}
+    today = datetime.today().strftime('%Y-%m-%d')
+
+    # Missing values (pd.NA in the nullable columns) are bound as NULL, as in to_records
+    for _, row in df.astype(object).where(df.notna(), None).iterrows():
+        # PATIENT
+        if cache.patient_missing(row['patient_id']):
             cursor.execute('''
             INSERT OR IGNORE INTO PATIENT (Patient_ID, First_Name, Last_Name, Gender, Age)
             VALUES (?, ?, ?, ?, ?)
             ''', (row['patient_id'], row['patient_first_name'], row['patient_last_name'], row['gender'], row['age']))
-            inserted_patients += cursor.rowcount
+            counts['patients'] += cursor.rowcount
 
-            # PROVIDER SCD TYPE 2
-            cursor.execute('''
-            SELECT * FROM PROVIDER
-            WHERE Provider_ID = ? AND Is_Current = 1
-            ''', (row['provider_id'],))
-            existing = cursor.fetchone()
-
-            today = datetime.today().strftime('%Y-%m-%d')
-
-            if existing:
-                _, _, old_fname, old_lname, old_spec_id, old_spec_name, old_hosp, _, _, _ = existing
-                if (old_fname != row['provider_first_name'] or
-                    old_lname != row['provider_last_name'] or
-                    old_spec_id != row['speciality_id_x'] or
-                    old_spec_name != row['speciality_name'] or
-                    old_hosp != row['affiliated_hospital']):
-                    cursor.execute('''
-                    UPDATE PROVIDER
-                    SET Valid_To = ?, Is_Current = 0
-                    WHERE Provider_ID = ? AND Is_Current = 1
-                    ''', (today, row['provider_id']))
-
-                    cursor.execute('''
-                    INSERT INTO PROVIDER (
-                        Provider_ID, First_Name, Last_Name, Speciality_Id, Speciality_Name, Affiliated_Hospital,
-                        Valid_From, Valid_To, Is_Current
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 1)
-                    ''', (row['provider_id'], row['provider_first_name'], row['provider_last_name'],
-                          row['speciality_id_x'], row['speciality_name'], row['affiliated_hospital'], today))
-                    inserted_providers += 1
-            else:
-                cursor.execute('''
-                INSERT INTO PROVIDER (
-                    Provider_ID, First_Name, Last_Name, Speciality_Id, Speciality_Name, Affiliated_Hospital,
-                    Valid_From, Valid_To, Is_Current
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 1)
-                ''', (row['provider_id'], row['provider_first_name'], row['provider_last_name'],
-                      row['speciality_id_x'], row['speciality_name'], row['affiliated_hospital'], today))
-                inserted_providers += 1
-
-            # DISEASE
+        # PROVIDER SCD TYPE 2
+        counts['providers'] += upsert_provider_version(cursor, tuple(row[PROVIDER_COLUMNS]), today)
+        provider_version_id = None
+        if stamp_versions:
+            cursor.execute('SELECT Version_ID FROM PROVIDER WHERE Provider_ID = ? AND Is_Current = 1',
+                           (row['provider_id'],))
+            provider_version_id = cursor.fetchone()[0]
+
+        # DISEASE
+        if cache.disease_missing(row['disease_id']):
             cursor.execute('''
             INSERT OR IGNORE INTO DISEASE (Disease_ID, Speciality_Id, Name, Type, Severity, Transmission_Mode, Mortality_Rate)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (row['disease_id'], row['speciality_id_x'], row['disease_name'],
                   row['disease_type'], row['severity'], row['transmission_mode'], row['mortality_rate']))
-            inserted_diseases += cursor.rowcount
+            counts['diseases'] += cursor.rowcount
 
-            # LOCATION
-            cursor.execute('''
-            SELECT Location_ID FROM LOCATION WHERE Country = ? AND State = ? AND City = ?
-            ''', (row['country'], row['state'], row['city']))
-            location_row = cursor.fetchone()
+        # LOCATION: resolved from the cache, only new members are written
+        location_id = cache.location_id(row['country'], row['state'], row['city'])
+        if location_id is None:
+            location_id = cache.insert_location(cursor, (row['country'], row['state'], row['city']))
+            counts['locations'] += 1
 
-            if location_row:
-                location_id = location_row[0]
-            else:
-                cursor.execute('''
-                INSERT INTO LOCATION (Country, State, City)
-                VALUES (?, ?, ?)
-                ''', (row['country'], row['state'], row['city']))
-                location_id = cursor.lastrowid
-                inserted_locations += 1
+        # TREATMENT (or the partition of its outcome year)
+        effectiveness_score = EFFECTIVENESS_MAPPING.get(str(row['treatment_outcome_status']).lower(), None)
+        cursor.execute(f'''
+        INSERT OR IGNORE INTO {writer.table_for(row['treatment_outcome_date'], row.get('treatment_partition'))} (
+            Treatment_ID, Start_Date, Completion_Date, Outcome_Date, Outcome_Quarter, Treatment_Duration, Cost,
+            Effectiveness_Score, Type, Patient_ID, Provider_ID, Location_ID, Disease_ID,
+            Outcome_Day, Outcome_Weekend_Flag, Report_Duration, Source_File, Source_Batch, Provider_Version_ID
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            row['treatment_id'],
+            row['treatment_start_date'] if pd.notnull(row['treatment_start_date']) else None,
+            row['treatment_end_date'] if pd.notnull(row['treatment_end_date']) else None,
+            row['treatment_outcome_date'] if pd.notnull(row['treatment_outcome_date']) else None,
+            row['Outcome_Quarter'],
+            row['treatment_duration'],
+            row['treatment_cost'],
+            effectiveness_score,
+            row['treatment_type'],
+            row['patient_id'],
+            row['provider_id'],
+            location_id,
+            row['disease_id'],
+            row['Outcome_Day'],
+            row['Outcome_Weekend_Flag'],
+            row['Report_Duration'],
+            row['source_file'] if pd.notnull(row['source_file']) else None,
+            int(row['source_batch']) if pd.notnull(row['source_batch']) else None,
+            provider_version_id
+        ))
+        counts['treatments'] += cursor.rowcount
 
-            row['location_id'] = location_id
+    return counts
 
-            # TREATMENT
-            effectiveness_score = effectiveness_mapping.get(str(row['treatment_outcome_status']).lower(), None)
-            cursor.execute('''
-            INSERT OR IGNORE INTO TREATMENT (
+# Set-based loader: dedupes each dimension in pandas and writes it with executemany
+def load_bulk(conn, df, cache=None, metrics=None, stamp_versions=False):
+    cursor = conn.cursor()
+    cache = cache or DimensionKeyCache(conn)
+    metrics = metrics or RunMetrics('silver')
+    counts = {'patients': 0, 'providers': 0, 'diseases': 0, 'locations': 0, 'treatments': 0}
+    today = datetime.today().strftime('%Y-%m-%d')
+
+    # PATIENT: only the members the cache has not seen are written
+    with metrics.stage('patients', rows=len(df)):
+        patients = cache.new_patients(df.drop_duplicates('patient_id')[
+            ['patient_id', 'patient_first_name', 'patient_last_name', 'gender', 'age']], len(df))
+        cursor.executemany('''
+        INSERT OR IGNORE INTO PATIENT (Patient_ID, First_Name, Last_Name, Gender, Age)
+        VALUES (?, ?, ?, ?, ?)
+        ''', to_records(patients))
+        counts['patients'] = cursor.rowcount
+
+    # PROVIDER SCD TYPE 2: diff the whole batch against the current versions in memory
+    with metrics.stage('provider_scd', rows=len(df)):
+        providers = df[PROVIDER_COLUMNS].copy()
+        providers.columns = ['Provider_ID'] + PROVIDER_ATTRIBUTES
+        provider_versions = None
+        if stamp_versions:
+            counts['providers'], provider_versions = merge_provider_scd2(conn, providers, today, return_versions=True)
+        else:
+            counts['providers'] = merge_provider_scd2(conn, providers, today)
+
+    # DISEASE
+    with metrics.stage('diseases', rows=len(df)):
+        diseases = cache.new_diseases(df.drop_duplicates('disease_id')[
+            ['disease_id', 'speciality_id_x', 'disease_name', 'disease_type', 'severity',
+             'transmission_mode', 'mortality_rate']], len(df))
+        cursor.executemany('''
+        INSERT OR IGNORE INTO DISEASE (Disease_ID, Speciality_Id, Name, Type, Severity, Transmission_Mode, Mortality_Rate)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', to_records(diseases))
+        counts['diseases'] = cursor.rowcount
+
+    # LOCATION: resolve every row's Location_ID from the cache, inserting the distinct new members
+    with metrics.stage('locations', rows=len(df)):
+        location_ids, counts['locations'] = cache.resolve_locations(cursor, df)
+
+    # TREATMENT (one executemany per partition when it is partitioned)
+    with metrics.stage('treatments', rows=len(df)):
+        effectiveness = df['treatment_outcome_status'].astype(str).str.lower().map(EFFECTIVENESS_MAPPING)
+        treatments = pd.DataFrame({
+            'Treatment_ID': df['treatment_id'].to_numpy(),
+            'Start_Date': df['treatment_start_date'].to_numpy(),
+            'Completion_Date': df['treatment_end_date'].to_numpy(),
+            'Outcome_Date': df['treatment_outcome_date'].to_numpy(),
+            'Outcome_Quarter': df['Outcome_Quarter'].to_numpy(),
+            'Treatment_Duration': df['treatment_duration'].to_numpy(),
+            'Cost': df['treatment_cost'].to_numpy(),
+            'Effectiveness_Score': effectiveness.astype('Int64').to_numpy(),
+            'Type': df['treatment_type'].to_numpy(),
+            'Patient_ID': df['patient_id'].to_numpy(),
+            'Provider_ID': df['provider_id'].to_numpy(),
+            'Location_ID': location_ids.astype('Int64').to_numpy(),
+            'Disease_ID': df['disease_id'].to_numpy(),
+            'Outcome_Day': df['Outcome_Day'].to_numpy(),
+            'Outcome_Weekend_Flag': df['Outcome_Weekend_Flag'].to_numpy(),
+            'Report_Duration': df['Report_Duration'].to_numpy(),
+            'Source_File': df['source_file'].to_numpy(),
+            'Source_Batch': df['source_batch'].astype('Int64').to_numpy(),
+            'Provider_Version_ID': (provider_versions.to_numpy() if provider_versions is not None
+                                    else np.full(len(df), None))
+        })
+        routes = df['treatment_partition'].to_numpy() if 'treatment_partition' in df.columns else None
+        for table, rows in TreatmentWriter(conn).split(treatments, routes):
+            cursor.executemany(f'''
+            INSERT OR IGNORE INTO {table} (
                 Treatment_ID, Start_Date, Completion_Date, Outcome_Date, Outcome_Quarter, Treatment_Duration, Cost,
                 Effectiveness_Score, Type, Patient_ID, Provider_ID, Location_ID, Disease_ID,
-                Outcome_Day, Outcome_Weekend_Flag, Report_Duration
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row['treatment_id'],
-                row['treatment_start_date'].strftime('%Y-%m-%d') if pd.notnull(row['treatment_start_date']) else None,
-                row['treatment_end_date'].strftime('%Y-%m-%d') if pd.notnull(row['treatment_end_date']) else None,
-                row['treatment_outcome_date'].strftime('%Y-%m-%d') if pd.notnull(row['treatment_outcome_date']) else None,
-                row['Outcome_Quarter'],
-                row['treatment_duration'],
-                row['treatment_cost'],
-                effectiveness_score,
-                row['treatment_type'],
-                row['patient_id'],
-                row['provider_id'],
-                row['location_id'],
-                row['disease_id'],
-                row['Outcome_Day'],
-                row['Outcome_Weekend_Flag'],
-                row['Report_Duration']
-            ))
-            inserted_treatments += cursor.rowcount
+                Outcome_Day, Outcome_Weekend_Flag, Report_Duration, Source_File, Source_Batch, Provider_Version_ID
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', to_records(rows))
+            counts['treatments'] += cursor.rowcount
+
+    return counts
+
+LOADERS = {
+    'bulk': load_bulk,
+    'row': load_row_by_row
+}
+
+# Columns of the processed data the silver load actually reads
+SOURCE_COLUMNS = ['treatment_id', 'treatment_start_date', 'treatment_completion_date', 'treatment_outcome_status',
+                  'treatment_outcome_date', 'treatment_duration', 'treatment_cost', 'treatment_type',
+                  'provider_id', 'provider_name', 'speciality_id_x', 'speciality_name', 'affiliated_hospital',
+                  'country', 'state', 'city', 'patient_id', 'patient_name', 'gender', 'age',
+                  'disease_id', 'disease_name', 'disease_type', 'severity', 'transmission_mode', 'mortality_rate',
+                  INVALID_VALUES_COLUMN]
+
+def add_counts(total, counts):
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+# Function to load one delta of processed rows; the caller saves the watermark and commits.
+# A source file delivered in a newer batch than the loaded one (or listed in `reload_sources`) first has
+# its TREATMENT partition and orphaned dimension members deleted, in the same transaction.
+# `prepared` frames already went through prepare_dataframe (e.g. in a pipeline worker). When a `partitions`
+# dict is given, the touched aggregate partitions are collected in it and the caller refreshes them once
+# before committing several frames. stamp_versions=True stores TREATMENT.Provider_Version_ID.
+# Any change bumps the data version, which invalidates the results cached by query_service.py on commit.
+# Rows failing validation are stored in QUARANTINE in the same transaction and the clean rows are loaded;
+# prepared frames were validated with them and pass their `rejected` rows. On a partitioned TREATMENT the
+# rows touching a sealed year are skipped and reported (the rows a replaced source has there are kept).
+def load_frame(conn, df, mode, cache=None, metrics=None, reload_sources=(), prepared=False, partitions=None,
+               stamp_versions=False, rejected=None):
+    metrics = metrics or RunMetrics('silver')
+    with metrics.stage('partition_replace', rows=len(df)):
+        df, replace = plan_replacement(conn, df, reload_sources)
+        removed = delete_source_partitions(conn, replace, cache) if replace else None
+    if not prepared:
+        df, rejected = validate_dataframe(df, metrics)
+    counts = {}
+    touched = {'months': set(), 'provider_ids': set(), 'disease_ids': set()}
+    if removed:
+        print(f"Replaced the partitions of {', '.join(replace)}: {removed['treatments']} treatments deleted, "
+              f"orphans removed {removed['orphans']}")
+        counts['treatments_deleted'] = removed['treatments']
+        touched = {key: set(values) for key, values in removed['partitions'].items()}
+    if removed and removed['sealed']:
+        held = ', '.join(f"{table} ({rows})" for table, rows in removed['sealed'].items())
+        print(f"Kept the treatments of {', '.join(replace)} in sealed partitions: {held}. "
+              f"Unseal them (treatment_partitions.py --unseal) and reload to replace these rows.")
+
+    # Rows touching a sealed partition are skipped and reported
+    with metrics.stage('partition_plan', rows=len(df)):
+        df, sealed_rows = plan_partition_writes(conn, df)
+    if not sealed_rows.empty:
+        skipped = sealed_rows.groupby('sealed_partition').size()
+        print(f"Skipped {len(sealed_rows)} treatments of sealed partitions: "
+              f"{', '.join(f'{table} ({rows})' for table, rows in skipped.items())}. "
+              f"Unseal them (treatment_partitions.py --unseal) and reload to write these rows.")
+
+    if not df.empty:
+        if not prepared:
+            df = prepare_dataframe(df, metrics)
+        populate_effectiveness(conn.cursor())
+        add_counts(counts, LOADERS[mode](conn, df, cache, metrics, stamp_versions))
+        release_quarantined(conn, df['treatment_id'])
+        for key, values in touched_partitions(df).items():
+            touched[key].update(values)
+    if counts:
+        bump_data_version(conn)
+    if not sealed_rows.empty:
+        counts['sealed_skipped'] = len(sealed_rows)
+    if rejected is not None and not rejected.empty:
+        # The rows are stored with the columns the silver load reads, whichever path rejected them
+        kept = [column for column in SOURCE_COLUMNS + LINEAGE_COLUMNS + ['reason'] if column in rejected.columns]
+        counts['quarantined'] = quarantine_rows(conn, rejected[kept])
+
+    if partitions is not None:
+        for key, values in touched.items():
+            partitions.setdefault(key, set()).update(values)
+        return counts
+    # Recomputing the aggregate partitions touched by these treatments (and the deleted ones) in the same transaction
+    with metrics.stage('aggregates', rows=len(df)):
+        refresh_aggregates(conn, **touched)
+    return counts
+
+# Function to load the rows appended to the cumulative processed CSV since the last run.
+# The rows are loaded and committed in batches of `batch_rows` (0 for one transaction), each commit storing
+# the watermark of its last row as the checkpoint: a run that fails keeps the batches committed before the
+# error, and the next run resumes after them. PROVIDER versions are merged against the versions committed
+# by the previous batches, so SCD Type II history is the same as with a single transaction.
+def load_csv_source(conn, processed_csv_path, mode, cache=None, metrics=None, stamp_versions=False,
+                    batch_rows=DEFAULT_BATCH_ROWS):
+    metrics = metrics or RunMetrics('silver')
+    if not os.path.exists(processed_csv_path):
+        raise FileNotFoundError(f"Processed CSV not found at: {processed_csv_path}")
+
+    source = os.path.basename(processed_csv_path)
+    row_offset, byte_offset = get_load_state(conn, source)
+    if row_offset:
+        print(f"Resuming {source} after row {row_offset} (skipped {row_offset} already loaded).")
+
+    # Loading only the rows appended since the last checkpoint
+    counts = {}
+    batches = iter_new_rows(processed_csv_path, byte_offset, SOURCE_COLUMNS + LINEAGE_COLUMNS, batch_rows)
+    while True:
+        with metrics.stage('read') as stage:
+            batch = next(batches, None)
+            if batch is not None:
+                stage['rows'], stage['bytes_read'] = len(batch[0]), batch[1] - byte_offset
+        if batch is None:
+            break
+        df, end_offset = batch
+        metrics.rows += len(df)
+        metrics.bytes_read += stage['bytes_read']
+
+        add_counts(counts, load_frame(conn, df, mode, cache, metrics, stamp_versions=stamp_versions))
+        save_load_state(conn, source, row_offset + len(df), end_offset, max_treatment_id(df['treatment_id']))
+        with metrics.stage('commit'):
+            conn.commit()
+        row_offset, byte_offset = row_offset + len(df), end_offset
+        print(f"Committed {len(df)} records from processed CSV (checkpoint: row {row_offset}).")
+    return counts
+
+# Function to load every per-source Parquet file that is not fully loaded yet, committing every
+# `batch_rows` rows (0 for one transaction per source) with the source's row watermark as the checkpoint
+def load_parquet_sources(conn, parquet_dir, mode, cache=None, metrics=None, stamp_versions=False,
+                         batch_rows=DEFAULT_BATCH_ROWS):
+    metrics = metrics or RunMetrics('silver')
+    sources = list_parquet_sources(parquet_dir)
+    if not sources:
+        raise FileNotFoundError(f"No processed Parquet files found in: {parquet_dir}")
 
+    total = {}
+    for path in sources:
+        source = os.path.join('parquet', os.path.basename(path))
+        row_offset, _ = get_load_state(conn, source)
+        row_count = parquet_row_count(path)
+        if row_offset > row_count:
+            print(f"{source} is smaller than the stored watermark, reloading it from the start.")
+            row_offset = 0
+
+        # A re-delivered raw file rewrites its Parquet file: reload it whole to replace the loaded partition
+        lineage = parquet_lineage(path)
+        if lineage and row_offset:
+            source_file, batch = lineage
+            loaded = loaded_batches(conn, [source_file]).get(source_file)
+            if loaded is not None and batch > loaded:
+                print(f"{source} holds batch {batch} of {source_file}, replacing the loaded batch {loaded}.")
+                row_offset = 0
+        if row_offset == row_count:
+            continue
+
+        # Bytes read are estimated as the file's share of rows past the watermark
+        with metrics.stage('read') as stage:
+            df = read_parquet_source(path, columns=SOURCE_COLUMNS + (LINEAGE_COLUMNS if lineage else []),
+                                     row_offset=row_offset)
+            stage['rows'] = len(df)
+            stage['bytes_read'] = os.path.getsize(path) * len(df) // row_count
+        metrics.rows += len(df)
+        metrics.bytes_read += stage['bytes_read']
+        print(f"Loaded {len(df)} new records from {source}.")
+        step = batch_rows or len(df)
+        for start in range(0, len(df), step):
+            batch = df.iloc[start:start + step]
+            add_counts(total, load_frame(conn, batch, mode, cache, metrics, stamp_versions=stamp_versions))
+            save_load_state(conn, source, row_offset + start + len(batch), None,
+                            max_treatment_id(batch['treatment_id']))
+            with metrics.stage('commit'):
+                conn.commit()
+    return total
+
+# Function to delete and reinsert the partition of one raw source file from the processed data,
+# in one transaction; the watermarks are left as they are
+def reload_source(conn, source_file, input_format, processed_csv_path, parquet_dir, mode, cache=None, metrics=None,
+                  stamp_versions=False):
+    metrics = metrics or RunMetrics('silver')
+    with metrics.stage('read') as stage:
+        if input_format == 'parquet':
+            path = os.path.join(parquet_dir, f"{os.path.splitext(source_file)[0]}.parquet")
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Processed Parquet file not found at: {path}")
+            df = read_parquet_source(path, columns=SOURCE_COLUMNS + LINEAGE_COLUMNS)
+        else:
+            if not os.path.exists(processed_csv_path):
+                raise FileNotFoundError(f"Processed CSV not found at: {processed_csv_path}")
+            path = processed_csv_path
+            df = read_source_rows(processed_csv_path, source_file, SOURCE_COLUMNS)
+        stage['rows'], stage['bytes_read'] = len(df), os.path.getsize(path)
+    metrics.rows += len(df)
+    metrics.bytes_read += stage['bytes_read']
+    if df.empty:
+        raise FileNotFoundError(f"No processed rows found for source file {source_file}")
+
+    print(f"Reloading {len(df)} records of {source_file}.")
+    counts = load_frame(conn, df, mode, cache, metrics, reload_sources=[source_file], stamp_versions=stamp_versions)
+    with metrics.stage('commit'):
         conn.commit()
+    return counts
+
+def main(mode='bulk', processed_csv_path=None, db_path=None, full_reload=False, input_format='csv', parquet_dir=None,
+         fast_load=False, synchronous='NORMAL', drop_indexes=False, report_dir=None, record_metrics=False,
+         source_file=None, stamp_provider_versions=False, batch_rows=DEFAULT_BATCH_ROWS):
+    metrics = RunMetrics('silver', {'mode': mode, 'format': input_format, 'full_reload': full_reload,
+                                    'fast_load': fast_load, 'synchronous': synchronous, 'drop_indexes': drop_indexes,
+                                    'source_file': source_file, 'stamp_provider_versions': stamp_provider_versions,
+                                    'batch_rows': batch_rows})
+    try:
+        # Setting up paths
+        default_csv_path, default_db_path = get_default_paths()
+        processed_csv_path = processed_csv_path or default_csv_path
+        parquet_dir = parquet_dir or os.path.join(os.path.dirname(processed_csv_path), "parquet")
+        db_path = db_path or default_db_path
+
+        # Connect to SQLite; the connection counts the statements it runs per table
+        conn = connect_with_metrics(db_path, metrics)
+        print("Connected to database.")
+
+        ensure_load_state_table(conn)
+        ensure_source_partitions(conn)
+        ensure_provider_version_column(conn)
+        ensure_quarantine_table(conn)
+        if full_reload:
+            reset_load_state(conn)
+        if ensure_aggregate_tables(conn):
+            rebuild_aggregates(conn)
+
+        # Dimension keys already in the database, shared by every delta of this run
+        cache = DimensionKeyCache(conn)
+
+        # Insert records
+        print(f"Loading records with the '{mode}' loader.")
+        load_profile = bulk_load_profile(conn, synchronous, drop_indexes) if fast_load else nullcontext()
+        with load_profile:
+            if source_file:
+                counts = reload_source(conn, source_file, input_format, processed_csv_path, parquet_dir, mode,
+                                       cache, metrics, stamp_provider_versions)
+            elif input_format == 'parquet':
+                counts = load_parquet_sources(conn, parquet_dir, mode, cache, metrics, stamp_provider_versions,
+                                              batch_rows)
+            else:
+                counts = load_csv_source(conn, processed_csv_path, mode, cache, metrics, stamp_provider_versions,
+                                         batch_rows)
+
+        metrics.finish()
+        if not counts:
+            print("No new records to load.")
+            return
         print("All data inserted and committed successfully.")
 
         # Print record counts
-        print(f"Patients inserted: {inserted_patients}")
-        print(f"Providers inserted (new versions or new): {inserted_providers}")
-        print(f"Diseases inserted: {inserted_diseases}")
-        print(f"Locations inserted: {inserted_locations}")
-        print(f"Treatments inserted: {inserted_treatments}")
+        if counts.get('treatments_deleted'):
+            print(f"Treatments deleted from replaced source partitions: {counts['treatments_deleted']}")
+        print(f"Patients inserted: {counts.get('patients', 0)}")
+        print(f"Providers inserted (new versions or new): {counts.get('providers', 0)}")
+        print(f"Diseases inserted: {counts.get('diseases', 0)}")
+        print(f"Locations inserted: {counts.get('locations', 0)}")
+        print(f"Treatments inserted: {counts.get('treatments', 0)}")
+        if counts.get('sealed_skipped'):
+            print(f"Treatments skipped in sealed partitions: {counts['sealed_skipped']}")
+        if counts.get('quarantined'):
+            print(f"Rows quarantined: {counts['quarantined']} (python validation.py lists them by reason)")
+        print("Dimension key cache:")
+        for line in cache.report():
+            print(f"  {line}")
 
     except FileNotFoundError as fe:
         print(f"{fe}")
@@ -202,16 +578,57 @@ def main():
 
     except sqlite3.Error as e:
         print(f"SQLite error: {e}")
+        print("Batches committed before the error are kept; run again to resume from the last checkpoint.")
         sys.exit(1)
 
     except Exception as e:
         print(f"Unexpected error: {e}")
+        print("Batches committed before the error are kept; run again to resume from the last checkpoint.")
         sys.exit(1)
 
     finally:
+        if metrics.status == 'running':
+            metrics.finish('failed')
+        metrics.print_summary()
+        # Reports go next to the database's folder (Healthcare_ETL_Project/run_reports)
+        db_dir = os.path.dirname(os.path.abspath(db_path or get_default_paths()[1]))
+        report_dir = report_dir or os.path.join(os.path.dirname(db_dir), 'run_reports')
+        print(f"Run report written to {metrics.write_report(report_dir)}")
         if 'conn' in locals():
+            if record_metrics:
+                if metrics.status == 'failed':
+                    conn.rollback()
+                metrics.save_to_db(conn)
             conn.close()
             print("Database connection closed.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load the processed healthcare CSV into the star schema.")
+    parser.add_argument('--mode', choices=sorted(LOADERS), default='bulk',
+                        help="'bulk' writes each deduplicated dimension with executemany, 'row' is the per-row loader")
+    parser.add_argument('--full-reload', action='store_true',
+                        help="ignore the load watermarks and reload all processed data")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="processed input written by run_etl: the cumulative CSV or per-file Parquet")
+    parser.add_argument('--fast-load', action='store_true',
+                        help="use WAL, a large cache and in-memory temp storage during the load, then restore durable settings")
+    parser.add_argument('--synchronous', choices=['NORMAL', 'OFF'], default='NORMAL',
+                        help="synchronous setting during a --fast-load (OFF risks corruption on power loss)")
+    parser.add_argument('--drop-indexes', action='store_true',
+                        help="with --fast-load, drop TREATMENT/PROVIDER secondary indexes and rebuild them after the load")
+    parser.add_argument('--record-metrics', action='store_true',
+                        help="also store the run report in the RUN_METRICS table of the database")
+    parser.add_argument('--reload-source', default=None, metavar='FILE',
+                        help="delete and reinsert the TREATMENT partition of one raw file (e.g. healthcare_treatments_csv_1.csv)")
+    parser.add_argument('--stamp-provider-versions', action='store_true',
+                        help="store in TREATMENT.Provider_Version_ID the PROVIDER version each treatment was recorded against")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help="rows committed per transaction with their checkpoint (0 = one transaction)")
+    args = parser.parse_args()
+    if args.batch_rows < 0:
+        print("--batch-rows must be 0 or more")
+        sys.exit(1)
+    main(mode=args.mode, full_reload=args.full_reload, input_format=args.format,
+         fast_load=args.fast_load, synchronous=args.synchronous, drop_indexes=args.drop_indexes,
+         record_metrics=args.record_metrics, source_file=args.reload_source,
+         stamp_provider_versions=args.stamp_provider_versions, batch_rows=args.batch_rows)
@@ -0,0 +1,360 @@
+# treatment_partitions.py
+import os
+import re
+import sys
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Time-partitioned fact storage (optional): TREATMENT becomes a UNION ALL view over one table per outcome
+# year (TREATMENT_2024, TREATMENT_2025, ...) plus TREATMENT_UNDATED for rows without an outcome date, all in
+# healthcare_data.db. Readers keep querying TREATMENT; the loaders write each row to its year's table.
+# A sealed partition (a closed year) rejects writes through triggers and is left out of index builds, so
+# loads and reindexing only touch the open years.
+# Treatment_ID is unique within a partition only: a treatment delivered again with another outcome year is
+# routed to the partition already holding it (plan_partition_writes), where INSERT OR IGNORE keeps the stored
+# row as an unpartitioned TREATMENT would, so the view never returns it twice. Re-delivered source files
+# are deleted before they are reloaded, so their rows move to their new year.
+UNDATED_PARTITION = 'TREATMENT_UNDATED'
+
+CATALOG_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS TREATMENT_PARTITIONS (
+        Partition_Table TEXT PRIMARY KEY,
+        Outcome_Year INTEGER,
+        Sealed INTEGER NOT NULL DEFAULT 0,
+        Sealed_At TEXT
+    )
+    ''',
+    # Indexes every new partition is created with (the TREATMENT indexes, without the partition suffix)
+    '''
+    CREATE TABLE IF NOT EXISTS TREATMENT_PARTITION_INDEXES (
+        Index_Name TEXT PRIMARY KEY,
+        Columns TEXT NOT NULL
+    )
+    '''
+]
+
+INDEX_PATTERN = re.compile(r'CREATE\s+INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?\s+ON\s+"?TREATMENT"?\s*\((.*)\)',
+                           re.IGNORECASE | re.DOTALL)
+
+def is_partitioned(conn):
+    row = conn.execute("SELECT type FROM main.sqlite_master WHERE name = 'TREATMENT'").fetchone()
+    return row is not None and row[0] == 'view'
+
+def partition_name(year):
+    return UNDATED_PARTITION if year is None else f'TREATMENT_{int(year)}'
+
+def partition_suffix(table):
+    return table[len('TREATMENT_'):].lower()
+
+# Function to list the partition tables, oldest year first and TREATMENT_UNDATED last
+def list_partitions(conn, open_only=False):
+    where = 'WHERE Sealed = 0' if open_only else ''
+    return [table for (table,) in conn.execute(f'''
+    SELECT Partition_Table FROM TREATMENT_PARTITIONS {where} ORDER BY Outcome_Year IS NULL, Outcome_Year
+    ''')]
+
+# Function to list the sealed partition tables (none when TREATMENT is not partitioned)
+def sealed_partitions(conn):
+    if not is_partitioned(conn):
+        return []
+    return [table for (table,) in conn.execute('''
+    SELECT Partition_Table FROM TREATMENT_PARTITIONS WHERE Sealed = 1 ORDER BY Outcome_Year IS NULL, Outcome_Year
+    ''')]
+
+# Function to get the tables holding the treatments: TREATMENT itself, or its (open) partitions
+def treatment_tables(conn, open_only=False):
+    return list_partitions(conn, open_only) if is_partitioned(conn) else ['TREATMENT']
+
+def create_treatment_view(conn):
+    conn.execute('DROP VIEW IF EXISTS TREATMENT')
+    arms = '\n    UNION ALL '.join(f'SELECT * FROM {table}' for table in list_partitions(conn))
+    conn.execute(f'CREATE VIEW TREATMENT AS\n    {arms}')
+
+# Function to get the CREATE INDEX statements of one partition from the index templates
+def partition_index_statements(conn, table):
+    return [f'CREATE INDEX IF NOT EXISTS {name}_{partition_suffix(table)} ON {table}({columns})'
+            for name, columns in conn.execute('SELECT Index_Name, Columns FROM TREATMENT_PARTITION_INDEXES')]
+
+# Function to create the table of one outcome year (None for the undated rows) with the layout of
+# `template` (a CREATE TABLE statement from sqlite_master) and the template indexes
+def create_partition_table(conn, year, template):
+    table = partition_name(year)
+    conn.execute(re.sub(r'^CREATE TABLE\s+"?\w+"?', f'CREATE TABLE {table}', template, count=1))
+    for statement in partition_index_statements(conn, table):
+        conn.execute(statement)
+    conn.execute('INSERT INTO TREATMENT_PARTITIONS (Partition_Table, Outcome_Year) VALUES (?, ?)', (table, year))
+    return table
+
+# Function to add the partition of a new outcome year and expose it through the TREATMENT view
+def create_partition(conn, year):
+    (template,) = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (UNDATED_PARTITION,)).fetchone()
+    table = create_partition_table(conn, year, template)
+    create_treatment_view(conn)
+    return table
+
+# Function to get the outcome year of ISO dates as nullable integers (missing or malformed dates give <NA>)
+def outcome_years(outcome_dates):
+    outcome_dates = pd.Series(outcome_dates)
+    if pd.api.types.is_datetime64_any_dtype(outcome_dates):
+        return outcome_dates.dt.year.astype('Int64')
+    return pd.to_numeric(outcome_dates.astype('string').str[:4], errors='coerce').astype('Int64')
+
+# Function to check a frame of processed treatments against the partitions before it is loaded. Returns the
+# rows to load and the rows skipped because they touch a sealed partition (their outcome year is sealed, or
+# their Treatment_ID is stored in a sealed partition of another year), with that table in 'sealed_partition'.
+# The rows whose Treatment_ID is stored in another open partition than their outcome year's get that
+# partition in 'treatment_partition', which TreatmentWriter routes them to.
+def plan_partition_writes(conn, df):
+    if df.empty or not is_partitioned(conn):
+        return df, df.iloc[:0]
+    years = outcome_years(df['treatment_outcome_date'].to_numpy()).fillna(-1).to_numpy()
+    names = {year: partition_name(None if year == -1 else year) for year in np.unique(years)}
+    destination = pd.Series(years, index=df.index).map(names)
+
+    # The partitions already holding the frame's treatments, looked up through their primary keys. Keys above
+    # the highest stored one (the rows of a new delivery, usually) cannot be stored yet and are not looked up.
+    tables = list_partitions(conn)
+    highest = max((key for table in tables
+                   for (key,) in conn.execute(f'SELECT MAX(Treatment_ID) FROM main.{table}') if key is not None),
+                  default=None)
+    keys = df['treatment_id'].dropna().unique()
+    keys = keys[keys <= highest] if highest is not None else keys[:0]
+    stored = {}
+    if len(keys):
+        conn.execute('DROP TABLE IF EXISTS temp.planned_treatments')
+        conn.execute('CREATE TEMP TABLE planned_treatments (Treatment_ID INTEGER PRIMARY KEY)')
+        conn.executemany('INSERT OR IGNORE INTO temp.planned_treatments VALUES (?)', [(int(key),) for key in keys])
+        arms = ' UNION ALL '.join(f'''SELECT Treatment_ID, '{table}' FROM main.{table}
+        WHERE Treatment_ID IN (SELECT Treatment_ID FROM temp.planned_treatments)''' for table in tables)
+        stored = dict(conn.execute(arms).fetchall())
+        conn.execute('DROP TABLE temp.planned_treatments')
+
+    stored = df['treatment_id'].astype('Int64').map(stored).astype('object')
+    rerouted = stored.notna() & (stored != destination)
+    sealed = sealed_partitions(conn)
+    sealed_partition = destination.where(destination.isin(sealed)).fillna(stored.where(stored.isin(sealed)))
+    skipped = sealed_partition.notna().to_numpy()
+    df = df.assign(treatment_partition=stored.where(rerouted & ~skipped))
+    return (df[~skipped],
+            df[skipped].drop(columns='treatment_partition').assign(sealed_partition=sealed_partition[skipped]))
+
+# Writes treatments to TREATMENT, or to the partition of each row's outcome year, creating the partitions
+# of new years on the way. The loaders skip the rows of sealed years first (plan_partition_writes); the
+# sealed partitions' triggers still reject any write that gets through.
+class TreatmentWriter:
+    def __init__(self, conn):
+        self.conn = conn
+        self.partitioned = is_partitioned(conn)
+        self.tables = set(list_partitions(conn)) if self.partitioned else set()
+
+    def _ensure(self, year):
+        table = partition_name(year)
+        if table not in self.tables:
+            create_partition(self.conn, year)
+            self.tables.add(table)
+        return table
+
+    # Function to get the table a treatment with this outcome date goes to, or its `route`
+    # (the partition holding it already, from plan_partition_writes)
+    def table_for(self, outcome_date, route=None):
+        if not self.partitioned:
+            return 'TREATMENT'
+        if pd.notna(route):
+            return route
+        year = outcome_years([outcome_date]).iloc[0]
+        return self._ensure(None if pd.isna(year) else int(year))
+
+    # Function to split a frame of TREATMENT rows into (table, rows) pairs, one per destination table.
+    # `routes` holds the partition of each row routed by plan_partition_writes (missing for the others).
+    def split(self, treatments, routes=None):
+        if not self.partitioned:
+            return [('TREATMENT', treatments)]
+        years = outcome_years(treatments['Outcome_Date'].to_numpy()).fillna(-1)
+        tables = years.map({year: self._ensure(None if year == -1 else int(year)) for year in years.unique()})
+        if routes is not None:
+            tables = pd.Series(routes, dtype='object').fillna(tables)
+        return list(treatments.groupby(tables.to_numpy(), sort=True))
+
+# Function to add a column to TREATMENT, or to every partition when it is partitioned
+def add_treatment_column(conn, column, column_type):
+    for table in treatment_tables(conn):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+    if is_partitioned(conn):
+        create_treatment_view(conn)
+
+# Function to turn CREATE INDEX statements on TREATMENT into the same index on each open partition.
+# The index is recorded as a template, so partitions created later get it too; sealed partitions keep the
+# indexes they were sealed with. Other statements, and all statements on an unpartitioned TREATMENT, are
+# returned unchanged.
+def expand_index_statements(conn, statements):
+    if not is_partitioned(conn):
+        return list(statements)
+    open_tables = list_partitions(conn, open_only=True)
+    expanded = []
+    for statement in statements:
+        match = INDEX_PATTERN.search(statement)
+        if match is None:
+            expanded.append(statement)
+            continue
+        name, columns = match.group(1), match.group(2).strip()
+        conn.execute('INSERT OR IGNORE INTO TREATMENT_PARTITION_INDEXES (Index_Name, Columns) VALUES (?, ?)',
+                     (name, columns))
+        expanded += [f'CREATE INDEX IF NOT EXISTS {name}_{partition_suffix(table)} ON {table}({columns})'
+                     for table in open_tables]
+    return expanded
+
+# Function to get the names of the existing indexes, counting a TREATMENT index of a partitioned database as
+# existing when it is one of the partition index templates
+def existing_index_names(conn):
+    names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    if is_partitioned(conn):
+        names |= {name for (name,) in conn.execute('SELECT Index_Name FROM TREATMENT_PARTITION_INDEXES')}
+    return names
+
+# Function to split an unpartitioned TREATMENT table into per-year partitions behind a TREATMENT view.
+# The partitions keep the table's columns and indexes. Runs in the caller's transaction; returns the
+# row count of each partition.
+def partition_treatments(conn):
+    if is_partitioned(conn):
+        return {}
+    for statement in CATALOG_TABLES:
+        conn.execute(statement)
+    (template,) = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'TREATMENT'").fetchone()
+    for (sql,) in conn.execute('''
+    SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'TREATMENT' AND sql IS NOT NULL
+    ''').fetchall():
+        match = INDEX_PATTERN.search(sql)
+        conn.execute('INSERT OR IGNORE INTO TREATMENT_PARTITION_INDEXES (Index_Name, Columns) VALUES (?, ?)',
+                     (match.group(1), match.group(2).strip()))
+
+    dated = "Outcome_Date GLOB '[0-9][0-9][0-9][0-9]*'"
+    years = [year for (year,) in conn.execute(f'''
+    SELECT DISTINCT CAST(substr(Outcome_Date, 1, 4) AS INTEGER) FROM TREATMENT WHERE {dated} ORDER BY 1
+    ''')]
+    counts = {}
+    for year in years + [None]:
+        table = create_partition_table(conn, year, template)
+        where = f"substr(Outcome_Date, 1, 4) = '{year:04d}' AND {dated}" if year is not None else f'NOT coalesce({dated}, 0)'
+        counts[table] = conn.execute(f'INSERT INTO {table} SELECT * FROM TREATMENT WHERE {where}').rowcount
+
+    (total,) = conn.execute('SELECT COUNT(*) FROM TREATMENT').fetchone()
+    if total != sum(counts.values()):
+        raise sqlite3.IntegrityError(f"Partitioning copied {sum(counts.values())} of {total} treatments")
+    conn.execute('DROP TABLE TREATMENT')
+    create_treatment_view(conn)
+    return counts
+
+# Function to make the partitions of the years before `before_year` read-only: triggers reject any INSERT,
+# UPDATE or DELETE on them, and their statistics are gathered one last time. Returns the sealed tables.
+def seal_partitions(conn, before_year):
+    tables = [table for (table,) in conn.execute('''
+    SELECT Partition_Table FROM TREATMENT_PARTITIONS WHERE Sealed = 0 AND Outcome_Year < ? ORDER BY Outcome_Year
+    ''', (int(before_year),))]
+    sealed_at = datetime.now().isoformat(timespec='seconds')
+    for table in tables:
+        for action in ['INSERT', 'UPDATE', 'DELETE']:
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_sealed_{action.lower()}
+            BEFORE {action} ON {table}
+            BEGIN
+                SELECT RAISE(ABORT, '{table} is sealed (read-only)');
+            END;
+            ''')
+        conn.execute(f'ANALYZE {table}')
+        conn.execute('UPDATE TREATMENT_PARTITIONS SET Sealed = 1, Sealed_At = ? WHERE Partition_Table = ?',
+                     (sealed_at, table))
+    return tables
+
+# Function to reopen the partition of one year for writes (e.g. to reload a corrected old file)
+def unseal_partition(conn, year):
+    table = partition_name(year)
+    for action in ['insert', 'update', 'delete']:
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_{table.lower()}_sealed_{action}')
+    conn.execute('UPDATE TREATMENT_PARTITIONS SET Sealed = 0, Sealed_At = NULL WHERE Partition_Table = ?', (table,))
+    for statement in partition_index_statements(conn, table):
+        conn.execute(statement)
+    return table
+
+# Function to get the TREATMENT columns a query mentions (all of them when it selects TREATMENT's *)
+def referenced_columns(conn, sql):
+    columns = [row[1] for row in conn.execute('PRAGMA main.table_info(TREATMENT)')]
+    if re.search(r'SELECT\s+(?:\w+\.)?\*\s+FROM\s+TREATMENT\b', sql, re.IGNORECASE):
+        return columns
+    words = {word.lower() for word in re.findall(r'\w+', sql)}
+    return [column for column in columns if column.lower() in words] or columns[:1]
+
+# Context manager narrowing what a named query reads from a partitioned TREATMENT: for its duration,
+# TREATMENT is a temporary view over the columns the query mentions and, for a query declaring
+# 'partition_years' (the names of its first and last year parameters), over those years' partitions only.
+# Temporary objects take precedence over the database's own, so the SQL of the query is unchanged.
+# (SQLite 3.40 copies every column of a UNION ALL view into an aggregation; listing only the used ones keeps
+# a scan of all the partitions close to a scan of one table.)
+@contextmanager
+def pruned_treatments(conn, query, params):
+    if not is_partitioned(conn):
+        yield
+        return
+    years = query.get('partition_years')
+    if years:
+        first_year, last_year = (int(params[name]) for name in years)
+        tables = [table for (table,) in conn.execute('''
+        SELECT Partition_Table FROM TREATMENT_PARTITIONS WHERE Outcome_Year BETWEEN ? AND ? ORDER BY Outcome_Year
+        ''', (first_year, last_year))]
+    else:
+        tables = list_partitions(conn)
+    columns = ', '.join(referenced_columns(conn, query['sql']))
+    arms = ' UNION ALL '.join(f'SELECT {columns} FROM main.{table}' for table in tables)
+    conn.execute(f'CREATE TEMP VIEW TREATMENT AS {arms or f"SELECT {columns} FROM main.{UNDATED_PARTITION} WHERE 0"}')
+    try:
+        yield
+    finally:
+        conn.execute('DROP VIEW IF EXISTS temp.TREATMENT')
+
+def describe_partitions(conn):
+    return pd.read_sql_query('''
+    SELECT Partition_Table, Outcome_Year, Sealed, Sealed_At FROM TREATMENT_PARTITIONS
+    ORDER BY Outcome_Year IS NULL, Outcome_Year
+    ''', conn).assign(Rows=lambda df: [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                                       for table in df['Partition_Table']])
+
+if __name__ == "__main__":
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
+    parser = argparse.ArgumentParser(description="Partition TREATMENT by outcome year and seal closed years.")
+    parser.add_argument('--db', default=os.path.join(project_root, "db", "healthcare_data.db"))
+    parser.add_argument('--partition', action='store_true', help="split an unpartitioned TREATMENT table")
+    parser.add_argument('--seal-before', type=int, default=None, help="make the partitions before this year read-only")
+    parser.add_argument('--unseal', type=int, default=None, help="reopen the partition of this year for writes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database not found at {args.db}")
+        sys.exit(1)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.partition:
+            counts = partition_treatments(conn)
+            conn.commit()
+            print(f"TREATMENT split into {len(counts)} partitions." if counts else "TREATMENT is already partitioned.")
+        if not is_partitioned(conn):
+            print("TREATMENT is not partitioned (use --partition).")
+            sys.exit(1 if args.seal_before is not None or args.unseal is not None else 0)
+        if args.unseal is not None:
+            print(f"Reopened {unseal_partition(conn, args.unseal)}.")
+            conn.commit()
+        if args.seal_before is not None:
+            sealed = seal_partitions(conn, args.seal_before)
+            conn.commit()
+            print(f"Sealed {', '.join(sealed)}." if sealed else f"No open partition before {args.seal_before}.")
+        print(describe_partitions(conn).to_string(index=False))
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"SQLite error: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
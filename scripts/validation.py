@@ -0,0 +1,190 @@
+# validation.py
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from schema_manifest import KEY_COLUMNS, NUMERIC_COLUMNS, INVALID_VALUES_COLUMN, coerce_types
+
+# Rule-based checks run on each delta before the silver load. Each rule looks at a whole column at once; the
+# rows failing any rule are set aside in the QUARANTINE table with the reasons, and the clean rows are loaded.
+#   keys             the treatment, provider, patient, disease and speciality IDs must be present
+#   numbers          keys and measures must be numbers (coerce_types lists the others in invalid_values)
+#   dates            a non-empty start/completion/outcome date must parse as ISO 8601 (empty dates load as NULL;
+#                    the Parquet intermediate lists the dates that did not parse in invalid_values)
+#   names            a provider/patient name must be present and hold a first and a last name separated by a space
+#   outcome status   a non-empty status must be one of the statuses the load scores (EFFECTIVENESS_MAPPING)
+VALIDATED_DATE_COLUMNS = ['treatment_start_date', 'treatment_completion_date', 'treatment_outcome_date']
+VALIDATED_NAME_COLUMNS = ['provider_name', 'patient_name']
+
+def get_default_db_path():
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Healthcare_ETL_Project'))
+    return os.path.join(project_root, "db", "healthcare_data.db")
+
+# Rows rejected by the checks, one per treatment: a row rejected again (e.g. on a full reload) replaces its
+# entry, and the entry is removed once a corrected delivery of the treatment loads. Rows without a
+# Treatment_ID are kept with a NULL one (a row read again replaces the entry with the same data).
+def ensure_quarantine_table(conn):
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(QUARANTINE)')]
+    if columns and 'Quarantine_ID' not in columns:
+        # Tables keyed by Treatment_ID (which cannot hold the rows without one) are rebuilt with their entries
+        conn.execute('ALTER TABLE QUARANTINE RENAME TO QUARANTINE_OLD')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS QUARANTINE (
+        Quarantine_ID INTEGER PRIMARY KEY,
+        Treatment_ID INTEGER,
+        Source_File TEXT,
+        Source_Batch INTEGER,
+        Reason TEXT NOT NULL,
+        Row_Data TEXT NOT NULL,
+        Quarantined_At TEXT
+    );
+    ''')
+    if columns and 'Quarantine_ID' not in columns:
+        conn.execute('''
+        INSERT INTO QUARANTINE (Treatment_ID, Source_File, Source_Batch, Reason, Row_Data, Quarantined_At)
+        SELECT Treatment_ID, Source_File, Source_Batch, Reason, Row_Data, Quarantined_At FROM QUARANTINE_OLD
+        ORDER BY Treatment_ID
+        ''')
+        conn.execute('DROP TABLE QUARANTINE_OLD')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_quarantine_treatment ON QUARANTINE(Treatment_ID)')
+
+# Function to flag the values of a text column whose lower case is not in `values` (missing values pass).
+# A categorical column is checked through its categories rather than its rows.
+def unknown_values(series, values):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # The extra True is picked by code -1, the code of a missing value
+        known = np.append(series.cat.categories.str.lower().isin(values), True)
+        return pd.Series(~known[series.cat.codes.to_numpy()], index=series.index)
+    return ~(series.str.lower().isin(values) | series.isna())
+
+# Function to flag the rows whose invalid_values column lists a value of one of `columns`
+def listed_values(df, columns):
+    listed = df[INVALID_VALUES_COLUMN]
+    if listed.isna().all():
+        return pd.Series(False, index=df.index)
+    return listed.str.contains('(?:^|; )(?:' + '|'.join(columns) + ')=', na=False)
+
+# Function to split a frame of processed rows into the rows passing every rule and the rejected rows.
+# Date columns read as text (a value failed to parse at read time) are converted to datetime64 in the clean
+# rows; the rejected rows keep the original values and get a 'reason' column listing the rules they failed.
+def validate_frame(df, outcome_statuses):
+    df = coerce_types(df)
+    checks, parsed = {}, {}
+    for column in KEY_COLUMNS:
+        if column in df.columns:
+            checks[f'missing {column}'] = df[column].isna()
+    checks['invalid numbers'] = listed_values(df, NUMERIC_COLUMNS)
+    for column in VALIDATED_DATE_COLUMNS:
+        if column not in df.columns:
+            continue
+        # Dates typed before (in the Parquet intermediate) list the values that did not parse in invalid_values
+        checks[f'unparseable {column}'] = listed_values(df, [column])
+        if not pd.api.types.is_datetime64_any_dtype(df[column]):
+            parsed[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce')
+            checks[f'unparseable {column}'] |= df[column].notna() & parsed[column].isna()
+    for column in VALIDATED_NAME_COLUMNS:
+        if column in df.columns:
+            checks[f'{column} without first and last name'] = ~df[column].str.contains(' ', regex=False, na=False)
+    if 'treatment_outcome_status' in df.columns:
+        checks['unknown treatment_outcome_status'] = unknown_values(df['treatment_outcome_status'],
+                                                                    list(outcome_statuses))
+
+    checks = pd.DataFrame(checks, index=df.index)
+    failed = checks.any(axis=1).to_numpy()
+    rejected = df[failed].copy()
+    if failed.any():
+        # Only the failing rows have their reasons joined
+        rejected['reason'] = checks[failed].apply(lambda row: '; '.join(row.index[row]), axis=1)
+        df = df[~failed].copy()
+    for column, values in parsed.items():
+        df[column] = values[~failed]
+    return df, rejected
+
+# Function to store rejected rows (from validate_frame) in QUARANTINE, in the caller's transaction so the
+# rows are set aside together with the load checkpoint that moves past them. Returns the number of rows.
+def quarantine_rows(conn, rejected):
+    if rejected.empty:
+        return 0
+    ensure_quarantine_table(conn)
+    # Dates are written as in the processed CSV, whether their batch parsed them or kept them as text
+    row_data = rejected.drop(columns=['reason'])
+    for column in row_data.columns:
+        if pd.api.types.is_datetime64_any_dtype(row_data[column]):
+            row_data[column] = row_data[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    row_data = row_data.to_json(orient='records', lines=True)
+    lineage = rejected.reindex(columns=['source_file', 'source_batch'])
+    quarantined_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    records = [
+        (int(treatment_id) if pd.notnull(treatment_id) else None, source_file if pd.notnull(source_file) else None,
+         int(source_batch) if pd.notnull(source_batch) else None, reason, data, quarantined_at)
+        for treatment_id, source_file, source_batch, reason, data in zip(
+            rejected['treatment_id'], lineage['source_file'], lineage['source_batch'], rejected['reason'],
+            row_data.splitlines())
+    ]
+    # Replacing the earlier entries of the same treatments, or of the same rows when they have no Treatment_ID
+    conn.executemany('DELETE FROM QUARANTINE WHERE Treatment_ID = ?',
+                     [(record[0],) for record in records if record[0] is not None])
+    conn.executemany('DELETE FROM QUARANTINE WHERE Treatment_ID IS NULL AND Row_Data = ?',
+                     [(record[4],) for record in records if record[0] is None])
+    conn.executemany('''
+    INSERT INTO QUARANTINE (Treatment_ID, Source_File, Source_Batch, Reason, Row_Data, Quarantined_At)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', records)
+    return len(records)
+
+# Function to remove the entries of treatments that have now loaded clean (e.g. from a corrected delivery).
+# The quarantined keys are matched against the loaded ones in memory; returns the number removed.
+def release_quarantined(conn, treatment_ids):
+    try:
+        quarantined = [key for (key,) in conn.execute(
+            'SELECT Treatment_ID FROM QUARANTINE WHERE Treatment_ID IS NOT NULL')]
+    except sqlite3.OperationalError:
+        return 0
+    released = np.intersect1d(quarantined, np.asarray(treatment_ids, dtype='int64'))
+    conn.executemany('DELETE FROM QUARANTINE WHERE Treatment_ID = ?', [(int(key),) for key in released])
+    return len(released)
+
+# Function to print the quarantined row count per reason
+def describe_quarantine(conn):
+    ensure_quarantine_table(conn)
+    summary = pd.read_sql_query('''
+    SELECT Reason, COUNT(*) AS Row_Count, MIN(Quarantined_At) AS First_Seen, MAX(Quarantined_At) AS Last_Seen
+    FROM QUARANTINE GROUP BY Reason ORDER BY Row_Count DESC
+    ''', conn)
+    if summary.empty:
+        print("No quarantined rows.")
+        return
+    print(f"{int(summary['Row_Count'].sum())} quarantined rows:")
+    print(summary.to_string(index=False))
+
+# Function to write the quarantined rows to a CSV, one column per processed column plus the reason
+def export_quarantine(conn, output_path):
+    ensure_quarantine_table(conn)
+    entries = pd.read_sql_query('SELECT Reason, Row_Data FROM QUARANTINE ORDER BY Treatment_ID, Quarantine_ID', conn)
+    rows = pd.DataFrame([json.loads(data) for data in entries['Row_Data']])
+    rows['reason'] = entries['Reason']
+    rows.to_csv(output_path, index=False)
+    print(f"Exported {len(rows)} quarantined rows to {output_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the rows the silver load quarantined.")
+    parser.add_argument('--db', default=get_default_db_path(), help="SQLite database")
+    parser.add_argument('--export', default=None, metavar='CSV', help="write the quarantined rows to a CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database not found at: {args.db}")
+        sys.exit(1)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.export:
+            export_quarantine(conn, args.export)
+        else:
+            describe_quarantine(conn)
+        conn.commit()
+    finally:
+        conn.close()